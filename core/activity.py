@@ -0,0 +1,139 @@
+"""
+Case activity log.
+
+Signals call ``record()`` for case and document changes; core.caseops
+calls ``record_many()`` for bulk operations. An entry is queued only once
+the surrounding transaction commits, so a rolled-back change leaves no
+history. The queue is an IntakeBuffer (see core.intake): entries are
+bulk-inserted in batches of ACTIVITY_LOG_BATCH_SIZE, or every
+ACTIVITY_LOG_FLUSH_SECONDS. Each entry keeps the time of the event, not
+of the write.
+
+Timelines are read newest first with keyset pagination on the
+(case, created_at, id) index: ``page()`` returns a page of entries and
+the cursor of the next one, and costs the same however deep it is.
+
+Reads never flush the whole buffer. ``page()`` and the case page's ETag
+(core.conditional) first write this process's entries for that one case,
+which is nothing on most requests, so users see their own changes at
+once; other processes' entries appear after their next flush. The
+trade-off of buffering is durability: entries still in memory when a
+worker crashes or is killed (anything that skips atexit) are lost, up to
+ACTIVITY_LOG_FLUSH_SECONDS or a batch of them. The case rows themselves
+are unaffected; only their history has the gap.
+
+The table is append-only. ``prune()`` (``manage.py prune_activity``)
+enforces the retention policy: it deletes entries older than
+ACTIVITY_RETENTION_DAYS in chunks of ACTIVITY_PRUNE_CHUNK_SIZE rows, so
+no single DELETE holds SQLite's write lock for long. On PostgreSQL the
+same policy could be a range partition per month on created_at, with
+whole partitions dropped instead.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .dbtuning import retry_on_locked
+from .intake import IntakeBuffer
+from .models import CaseActivity, User
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@retry_on_locked
+def write_entries(items):
+    """Store buffered ``(database, CaseActivity)`` pairs; return the number written."""
+    by_database = defaultdict(list)
+    for using, entry in items:
+        by_database[using].append(entry)
+    for using, entries in by_database.items():
+        CaseActivity.objects.using(using).bulk_create(entries)
+    return len(items)
+
+
+buffer = IntakeBuffer(write_entries, prefix='ACTIVITY_LOG', name='case-activity', batch_size=200)
+
+
+def record_many(entries, using=None):
+    """Queue unsaved CaseActivity rows for writing once the transaction commits."""
+    using = using or 'default'
+    entries = list(entries)
+    if entries:
+        transaction.on_commit(lambda: buffer.extend([(using, entry) for entry in entries]), using=using)
+
+
+def record(case_id, verb, detail=None, actor=None, using=None):
+    record_many([CaseActivity(case_id=case_id, verb=verb, detail=detail or {}, actor=actor)], using=using)
+
+
+def flush(case_id=None):
+    """
+    Write everything buffered in this process, or only the entries of
+    case ``case_id``; return the number of entries.
+    """
+    if case_id is None:
+        return buffer.flush()
+    return buffer.flush(lambda item: item[1].case_id == case_id)
+
+
+def user_labels(user_ids, using=None):
+    """
+    ``{id: name}`` for lawyers named in activity details. Names are stored
+    in the entry, so renaming a user doesn't rewrite history.
+    """
+    ids = set(user_ids) - {None}
+    users = User.objects.using(using).filter(pk__in=ids).only('username', 'first_name', 'last_name') if ids else []
+    labels = {user.pk: user.get_full_name() or user.username for user in users}
+    return {None: None, **{pk: labels.get(pk, f'user {pk}') for pk in ids}}
+
+
+# Timeline
+
+def make_cursor(entry):
+    delta = entry.created_at - EPOCH
+    return f"{(delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds}-{entry.pk}"
+
+
+def read_cursor(cursor):
+    """Inverse of make_cursor; raises ValueError for a malformed cursor."""
+    micros, pk = cursor.split('-')
+    try:
+        created_at = EPOCH + timedelta(microseconds=int(micros))
+    except OverflowError as exc:
+        # Too far from the epoch for a datetime
+        raise ValueError(f'cursor out of range: {cursor}') from exc
+    if not 0 < int(pk) < 2 ** 63:
+        raise ValueError(f'cursor out of range: {cursor}')
+    return created_at, int(pk)
+
+
+def page(case_id, cursor=None, size=None):
+    """Return ``(entries, next cursor or None)``, newest first."""
+    flush(case_id)
+    size = size or _setting('ACTIVITY_PAGE_SIZE', 20)
+    before = read_cursor(cursor) if cursor else None
+    entries = list(CaseActivity.objects.timeline(case_id, before).select_related('actor')[:size + 1])
+    if len(entries) > size:
+        return entries[:size], make_cursor(entries[size - 1])
+    return entries, None
+
+
+# Retention
+
+def prune(now=None):
+    """Delete entries past ACTIVITY_RETENTION_DAYS; return the number removed."""
+    cutoff = (now or timezone.now()) - timedelta(days=_setting('ACTIVITY_RETENTION_DAYS', 730))
+    chunk_size = _setting('ACTIVITY_PRUNE_CHUNK_SIZE', 5000)
+    removed = 0
+    while True:
+        ids = list(CaseActivity.objects.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return removed
+        removed += CaseActivity.objects.filter(pk__in=ids).delete()[0]
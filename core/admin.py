@@ -3,20 +3,37 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
-from django.db.models import Q
-from .models import User, Client, Case, Document, Visitor, Appointment
+from django.template.response import TemplateResponse
+from .models import User, Client, Case, CaseBulkChange, Document, Visitor, Appointment, Booking, Notification, ChatRoom, ChatMembership
+from . import caseops, exports
 from django.contrib.auth.models import Group
+from .autocomplete import SOURCES, USERS, PrefixAutocompleteMixin
 
 # Customize the admin site
 admin.site.site_header = 'Law Firm Administration'
 admin.site.site_title = 'Law Firm Admin'
 admin.site.index_title = 'Welcome to Law Firm Admin'
+# Adds the caseload statistics panel above the app list
+admin.site.index_template = 'admin/core/index.html'
 
 # Unregister the default Group model
 # admin.site.unregister(Group)
 
+
+class ExportActionsMixin:
+    """Actions streaming the selected rows as CSV or XLSX (see core.exports)."""
+
+    def export_csv(self, request, queryset):
+        return exports.streaming_response(exports.BY_MODEL[self.model], queryset, 'csv', request)
+    export_csv.short_description = 'Export selected as CSV'
+
+    def export_xlsx(self, request, queryset):
+        return exports.streaming_response(exports.BY_MODEL[self.model], queryset, 'xlsx', request)
+    export_xlsx.short_description = 'Export selected as XLSX'
+
+
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(PrefixAutocompleteMixin, BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups')
     search_fields = ('username', 'first_name', 'last_name', 'email')
@@ -29,24 +46,31 @@ class UserAdmin(BaseUserAdmin):
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
     )
+    autocomplete_source = USERS
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, use_distinct = super().get_search_results(request, queryset, search_term)
+        # Case.lawyer picks from lawyers, not from every client account
+        if request.GET.get('model_name') == 'case' and request.GET.get('field_name') == 'lawyer':
+            queryset = queryset.filter(groups__name='Lawyer')
+        return queryset, use_distinct
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(ExportActionsMixin, PrefixAutocompleteMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'case_count', 'created_at', 'user_link')
     search_fields = ('name', 'email', 'phone', 'user__username', 'user__email')
     list_filter = ('created_at',)
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'user_link')
+    autocomplete_source = SOURCES['clients']
+    actions = ['export_csv', 'export_xlsx']
     # Remove conditional filter_horizontal for clarity
     # If you want to relate clients to cases, add a ManyToManyField in the model
     # filter_horizontal = ('cases',)
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if not request.user.is_superuser:
-            qs = qs.filter(Q(user=request.user) | Q(case__lawyer=request.user)).distinct()
-        return qs
+        return super().get_queryset(request).visible_to(request.user)
 
     def get_readonly_fields(self, request, obj=None):
         # Make user field read-only if not a superuser
@@ -69,28 +93,41 @@ class ClientAdmin(admin.ModelAdmin):
 
 from .models import LawyerProfile
 @admin.register(LawyerProfile)
-class LawyerProfileAdmin(admin.ModelAdmin):
+class LawyerProfileAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     list_display = ('user', 'photo', 'bio')
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    autocomplete_source = SOURCES['lawyers']
+
+class ReassignCasesForm(forms.Form):
+    lawyer = forms.ModelChoiceField(
+        queryset=User.objects.filter(groups__name='Lawyer').order_by('last_name', 'first_name', 'username'),
+        required=False, empty_label='(unassigned)',
+    )
+
+class ShiftDueDatesForm(forms.Form):
+    days = forms.IntegerField(help_text='Negative numbers move due dates earlier.')
 
 @admin.register(Case)
-class CaseAdmin(admin.ModelAdmin):
+class CaseAdmin(ExportActionsMixin, PrefixAutocompleteMixin, admin.ModelAdmin):
     list_display = ('title', 'client_link', 'status', 'status_badge', 'lawyer', 'opened_on', 'due_date', 'is_active')
     list_display_links = ('title',)
-    list_filter = ('status', 'opened_on', 'due_date', 'lawyer')
+    # Only users assigned to some case, not every account
+    list_filter = ('status', 'opened_on', 'due_date', ('lawyer', admin.RelatedOnlyFieldListFilter))
     search_fields = ('title', 'description', 'client__name')
     date_hierarchy = 'opened_on'
     ordering = ('-opened_on',)
     list_editable = ('status', 'lawyer')
     list_display_links = ('title',)
     readonly_fields = ('opened_on',)
+    # Type-ahead instead of a <select> of every row, including list_editable
+    autocomplete_fields = ('client', 'lawyer')
+    autocomplete_source = SOURCES['cases']
+    actions = ['mark_open', 'mark_pending', 'mark_closed', 'reassign_lawyer', 'shift_due_dates', 'export_csv', 'export_xlsx']
     filter_horizontal = ('lawyers',) if 'lawyers' in [f.name for f in Case._meta.get_fields()] else ()
     
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if not request.user.is_superuser:
-            # For non-superusers, only show their cases or cases they're assigned to
-            qs = qs.filter(Q(client__user=request.user) | Q(lawyer=request.user))
-        return qs
+        return super().get_queryset(request).visible_to(request.user)
         
     def get_readonly_fields(self, request, obj=None):
         # Make certain fields read-only based on user permissions
@@ -139,6 +176,73 @@ class CaseAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
     status_badge.admin_order_field = 'status'
 
+    # Bulk actions: one set-based update per action (core.caseops) instead
+    # of a save() per row through list_editable. They write, so they are
+    # only offered to users with the change permission.
+
+    def _report(self, request, change):
+        self.message_user(
+            request, f"{change.updated} case(s) updated, {change.unchanged} already up to date.",
+        )
+
+    def _set_status(self, request, queryset, status):
+        self._report(request, caseops.set_status(queryset, status, actor=request.user))
+
+    @admin.action(permissions=['change'], description='Mark selected cases as open')
+    def mark_open(self, request, queryset):
+        self._set_status(request, queryset, 'open')
+
+    @admin.action(permissions=['change'], description='Mark selected cases as pending')
+    def mark_pending(self, request, queryset):
+        self._set_status(request, queryset, 'pending')
+
+    @admin.action(permissions=['change'], description='Close selected cases')
+    def mark_closed(self, request, queryset):
+        self._set_status(request, queryset, 'closed')
+
+    def _bulk_form(self, request, queryset, form_class, title):
+        """The form for an action needing input; None until it is submitted and valid."""
+        form = form_class(request.POST if 'apply' in request.POST else None)
+        if form.is_bound and form.is_valid():
+            return form
+        return TemplateResponse(request, 'admin/core/case/bulk_action.html', {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action': request.POST.get('action'),
+        })
+
+    @admin.action(permissions=['change'], description='Reassign selected cases to a lawyer')
+    def reassign_lawyer(self, request, queryset):
+        form = self._bulk_form(request, queryset, ReassignCasesForm, 'Reassign cases')
+        if isinstance(form, TemplateResponse):
+            return form
+        self._report(request, caseops.reassign(queryset, form.cleaned_data['lawyer'], actor=request.user))
+
+    @admin.action(permissions=['change'], description='Shift due dates of selected cases')
+    def shift_due_dates(self, request, queryset):
+        form = self._bulk_form(request, queryset, ShiftDueDatesForm, 'Shift due dates')
+        if isinstance(form, TemplateResponse):
+            return form
+        self._report(request, caseops.shift_due_dates(queryset, form.cleaned_data['days'], actor=request.user))
+
+@admin.register(CaseBulkChange)
+class CaseBulkChangeAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'action', 'params', 'updated', 'unchanged', 'actor', 'source')
+    list_filter = ('action', 'source')
+    list_select_related = ('actor',)
+    readonly_fields = [f.name for f in CaseBulkChange._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 class MultipleFileInput(forms.ClearableFileInput):
     allow_multiple_selected = True
 
@@ -171,12 +275,17 @@ class DocumentForm(forms.ModelForm):
 class DocumentAdmin(admin.ModelAdmin):
     form = DocumentForm
     list_display = ('title', 'case_display', 'file_type_display', 'file_size_display', 'uploaded_at', 'file_actions')
-    list_filter = ('uploaded_at', 'case')
+    # No 'case' filter: it would list every case; filter by ?case__id__exact= or search instead
+    list_filter = ('uploaded_at',)
+    autocomplete_fields = ('case',)
     search_fields = ('title', 'case__title', 'description')
     date_hierarchy = 'uploaded_at'
     readonly_fields = ('uploaded_at', 'file_type_display', 'file_size_display', 'preview')
     list_per_page = 25
     actions = ['download_selected_documents']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).visible_to(request.user)
     
     def case_display(self, obj):
         if obj.case:
@@ -330,21 +439,93 @@ class DocumentAdmin(admin.ModelAdmin):
                 return JsonResponse({'success': False, 'error': str(e)})
         return JsonResponse({'success': False, 'error': 'No file provided'})
 
+class SpamScoreFilter(admin.SimpleListFilter):
+    title = 'spam likelihood'
+    parameter_name = 'spam'
+    RANGES = {
+        'low': (0, 29),
+        'medium': (30, 69),
+        'high': (70, 100),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, f"{key.title()} ({low}-{high})") for key, (low, high) in self.RANGES.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.RANGES:
+            return queryset.filter(spam_score__range=self.RANGES[self.value()])
+        return queryset
+
 @admin.register(Visitor)
 class VisitorAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'submitted_at', 'message_preview')
-    list_filter = ('submitted_at',)
+    list_display = ('name', 'email', 'submitted_at', 'spam_score', 'message_preview')
+    list_filter = (SpamScoreFilter, 'submitted_at')
     search_fields = ('name', 'email', 'message')
     date_hierarchy = 'submitted_at'
-    readonly_fields = ('submitted_at',)
+    readonly_fields = ('submitted_at', 'spam_score')
     
     def message_preview(self, obj):
         return f"{obj.message[:50]}..." if obj.message else ""
     message_preview.short_description = 'Message Preview'
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
-    list_display = ('client', 'date', 'time', 'message')
+class AppointmentAdmin(ExportActionsMixin, admin.ModelAdmin):
+    list_display = ('client', 'date', 'time', 'duration', 'message')
     search_fields = ('client__name', 'client__email', 'message')
-    list_filter = ('date', 'client')
+    list_filter = ('date', ('lawyer', admin.RelatedOnlyFieldListFilter))
     ordering = ('-date', '-time')
+    autocomplete_fields = ('client', 'lawyer')
+    actions = ['export_csv', 'export_xlsx']
+
+
+@admin.register(Booking)
+class BookingAdmin(ExportActionsMixin, admin.ModelAdmin):
+    list_display = ('client', 'availability', 'status', 'booked_at')
+    list_filter = ('status', 'booked_at')
+    search_fields = ('client__username', 'client__email')
+    list_select_related = ('client', 'availability__lawyer__user')
+    date_hierarchy = 'booked_at'
+    ordering = ('-booked_at',)
+    raw_id_fields = ('client', 'availability')
+    actions = ['export_csv', 'export_xlsx']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).visible_to(request.user)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('subject', 'recipient__username', 'recipient__email')
+    list_select_related = ('recipient',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        count = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f"{count} notification(s) queued for retry.")
+    retry_now.short_description = 'Retry selected notifications now'
+
+
+class ChatMembershipInline(admin.TabularInline):
+    model = ChatMembership
+    extra = 1
+    raw_id_fields = ('user',)
+    readonly_fields = ('joined_at', 'last_read_id')
+
+@admin.register(ChatRoom)
+class ChatRoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'member_count', 'created_at')
+    search_fields = ('name', 'members__username')
+    inlines = [ChatMembershipInline]
+
+    def get_queryset(self, request):
+        from django.db.models import Count
+        return super().get_queryset(request).annotate(member_count=Count('memberships'))
+
+    def member_count(self, obj):
+        return obj.member_count
+    member_count.short_description = 'Members'
+    member_count.admin_order_field = 'member_count'
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import metrics, signals  # noqa: F401
+        from .dbtuning import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='core.sqlite_pragmas')
+        if metrics.enabled():
+            connection_created.connect(metrics.install_query_wrapper, dispatch_uid='core.metrics')
@@ -0,0 +1,94 @@
+"""
+Type-ahead lookups for foreign keys with too many rows for a <select>.
+
+Each source names a model, the fields a search matches and how a row is
+labelled. ``GET /api/autocomplete/<source>/?q=`` returns the first rows,
+limited to AUTOCOMPLETE_LIMIT, as ``{'results': [{'id', 'text'}], 'more'}``.
+AutocompleteSelect (core.forms) renders only the selected option and
+autocomplete.js fills in the rest as the user types. The admin's own
+autocomplete (``autocomplete_fields``) uses the same search via
+PrefixAutocompleteMixin.
+
+A search is a case-insensitive prefix match, written as a range on
+LOWER(field) rather than LIKE '%term%'. With the functional indexes on
+Client name/email and Case title that is an index range scan, and the
+rows come back in index order so LIMIT stops early. Results go through
+visible_to, so a client only finds their own records.
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Case, Client, LawyerProfile, User
+
+MAX_LIMIT = 100
+
+
+def prefix_filter(queryset, term, fields):
+    """Rows where any of ``fields`` starts with ``term``, ignoring case."""
+    term = term.strip().lower()
+    if not term:
+        return queryset
+    # Everything starting with "ab" sorts in ["ab", "ac")
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    aliases = {f'_{field}_lower': Lower(field) for field in fields}
+    condition = Q()
+    for alias in aliases:
+        condition |= Q(**{f'{alias}__gte': term, f'{alias}__lt': upper})
+    return queryset.alias(**aliases).filter(condition)
+
+
+def lawyer_label(profile):
+    return profile.user.get_full_name() or profile.user.username
+
+
+class Source:
+    def __init__(self, model, fields, label=str, select_related=()):
+        self.model = model
+        self.fields = fields
+        self.label = label
+        self.select_related = select_related
+
+    def queryset(self, user):
+        manager = self.model.objects
+        queryset = manager.visible_to(user) if hasattr(manager, 'visible_to') else manager.all()
+        return queryset.select_related(*self.select_related)
+
+    def search(self, queryset, term):
+        return prefix_filter(queryset, term, self.fields).order_by(Lower(self.fields[0]), 'pk')
+
+    def lookup(self, user, term, limit):
+        rows = list(self.search(self.queryset(user), term)[:limit + 1])
+        return [{'id': row.pk, 'text': self.label(row)} for row in rows[:limit]], len(rows) > limit
+
+
+SOURCES = {
+    'clients': Source(Client, ('name', 'email')),
+    'cases': Source(Case, ('title',), label=lambda case: f"{case.title} ({case.client.name})",
+                    select_related=('client',)),
+    'lawyers': Source(LawyerProfile, ('user__last_name', 'user__first_name', 'user__username'),
+                      label=lawyer_label, select_related=('user',)),
+}
+# Admin only: not in SOURCES, so the public endpoint cannot list accounts
+USERS = Source(User, ('username', 'last_name', 'first_name', 'email'))
+
+
+def lookup(user, source, term, limit=None):
+    """Return ``(results, more)``; raises KeyError for an unknown source."""
+    limit = max(1, min(limit or getattr(settings, 'AUTOCOMPLETE_LIMIT', 20), MAX_LIMIT))
+    return SOURCES[source].lookup(user, term, limit)
+
+
+class PrefixAutocompleteMixin:
+    """
+    ModelAdmin mixin: answer admin autocomplete requests for this model
+    with the prefix search of ``autocomplete_source`` (a Source). The
+    changelist search box keeps the usual search_fields behaviour.
+    """
+    autocomplete_source = None
+
+    def get_search_results(self, request, queryset, search_term):
+        match = request.resolver_match
+        if match is not None and match.view_name == 'admin:autocomplete':
+            return self.autocomplete_source.search(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
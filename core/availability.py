@@ -0,0 +1,66 @@
+"""
+Weekday -> working-hours lookup for lawyers.
+
+Appointment validation needs a lawyer's window for a single weekday, and
+used to run two queries per check to find it. Instead we load the whole
+week for a lawyer in one query, keep it in the cache, and drop it when
+any of that lawyer's Availability rows change (see core.signals).
+"""
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .models import Availability
+
+WEEKDAY_CODES = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(lawyer_id):
+    return f'core:availability:{lawyer_id}'
+
+
+def get_availability_map(lawyer_id):
+    """Return ``{day_code: (start_time, end_time)}`` for a LawyerProfile id."""
+    key = _cache_key(lawyer_id)
+    windows = cache.get(key)
+    if windows is None:
+        windows = {
+            day: (start, end)
+            for day, start, end in Availability.objects
+            .filter(lawyer_id=lawyer_id)
+            .values_list('day', 'start_time', 'end_time')
+        }
+        cache.set(key, windows, AVAILABILITY_CACHE_TIMEOUT)
+    return windows
+
+
+def invalidate_availability(lawyer_id):
+    cache.delete(_cache_key(lawyer_id))
+
+
+def weekday_code(day):
+    return WEEKDAY_CODES[day.weekday()]
+
+
+def validate_slot(lawyer_id, day, at, duration=0):
+    """
+    Raise ValidationError unless ``lawyer_id`` works on ``day`` from ``at``
+    for ``duration`` minutes. Returns the matching (start, end) window.
+    """
+    if day < timezone.localdate():
+        raise ValidationError("Cannot book an appointment for a past date.")
+
+    window = get_availability_map(lawyer_id).get(weekday_code(day))
+    if window is None:
+        raise ValidationError(f"Lawyer is not available on {day.strftime('%A')}.")
+
+    start, end = window
+    if not (start <= at <= end):
+        raise ValidationError(
+            f"Appointment time must be between {start.strftime('%H:%M')} and {end.strftime('%H:%M')}."
+        )
+    finishes = at.hour * 60 + at.minute + duration
+    if finishes > end.hour * 60 + end.minute:
+        raise ValidationError(f"Appointment must finish by {end.strftime('%H:%M')}.")
+    return window
@@ -0,0 +1,227 @@
+"""
+Materialized caseload statistics for the dashboard and the admin index.
+
+CaseloadStat rows are counters keyed by (metric, lawyer, status, day):
+
+* ``cases``: cases per lawyer and status (day is NULL);
+* ``cases_due``: the same split by due date, for cases that have one;
+* ``bookings``: bookings per lawyer (the user behind the slot's
+  LawyerProfile) and status.
+
+Unassigned cases count under lawyer NULL.
+
+Signals turn every Case and Booking create, transition and delete into
++1/-1 deltas; core.caseops does the same for a whole bulk operation. The
+signals don't run for cases whose lawyer is deleted (SET_NULL is an
+UPDATE), so that lawyer's counters are moved to "unassigned" instead.
+``apply()`` adds the deltas with one ``UPDATE ... SET count = count +
+CASE ...`` inside the caller's transaction, so concurrent writers don't
+lose updates and a rollback undoes them. Counters that don't exist yet
+are inserted first.
+
+Nothing else keeps the table in step: bulk_create (seed_scale, bench),
+raw SQL, or moving a slot to another lawyer. ``rebuild()`` (``manage.py
+reconcile_caseload``) recomputes everything with three GROUP BY queries
+and reports how many counters were off.
+
+``summary()`` reads a bounded set of counters: the status totals plus
+this week's due dates, O(lawyers) rows, and never touches Case or Booking.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case as CaseWhen, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Availability, Booking, Case, CaseloadStat, User
+
+CASE_STATUSES = [status for status, _ in Case.STATUS]
+BOOKING_STATUSES = [status for status, _ in Booking.STATUS_CHOICES]
+DUE_STATUSES = ('open', 'pending')  # closed cases aren't "due"
+
+
+# Deltas
+
+def case_keys(lawyer_id, status, due_date):
+    keys = [('cases', lawyer_id, status, None)]
+    if due_date is not None:
+        keys.append(('cases_due', lawyer_id, status, due_date))
+    return keys
+
+
+def case_deltas(old, new, using=None):
+    """
+    Deltas for a case going from ``old`` to ``new``, each a
+    ``(lawyer_id, status, due_date)`` tuple or None (created/deleted).
+    """
+    deltas = Counter()
+    for key in case_keys(*old) if old else ():
+        deltas[key] -= 1
+    for key in case_keys(*new) if new else ():
+        deltas[key] += 1
+    return deltas
+
+
+def booking_deltas(old, new, using=None):
+    """
+    Deltas for a booking going from ``old`` to ``new``, each an
+    ``(availability_id, status)`` tuple or None; one query per slot.
+    """
+    deltas = Counter()
+    if old:
+        deltas['bookings', booking_lawyer(old[0], using), old[1], None] -= 1
+    if new:
+        deltas['bookings', booking_lawyer(new[0], using), new[1], None] += 1
+    return deltas
+
+
+def booking_lawyer(availability_id, using=None):
+    return (Availability.objects.using(using).filter(pk=availability_id)
+            .values_list('lawyer__user_id', flat=True).first())
+
+
+def apply(deltas, using=None):
+    """
+    Add a Counter of ``{(metric, lawyer_id, status, day): delta}`` to the
+    counters: one query for the counters that exist, one INSERT for the
+    missing ones, then a single UPDATE with a CASE per distinct delta,
+    however many cases the deltas came from.
+    """
+    using = using or 'default'
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    stats = CaseloadStat.objects.using(using)
+    for keys in _chunks(sorted(deltas, key=_order), 200):
+        existing = set(stats.filter(_matching(keys)).values_list('metric', 'lawyer_id', 'status', 'day'))
+        # ignore_conflicts: a concurrent writer may insert the same counter first
+        stats.bulk_create([
+            CaseloadStat(metric=metric, lawyer_id=lawyer_id, status=status, day=day)
+            for metric, lawyer_id, status, day in keys if (metric, lawyer_id, status, day) not in existing
+        ], ignore_conflicts=True)
+        by_delta = defaultdict(list)
+        for key in keys:
+            by_delta[deltas[key]].append(key)
+        stats.filter(_matching(keys)).update(count=F('count') + CaseWhen(
+            *[When(_matching(same), then=Value(delta)) for delta, same in sorted(by_delta.items())],
+            default=Value(0),
+        ))
+
+
+def _order(key):
+    metric, lawyer_id, status, day = key
+    return metric, lawyer_id or 0, status, day.toordinal() if day else 0
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _matching(keys):
+    condition = Q(pk__in=[])
+    for metric, lawyer_id, status, day in keys:
+        condition |= Q(metric=metric, lawyer_id=lawyer_id, status=status, day=day)
+    return condition
+
+
+def lawyer_removed(lawyer_id, using=None):
+    """Move a deleted lawyer's case counters to "unassigned", as Case.lawyer's SET_NULL does."""
+    using = using or 'default'
+    stats = CaseloadStat.objects.using(using).filter(lawyer_id=lawyer_id, metric__in=('cases', 'cases_due'))
+    deltas = Counter()
+    for metric, status, day, count in stats.values_list('metric', 'status', 'day', 'count'):
+        deltas[metric, None, status, day] += count
+    stats.delete()
+    apply(deltas, using)
+
+
+# Reconcile
+
+def expected(using=None):
+    """The counters computed from scratch: ``{key: count}``."""
+    counts = Counter()
+    cases = Case.objects.using(using).order_by()
+    for lawyer_id, status, n in cases.values_list('lawyer_id', 'status').annotate(n=Count('pk')):
+        counts['cases', lawyer_id, status, None] = n
+    due = cases.filter(due_date__isnull=False).values_list('lawyer_id', 'status', 'due_date')
+    for lawyer_id, status, day, n in due.annotate(n=Count('pk')):
+        counts['cases_due', lawyer_id, status, day] = n
+    bookings = Booking.objects.using(using).order_by().values_list('availability__lawyer__user_id', 'status')
+    for lawyer_id, status, n in bookings.annotate(n=Count('pk')):
+        counts['bookings', lawyer_id, status, None] = n
+    return counts
+
+
+def rebuild(using=None):
+    """
+    Replace the counters with ``expected()``; return the number of
+    counters that were wrong or missing (0 when the table was in step).
+    """
+    using = using or 'default'
+    with transaction.atomic(using=using):
+        current = {
+            (metric, lawyer_id, status, day): count
+            for metric, lawyer_id, status, day, count in CaseloadStat.objects.using(using)
+            .select_for_update().values_list('metric', 'lawyer_id', 'status', 'day', 'count')
+        }
+        counts = expected(using)
+        drift = sum(1 for key in set(current) | set(counts) if current.get(key, 0) != counts.get(key, 0))
+        CaseloadStat.objects.using(using).all().delete()
+        CaseloadStat.objects.using(using).bulk_create(
+            CaseloadStat(metric=metric, lawyer_id=lawyer_id, status=status, day=day, count=count)
+            for (metric, lawyer_id, status, day), count in counts.items() if count
+        )
+    return drift
+
+
+# Reading
+
+def week(today=None):
+    """Monday and Sunday of the week containing ``today``."""
+    today = today or timezone.localdate()
+    monday = today - timedelta(days=today.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def summary(lawyer=None, today=None, using=None):
+    """
+    Per-lawyer rows for the stats panel, busiest first, plus the totals.
+    ``lawyer`` limits it to one lawyer's row. Two queries: the counters and
+    the lawyers' names.
+    """
+    monday, sunday = week(today)
+    stats = CaseloadStat.objects.using(using).filter(
+        Q(metric__in=('cases', 'bookings')) |
+        Q(metric='cases_due', status__in=DUE_STATUSES, day__range=(monday, sunday))
+    )
+    if lawyer is not None:
+        stats = stats.filter(lawyer=lawyer)
+
+    def empty():
+        return {
+            'cases': dict.fromkeys(CASE_STATUSES, 0),
+            'due_this_week': 0,
+            'bookings': dict.fromkeys(BOOKING_STATUSES, 0),
+        }
+
+    rows, totals = {}, empty()
+    for metric, lawyer_id, status, count in stats.values_list('metric', 'lawyer_id', 'status', 'count'):
+        for row in (rows.setdefault(lawyer_id, empty()), totals):
+            if metric == 'cases_due':
+                row['due_this_week'] += count
+            elif status in row[metric]:
+                row[metric][status] += count
+
+    names = {
+        user.pk: user.get_full_name() or user.username
+        for user in User.objects.using(using).filter(pk__in=set(rows) - {None})
+        .only('username', 'first_name', 'last_name')
+    }
+    for lawyer_id, row in rows.items():
+        row['lawyer_id'] = lawyer_id
+        row['lawyer'] = names.get(lawyer_id, 'Unassigned' if lawyer_id is None else f'user {lawyer_id}')
+    ordered = sorted(
+        (row for row in rows.values() if any(row['cases'].values()) or any(row['bookings'].values())),
+        key=lambda row: (-row['cases']['open'] - row['cases']['pending'], row['lawyer'].lower()),
+    )
+    return {'lawyers': ordered, 'totals': totals, 'week': (monday, sunday)}
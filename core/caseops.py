@@ -0,0 +1,143 @@
+"""
+Set-based bulk operations on cases: status change, lawyer reassignment
+and due date shifts, for the CaseAdmin actions and
+``manage.py reassign_cases``.
+
+Going through Case.save() costs a few queries per case plus the signal
+work. Instead each operation runs in one transaction:
+
+1. one query reads the matching cases that would actually change, with
+   the columns the side effects need;
+2. one UPDATE per CASEOPS_CHUNK_SIZE ids applies the change and bumps
+   version/updated_at the way Case.save does (conditional GET relies on
+   them);
+3. what the Case signals would have done happens in bulk: sync change
+   log entries (core.sync.record_bulk), case activity entries
+   (core.activity.record_many), caseload counter deltas
+   (core.caseload.apply) and, for status changes, the status
+   notifications (core.notifications.notify_many);
+4. one CaseBulkChange row records who did what to which cases.
+
+Each function returns that CaseBulkChange; ``updated`` and ``unchanged``
+are the counts.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from . import activity, caseload, sync
+from .models import Case, CaseActivity, CaseBulkChange
+from .notifications import notify_many
+
+FIELDS = ('pk', 'title', 'status', 'lawyer_id', 'client__user_id', 'due_date')
+KEEP = object()
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _apply(cases, action, params, changes, assignments, *, actor=None, source='admin', lawyer_id=KEEP):
+    """
+    Update the cases in ``cases`` matching ``changes`` (a Q) with
+    ``assignments``. ``lawyer_id`` is the new lawyer's id when the
+    operation reassigns, for the change log scope.
+    """
+    db = cases.db
+    chunk_size = getattr(settings, 'CASEOPS_CHUNK_SIZE', 500)
+    with transaction.atomic(using=db):
+        matched = cases.count()
+        rows = list(cases.filter(changes).order_by('pk').values_list(*FIELDS))
+        now = timezone.now()
+        updated = 0
+        for chunk in _chunks([row[0] for row in rows], chunk_size):
+            # ``changes`` again, in case a row changed since it was read
+            updated += Case.objects.using(db).filter(changes, pk__in=chunk).update(
+                **assignments, version=F('version') + 1, updated_at=now,
+            )
+
+        sync.record_bulk('case', (
+            (pk, (client_user_id, old_lawyer_id, None),
+             (client_user_id, old_lawyer_id if lawyer_id is KEEP else lawyer_id, None))
+            for pk, _, _, old_lawyer_id, client_user_id, _ in rows
+        ), using=db)
+        caseload.apply(_caseload_deltas(action, params, rows, lawyer_id), using=db)
+        if action == 'status':
+            status = assignments['status']
+            label = dict(Case.STATUS)[status].lower()
+            notifications = []
+            for pk, title, previous, case_lawyer_id, client_user_id, _ in rows:
+                subject = f'Case "{title}" is now {label}'
+                payload = {'case_id': pk, 'status': status, 'previous': previous}
+                for recipient_id in {client_user_id, case_lawyer_id} - {None}:
+                    notifications.append((recipient_id, 'case_status', subject, subject + '.', payload))
+            notify_many(notifications, using=db)
+
+        change = CaseBulkChange.objects.using(db).create(
+            action=action, params=params, case_ids=[row[0] for row in rows],
+            updated=updated, unchanged=matched - updated, actor=actor, source=source,
+        )
+        activity.record_many(_activity(change, rows, assignments, lawyer_id, db), using=db)
+        return change
+
+
+def _caseload_deltas(action, params, rows, lawyer_id):
+    deltas = Counter()
+    for _, _, status, old_lawyer_id, _, due_date in rows:
+        new = [old_lawyer_id, status, due_date]
+        if action == 'status':
+            new[1] = params['status']
+        elif action == 'reassign':
+            new[0] = lawyer_id
+        else:
+            new[2] = due_date + timedelta(days=params['days'])
+        deltas.update(caseload.case_deltas((old_lawyer_id, status, due_date), tuple(new)))
+    return deltas
+
+
+def _activity(change, rows, assignments, lawyer_id, db):
+    """The entries the Case signals would have recorded, one per changed case."""
+    detail = {'bulk_change': change.pk}
+    if change.action == 'status':
+        for pk, _, previous, _, _, _ in rows:
+            yield CaseActivity(case_id=pk, verb='status', actor=change.actor,
+                               detail={'from': previous, 'to': assignments['status'], **detail})
+    elif change.action == 'reassign':
+        labels = activity.user_labels({row[3] for row in rows} | {lawyer_id}, db)
+        for pk, _, _, old_lawyer_id, _, _ in rows:
+            yield CaseActivity(case_id=pk, verb='reassigned', actor=change.actor,
+                               detail={'from': labels[old_lawyer_id], 'to': labels[lawyer_id], **detail})
+    else:
+        days = timedelta(days=change.params['days'])
+        for pk, _, _, _, _, due_date in rows:
+            yield CaseActivity(case_id=pk, verb='due_date', actor=change.actor, detail={
+                'from': due_date.isoformat(), 'to': (due_date + days).isoformat(), **detail,
+            })
+
+
+def set_status(cases, status, **kwargs):
+    """Move ``cases`` to ``status``; cases already there are left alone."""
+    if status not in dict(Case.STATUS):
+        raise ValueError(f"Unknown case status {status!r}.")
+    return _apply(cases, 'status', {'status': status}, ~Q(status=status), {'status': status}, **kwargs)
+
+
+def reassign(cases, lawyer, **kwargs):
+    """Assign ``cases`` to ``lawyer`` (a User, or None to unassign)."""
+    if lawyer is None:
+        return _apply(cases, 'reassign', {'lawyer': None}, Q(lawyer__isnull=False), {'lawyer': None},
+                      lawyer_id=None, **kwargs)
+    return _apply(cases, 'reassign', {'lawyer': lawyer.pk}, ~Q(lawyer=lawyer), {'lawyer': lawyer},
+                  lawyer_id=lawyer.pk, **kwargs)
+
+
+def shift_due_dates(cases, days, **kwargs):
+    """Move due dates by ``days`` (negative for earlier); cases without one are skipped."""
+    changes = Q(due_date__isnull=False) if days else Q(pk__in=[])
+    shifted = ExpressionWrapper(F('due_date') + timedelta(days=days), output_field=DateField())
+    return _apply(cases, 'shift_due', {'days': days}, changes, {'due_date': shifted}, **kwargs)
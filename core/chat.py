@@ -0,0 +1,160 @@
+"""
+Chat rooms: membership lookups, history, read pointers, unread counts and
+full-text search.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import ChatMembership, Message
+
+# Messages rendered by the chat_room page; older ones stay in the database
+HISTORY_LIMIT = 50
+
+
+def membership_for(user, room_name):
+    """Return the user's membership in ``room_name`` (room selected), or None."""
+    return (
+        ChatMembership.objects
+        .select_related('room')
+        .filter(user=user, room__name=room_name)
+        .first()
+    )
+
+
+def recent_history(room_id, limit=HISTORY_LIMIT):
+    """Return the last ``limit`` messages of a room, oldest first."""
+    latest = (
+        Message.objects
+        .filter(room_id=room_id)
+        .select_related('sender')
+        .order_by('-id')[:limit]
+    )
+    return list(reversed(latest))
+
+
+def mark_room_read(user, room_id, message_id):
+    """Move the user's read pointer forward to ``message_id`` (never back)."""
+    (
+        ChatMembership.objects
+        .filter(user=user, room_id=room_id, last_read_id__lt=message_id)
+        .update(last_read_id=message_id)
+    )
+
+
+def unread_counts(user):
+    """
+    Return ``{room_name: unread}`` for every room the user belongs to,
+    computed with a single grouped query over the (room, id) index.
+    """
+    unread = Count(
+        'room__messages',
+        filter=Q(room__messages__id__gt=F('last_read_id')) & ~Q(room__messages__sender=user),
+    )
+    rows = (
+        ChatMembership.objects
+        .filter(user=user)
+        .annotate(unread=unread)
+        .values_list('room__name', 'unread')
+    )
+    return dict(rows)
+
+
+# Full-text search. Highlight markers are control characters so that the
+# snippet can be HTML-escaped before they are turned into <mark> tags.
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+SEARCH_PAGE_SIZE = 20
+
+
+def fts_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last word also matches as a prefix so results appear while typing.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def _fallback_snippet(text, words, width=120):
+    """Snippet + highlighting for backends without FTS5."""
+    lowered = text.lower()
+    hit = min((lowered.find(word.lower()) for word in words if word.lower() in lowered), default=0)
+    start = max(hit - width // 3, 0)
+    snippet = ('…' if start else '') + text[start:start + width] + ('…' if start + width < len(text) else '')
+    for word in words:
+        snippet = re.sub(
+            f'({re.escape(word)})', f'{HIGHLIGHT_START}\\1{HIGHLIGHT_END}', snippet, flags=re.IGNORECASE
+        )
+    return snippet
+
+
+def search_messages(user, text, sender=None, start=None, end=None, page=1, per_page=SEARCH_PAGE_SIZE):
+    """
+    Search messages in every room ``user`` belongs to.
+
+    Returns ``(results, total)`` where results are dicts with the message,
+    its room, sender, timestamp and a highlighted snippet, best match first.
+    ``start``/``end`` are inclusive dates; ``sender`` is a username.
+    """
+    match = fts_query(text or '')
+    if match is None:
+        return [], 0
+    offset = (page - 1) * per_page
+
+    filters = Message.objects.visible_to(user)
+    if sender:
+        filters = filters.filter(sender__username=sender)
+    if start:
+        filters = filters.filter(timestamp__date__gte=start)
+    if end:
+        filters = filters.filter(timestamp__date__lte=end)
+
+    if connection.vendor == 'sqlite':
+        # Restrict to visible ids with the ORM, rank and snippet with FTS5
+        visible_sql, visible_params = filters.values('id').query.sql_with_params()
+        base = (
+            f"FROM core_message_fts JOIN core_message m ON m.id = core_message_fts.rowid "
+            f"WHERE core_message_fts MATCH %s AND m.id IN ({visible_sql})"
+        )
+        params = [match, *visible_params]
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) {base}", params)
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT m.id, snippet(core_message_fts, 0, %s, %s, '…', 16) {base} "
+                f"ORDER BY bm25(core_message_fts), m.id DESC LIMIT %s OFFSET %s",
+                [HIGHLIGHT_START, HIGHLIGHT_END, *params, per_page, offset],
+            )
+            ranked = cursor.fetchall()
+    else:
+        words = re.findall(r'\w+', text)
+        matching = filters
+        for word in words:
+            matching = matching.filter(text__icontains=word)
+        total = matching.count()
+        ranked = [
+            (pk, _fallback_snippet(body, words))
+            for pk, body in matching.order_by('-id').values_list('id', 'text')[offset:offset + per_page]
+        ]
+
+    messages = Message.objects.select_related('room', 'sender').in_bulk([pk for pk, _ in ranked])
+    results = [
+        {'message': messages[pk], 'snippet': highlight(snippet)}
+        for pk, snippet in ranked if pk in messages
+    ]
+    return results, total
@@ -0,0 +1,112 @@
+"""
+Conditional GET for the case and client detail pages.
+
+A single aggregate query gives each page's freshness:
+
+* case page - the case's version and updated_at (documents bump both,
+  see signals), the client's updated_at, since the client's name is
+  shown, and the newest activity entry (core.activity) for the timeline;
+* client page - the client's updated_at plus the count, summed versions
+  and latest updated_at of the cases the viewer can see.
+
+That becomes an ETag and Last-Modified. A matching GET gets a 304 before
+the view runs, so no documents are loaded and no template is rendered.
+
+The ETag also covers the viewer, their role and their CSRF secret, since
+the pages embed a form. As in core.pagecache, If-Modified-Since only
+counts together with If-None-Match. Requests with pending flash messages
+always render, so the messages are shown.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import activity
+from .models import Case, CaseActivity, Client
+
+
+def _latest(*timestamps):
+    return max((ts for ts in timestamps if ts is not None), default=None)
+
+
+def case_freshness(user, pk):
+    """Return ``(etag parts, last modified)`` for a case page, or None if not visible."""
+    # This case's buffered entries must count before the page can be a 304
+    activity.flush(pk)
+    latest_activity = CaseActivity.objects.timeline(OuterRef('pk')).values('pk')[:1]
+    row = (
+        Case.objects.visible_to(user).filter(pk=pk)
+        .annotate(latest_activity=Subquery(latest_activity))
+        .values_list('version', 'updated_at', 'client__updated_at', 'latest_activity')
+        .first()
+    )
+    if row is None:
+        return None
+    version, updated_at, client_updated_at, latest_activity = row
+    return (version, updated_at, client_updated_at, latest_activity), _latest(updated_at, client_updated_at)
+
+
+def client_freshness(user, pk):
+    """Return ``(etag parts, last modified)`` for a client page, or None if not visible."""
+    cases = Case.objects.visible_to(user).filter(client=OuterRef('pk')).order_by().values('client')
+    row = (
+        Client.objects.visible_to(user).filter(pk=pk)
+        .annotate(
+            case_count=Subquery(cases.annotate(n=Count('pk')).values('n')),
+            case_versions=Subquery(cases.annotate(n=Sum('version')).values('n')),
+            cases_updated_at=Subquery(cases.annotate(n=Max('updated_at')).values('n')),
+        )
+        .values_list('updated_at', 'case_count', 'case_versions', 'cases_updated_at')
+        .first()
+    )
+    if row is None:
+        return None
+    return row, _latest(row[0], row[3])
+
+
+def _etag(request, name, pk, parts):
+    user = request.user
+    secret = request.META.get('CSRF_COOKIE', '')
+    key = f"{name}:{pk}:{parts!r}:{user.pk}:{user.has_firm_access}:{secret}"
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def conditional_page(freshness):
+    """
+    Decorator for ``view(request, pk)``. GET/HEAD requests matching the
+    current ETag get a 304 without calling the view; other responses get
+    validators attached. Unsafe methods and invisible objects go straight
+    to the view, which handles them (form posts, 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, pk, *args, **kwargs):
+            # len() loads pending messages without marking them as shown
+            if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return view(request, pk, *args, **kwargs)
+            state = freshness(request.user, pk)
+            if state is None:
+                return view(request, pk, *args, **kwargs)
+            parts, modified = state
+            modified = int(modified.timestamp()) if modified else None
+
+            etag = _etag(request, view.__name__, pk, parts)
+            last_modified = modified if 'HTTP_IF_NONE_MATCH' in request.META else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, pk, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                # Rendering may have issued the CSRF cookie the ETag depends on
+                etag = _etag(request, view.__name__, pk, parts)
+            response['ETag'] = etag
+            if modified:
+                response['Last-Modified'] = http_date(modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,76 +1,203 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.contrib.auth.models import User
-from asgiref.sync import sync_to_async
-from .models import Message
-from core import consumers
 from channels.db import database_sync_to_async
+from .dbtuning import retry_on_locked
+from .chat import mark_room_read, membership_for
+from .metrics import InstrumentedConsumerMixin
+from .models import Message
+from .notifications import user_group_name
+from .presence import registry as presence
+from . import wire
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
     async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        # Membership is checked once here; everything after uses the room id
         self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.room_group_name = f"chat_{self.room_name}"
+        self.room_id = await self.get_room_id(self.user, self.room_name)
+        if self.room_id is None:
+            await self.close()
+            return
+        self.room_group_name = f"chat_{self.room_id}"
+        self.protocol = wire.negotiate(self.scope)
 
         # Join group
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
-        await self.accept()
+        await self.accept(subprotocol=self.protocol)
+
+        # Tell everyone (in every process) we're here; they answer with
+        # presence_announce so our registry learns who was already online.
+        presence.join(self.room_id, self.channel_name, self.user.pk, self.user.username)
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'presence_join',
+                'channel': self.channel_name,
+                'user_id': self.user.pk,
+                'username': self.user.username,
+            }
+        )
 
     async def disconnect(self, close_code):
+        if not hasattr(self, 'room_group_name'):
+            return
+        presence.leave(self.room_id, self.channel_name)
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {'type': 'presence_leave', 'channel': self.channel_name}
+        )
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = wire.decode_frame(text_data, bytes_data)
+        except wire.WireError:
+            return
         message = data.get('message')
-        sender = data.get('sender')
         signal = data.get('signal')
+        read = data.get('read')
+        # A message id from the client; anything else (strings, lists, floats,
+        # ids SQLite can't store) is ignored rather than closing the socket
+        if isinstance(read, bool) or not isinstance(read, int) or not 0 < read < 2 ** 63:
+            read = None
+        sender = self.user.username
 
+        # Frames are encoded (JSON and MessagePack) once here and fanned out to every member
         if message:
-            await self.save_message(self.room_name, message, sender)
-            # Handle WebRTC signaling messages
+            saved = await self.save_message(self.room_id, self.user, message)
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
-                    'message': message,
-                    'sender': sender,
+                    **wire.encode_frame({
+                        'id': saved.pk,
+                        'message': message,
+                        'sender': sender,
+                    }),
                 }
             )
-        
+
+        # Handle WebRTC signaling messages
         if signal:
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'signal_message',
-                    'signal': signal,
-                    'sender': sender,
+                    **wire.encode_frame({
+                        'type': 'signal',
+                        'signal': signal,
+                        'sender': sender,
+                    }),
+                }
+            )
+
+        if read:
+            await self.mark_read(self.room_id, self.user, read)
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'read_receipt',
+                    **wire.encode_frame({
+                        'type': 'read',
+                        'message_id': read,
+                        'sender': sender,
+                    }),
                 }
             )
-    async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            'message': event['message'],
-            'sender': event['sender'],
-        }))
 
+    async def send_frame(self, frame):
+        """Send a frame from wire.encode_frame in the negotiated format; both were encoded by the sender."""
+        if self.protocol == wire.MSGPACK:
+            await self.send(bytes_data=frame['bytes'])
+        else:
+            await self.send(text_data=frame['text'])
+
+    async def chat_message(self, event):
+        await self.send_frame(event)
 
     async def signal_message(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'signal',
-            'signal': event['signal'],
-            'sender': event['sender'],
-        }))
+        await self.send_frame(event)
+
+    async def read_receipt(self, event):
+        await self.send_frame(event)
+
+    async def presence_join(self, event):
+        presence.join(self.room_id, event['channel'], event['user_id'], event['username'])
+        if event['channel'] != self.channel_name:
+            await self.channel_layer.send(event['channel'], {
+                'type': 'presence_announce',
+                'channel': self.channel_name,
+                'user_id': self.user.pk,
+                'username': self.user.username,
+            })
+        await self.send_presence()
 
+    async def presence_announce(self, event):
+        presence.join(self.room_id, event['channel'], event['user_id'], event['username'])
+        await self.send_presence()
+
+    async def presence_leave(self, event):
+        presence.leave(self.room_id, event['channel'])
+        await self.send_presence()
+
+    async def send_presence(self):
+        online = presence.online(self.room_id)
+        payload = {'type': 'presence', 'online': sorted(online.values())}
+        # Presence is per-recipient state, so only our own format is encoded
+        if self.protocol == wire.MSGPACK:
+            await self.send(bytes_data=wire.packb(payload))
+        else:
+            await self.send(text_data=json.dumps(payload))
 
     @database_sync_to_async
-    def save_message(self, room_name, sender_username, text):
-        try:
-            sender = User.objects.get(username=sender_username)
-        except User.DoesNotExist:
+    def get_room_id(self, user, room_name):
+        membership = membership_for(user, room_name)
+        return membership.room_id if membership else None
+
+    @database_sync_to_async
+    @retry_on_locked
+    def save_message(self, room_id, sender, text):
+        return Message.objects.create(room_id=room_id, sender=sender, text=text)
+
+    @database_sync_to_async
+    @retry_on_locked
+    def mark_read(self, room_id, user, message_id):
+        mark_room_read(user, room_id, message_id)
+
+
+class NotificationConsumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
+    """Pushes outbox notifications to every open tab of the logged-in user."""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
             return
-        Message.objects.create(room_name=room_name, sender=sender, text=text)
+        self.group_name = user_group_name(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notify(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification',
+            'id': event['id'],
+            'kind': event['kind'],
+            'subject': event['subject'],
+            'body': event['body'],
+            'payload': event['payload'],
+        }))
@@ -0,0 +1,143 @@
+"""
+Primary/replica database routing.
+
+Writes always go to PRIMARY_DATABASE. Reads go to a random alias from
+REPLICA_DATABASES, except when the replica could be behind what the
+current user expects to see:
+
+* inside a transaction on the primary;
+* later in a request (or WebSocket connection) that has already written;
+* for REPLICA_PIN_SECONDS after any request that wrote. The
+  ``primary_pin`` cookie set by ReplicaPinningMiddleware carries this
+  read-your-writes window to the browser's next requests;
+* for apps in PRIMARY_ONLY_APPS (sessions, so a fresh login is never lost);
+* inside ``pin_to_primary()``, which also works as a view decorator.
+
+With no replicas configured every read goes to the primary, as before.
+"""
+import random
+import time
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+PIN_COOKIE = 'primary_pin'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_pinned = ContextVar('primary_pinned', default=False)
+_wrote = ContextVar('primary_wrote', default=False)
+
+
+def primary_alias():
+    return getattr(settings, 'PRIMARY_DATABASE', 'default')
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def must_use_primary():
+    return _pinned.get() or _wrote.get() or connections[primary_alias()].in_atomic_block
+
+
+class pin_to_primary(ContextDecorator):
+    """Send every read in the block (or decorated view) to the primary."""
+
+    def __enter__(self):
+        self._token = _pinned.set(True)
+        return self
+
+    def __exit__(self, *exc_info):
+        _pinned.reset(self._token)
+        return False
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """
+    Start a fresh read-your-writes scope (one request or socket). Writes
+    made before the scope don't pin reads inside it and vice versa.
+    """
+    pinned_token = _pinned.set(pinned)
+    wrote_token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
+
+
+def wrote_in_scope():
+    return _wrote.get()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or model._meta.app_label in PRIMARY_ONLY_APPS or must_use_primary():
+            return primary_alias()
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return primary_alias()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {primary_alias(), *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Real replicas get their schema through replication; local stand-ins
+        # (tests, development) are migrated explicitly with --database.
+        return None
+
+
+def pin_from_cookie(value):
+    try:
+        return float(value) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+class ReplicaPinningMiddleware:
+    """
+    Tracks writes per request. Unsafe methods, requests that wrote, and
+    requests inside a previous write's pin window read from the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or pin_from_cookie(request.COOKIES.get(PIN_COOKIE))
+        )
+        with routing_scope(pinned):
+            response = self.get_response(request)
+            if wrote_in_scope():
+                seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+                response.set_cookie(
+                    PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax',
+                )
+        return response
+
+
+class ReplicaPinningWebSocketMiddleware:
+    """
+    Channels counterpart: a socket opened inside a pin window (e.g. right
+    after the page that created the chat room) reads from the primary.
+    Sits inside CookieMiddleware so ``scope['cookies']`` is populated.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        with routing_scope(pin_from_cookie((scope.get('cookies') or {}).get(PIN_COOKIE))):
+            return await self.inner(scope, receive, send)
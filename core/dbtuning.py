@@ -0,0 +1,90 @@
+"""
+SQLite tuning.
+
+``apply_sqlite_pragmas`` runs on every new SQLite connection (wired in
+CoreConfig.ready) and applies the SQLITE_PRAGMAS setting, or when it isn't
+set, DEFAULT_PRAGMAS below:
+
+* WAL journal, so readers never block the writer and vice versa;
+* ``synchronous=NORMAL``, which is durable in WAL mode except on power
+  loss, and much cheaper than FULL;
+* ``busy_timeout``, so a writer waits for the lock instead of failing;
+* a larger page cache and memory-mapped reads.
+
+Even with busy_timeout, SQLite refuses, without waiting, to upgrade a read
+transaction to a write when another writer got in first. ``retry_on_locked``
+re-runs such units of work with a short backoff.
+"""
+import functools
+import logging
+import random
+import time
+from collections import Counter
+from threading import Lock
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # ms
+    'cache_size': -20000,       # negative = KiB, so 20 MB
+    'mmap_size': 134217728,     # 128 MB
+    'temp_store': 'MEMORY',
+}
+
+_lock_retries = Counter()
+_lock_retries_lock = Lock()
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            # In-memory test databases silently stay in 'memory' journal mode
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def is_locked_error(exc):
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_locked(func=None, *, attempts=5, base_delay=0.05, using='default'):
+    """
+    Decorator re-running ``func`` when SQLite reports the database as
+    locked. ``func`` must be a complete unit of work (usually wrapping its
+    own transaction.atomic); inside an outer atomic block nothing is
+    retried, since the outer transaction is already broken.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if (
+                        not is_locked_error(exc)
+                        or attempt == attempts
+                        or connections[using].in_atomic_block
+                    ):
+                        raise
+                    with _lock_retries_lock:
+                        _lock_retries[func.__qualname__] += 1
+                    delay = base_delay * 2 ** (attempt - 1)
+                    logger.info("Database locked in %s, retry %d in %.2fs", func.__qualname__, attempt, delay)
+                    time.sleep(delay * random.uniform(0.5, 1.5))
+        return wrapper
+    return decorator(func) if func is not None else decorator
+
+
+def lock_retry_counts():
+    """Retries per function since the process started."""
+    with _lock_retries_lock:
+        return dict(_lock_retries)
@@ -4,7 +4,7 @@ def group_required(*group_names):
     """Requires user to be in at least one of the specified groups."""
     def in_groups(u):
         if u.is_authenticated:
-            if bool(u.groups.filter(name__in=group_names)) or u.is_superuser:
+            if u.is_superuser or not u.group_names.isdisjoint(group_names):
                 return True
         return False
     return user_passes_test(in_groups)
@@ -0,0 +1,51 @@
+"""
+Cached, pre-serialized lawyer directory.
+
+The directory is read on every visit to the lawyers page and by client apps
+through the JSON endpoint, but only changes when a LawyerProfile or its User
+is edited. We serialize it once into plain dicts and keep it in the cache
+until one of those models is saved or deleted (see core.signals).
+"""
+from django.core.cache import cache
+
+from .models import LawyerProfile
+
+DIRECTORY_CACHE_KEY = 'core:lawyer_directory'
+DIRECTORY_CACHE_TIMEOUT = 60 * 60  # one hour, invalidated early by signals
+
+
+def serialize_lawyer(profile):
+    user = profile.user
+    return {
+        'id': profile.pk,
+        'user_id': user.pk,
+        'name': user.get_full_name() or user.username,
+        'email': user.email,
+        'bio': profile.bio,
+        'photo_url': profile.photo.url if profile.photo else None,
+        'thumbnail_url': profile.thumbnail.url if profile.thumbnail else None,
+    }
+
+
+def build_lawyer_directory():
+    """Serialize every lawyer profile with a single joined query."""
+    profiles = (
+        LawyerProfile.objects
+        .select_related('user')
+        .filter(user__is_active=True)
+        .order_by('user__last_name', 'user__first_name', 'user__username')
+    )
+    return [serialize_lawyer(profile) for profile in profiles]
+
+
+def get_lawyer_directory():
+    """Return the cached directory, rebuilding it on a miss."""
+    directory = cache.get(DIRECTORY_CACHE_KEY)
+    if directory is None:
+        directory = build_lawyer_directory()
+        cache.set(DIRECTORY_CACHE_KEY, directory, DIRECTORY_CACHE_TIMEOUT)
+    return directory
+
+
+def invalidate_lawyer_directory():
+    cache.delete(DIRECTORY_CACHE_KEY)
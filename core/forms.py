@@ -6,7 +6,8 @@ from django.core.validators import validate_email
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth import get_user_model, password_validation
 from django.contrib.auth.password_validation import password_validators_help_text_html
-from .models import Visitor, Client, Case, Document, Appointment, Availability
+from django.urls import reverse
+from .models import Visitor, Client, Case, Document, Appointment, Availability, LawyerProfile
 
 User = get_user_model()
 
@@ -268,11 +269,41 @@ class ClientProfileForm(forms.ModelForm):
             
         return client
 
+class AutocompleteSelect(forms.Select):
+    """
+    A <select> holding only the selected option, so rendering it never
+    loads the whole table. autocomplete.js (see base.html) fetches the
+    other options from the ``source`` endpoint in core.autocomplete as the
+    user types. The field still validates against its own queryset.
+    """
+    def __init__(self, source, attrs=None):
+        super().__init__(attrs)
+        self.source = source
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse('autocomplete', args=[self.source])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = {str(v) for v in value if str(v) not in field.empty_values}
+        options = []
+        if field.empty_label is not None:
+            options.append(self.create_option(name, '', field.empty_label, not selected, 0))
+        if selected:
+            for obj in field.queryset.filter(**{f'{field.to_field_name or "pk"}__in': selected}):
+                options.append(self.create_option(
+                    name, field.prepare_value(obj), field.label_from_instance(obj), True, len(options),
+                ))
+        return [(None, options, 0)]
+
 class CaseForm(forms.ModelForm):
     class Meta:
         model = Case
         fields = ['title', 'client', 'description', 'status']
         widgets = {
+            'client': AutocompleteSelect('clients'),
             'description': forms.Textarea(attrs={'rows': 3}),
         }
 
@@ -281,13 +312,27 @@ class DocumentForm(forms.ModelForm):
         model = Document
         fields = ['title', 'file']
 
+class LawyerChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        return obj.user.get_full_name() or obj.user.username
+
 class AppointmentForm(forms.ModelForm):
+    """
+    Appointment booking form. The lawyer must be chosen here so that
+    Appointment.clean can check the slot against that lawyer's hours.
+    """
+    lawyer = LawyerChoiceField(
+        queryset=LawyerProfile.objects.select_related('user').order_by('user__last_name', 'user__first_name'),
+        widget=AutocompleteSelect('lawyers', attrs={'class': 'form-control'}),
+    )
+
     class Meta:
         model = Appointment
-        fields = ['date', 'time', 'message']
+        fields = ['lawyer', 'date', 'time', 'duration', 'message']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+            'duration': forms.Select(attrs={'class': 'form-control'}),
             'message': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Reason for appointment (optional)'}),
         }
 
@@ -0,0 +1,241 @@
+"""
+Visitor inquiry intake.
+
+The landing page never writes to the database itself. ``submit()`` appends
+the cleaned form data to an in-process buffer and returns. A background
+thread flushes the buffer whenever it holds VISITOR_INTAKE_BATCH_SIZE
+inquiries, or every VISITOR_INTAKE_FLUSH_SECONDS otherwise. Each flush:
+
+* drops duplicates - same email and normalized message within
+  VISITOR_DEDUPE_MINUTES, both inside the batch and against stored rows,
+* scores every inquiry for spam (cheap local heuristics, 0-100),
+* writes the survivors with a single bulk_create.
+
+The buffer is also flushed at interpreter exit. With
+VISITOR_INTAKE_BACKGROUND = False nothing runs in the background: full
+batches are written inline and ``flush()`` writes the rest.
+
+Accepted inquiries live only in the worker's memory until they are
+written, up to VISITOR_INTAKE_FLUSH_SECONDS or a batch. A crash or kill
+(anything that skips atexit) loses what is buffered. A failed write is
+retried on the next flush. After VISITOR_INTAKE_MAX_RETRIES failed
+flushes in a row, the buffered items are dropped and logged at ERROR,
+so a database that stays down doesn't grow the buffer without bound.
+"""
+import atexit
+import hashlib
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .dbtuning import retry_on_locked
+from .models import Visitor
+
+logger = logging.getLogger(__name__)
+
+SPAM_WORDS = {
+    'bitcoin', 'casino', 'crypto', 'viagra', 'cialis', 'loan', 'loans', 'seo', 'backlink',
+    'backlinks', 'ranking', 'traffic', 'forex', 'investment', 'winner', 'prize', 'unsubscribe',
+}
+DISPOSABLE_DOMAINS = {
+    'mailinator.com', 'guerrillamail.com', '10minutemail.com', 'tempmail.com', 'yopmail.com',
+    'trashmail.com', 'sharklasers.com',
+}
+URL_RE = re.compile(r'https?://|www\.|\[url', re.IGNORECASE)
+WORD_RE = re.compile(r'[^\W\d_]+')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_message(message):
+    return ' '.join(message.lower().split())
+
+
+def message_hash(message):
+    return hashlib.sha256(normalize_message(message).encode('utf-8')).hexdigest()
+
+
+def spam_score(name, email, message):
+    """Return 0 (clean) .. 100 (almost certainly spam)."""
+    score = 0
+    links = len(URL_RE.findall(message))
+    score += min(links * 15, 45)
+    if URL_RE.search(name):
+        score += 30
+    words = WORD_RE.findall(message.lower())
+    if words:
+        spammy = sum(word in SPAM_WORDS for word in words)
+        score += min(spammy * 10, 30)
+        letters = [ch for ch in message if ch.isalpha()]
+        upper = sum(ch.isupper() for ch in letters)
+        if len(letters) >= 20 and upper / len(letters) > 0.6:
+            score += 15
+    if len(normalize_message(message)) < 10:
+        score += 10
+    if re.search(r'(.)\1{5,}', message):
+        score += 10
+    if email.rsplit('@', 1)[-1].lower() in DISPOSABLE_DOMAINS:
+        score += 20
+    return min(score, 100)
+
+
+@retry_on_locked
+def write_batch(items):
+    """Dedupe, score and store buffered inquiries; return the number written."""
+    window = timedelta(minutes=_setting('VISITOR_DEDUPE_MINUTES', 60))
+    batch, last_kept = [], {}
+    for item in sorted(items, key=lambda item: item['submitted_at']):
+        item['email'] = item['email'].strip().lower()
+        item['message_hash'] = message_hash(item['message'])
+        key = (item['email'], item['message_hash'])
+        previous = last_kept.get(key)
+        # A repeat outside the window is a new inquiry, not a duplicate
+        if previous is None or item['submitted_at'] - previous['submitted_at'] > window:
+            batch.append(item)
+            last_kept[key] = item
+    if not batch:
+        return 0
+
+    earliest = min(item['submitted_at'] for item in batch) - window
+    stored = {}
+    for email, digest, submitted_at in (
+        Visitor.objects
+        .filter(
+            email__in={item['email'] for item in batch},
+            message_hash__in={item['message_hash'] for item in batch},
+            submitted_at__gte=earliest,
+        )
+        .values_list('email', 'message_hash', 'submitted_at')
+    ):
+        latest = stored.get((email, digest))
+        stored[(email, digest)] = max(latest, submitted_at) if latest else submitted_at
+
+    rows = []
+    for item in batch:
+        latest = stored.get((item['email'], item['message_hash']))
+        if latest is not None and abs(item['submitted_at'] - latest) <= window:
+            continue
+        rows.append(Visitor(
+            name=item['name'],
+            email=item['email'],
+            message=item['message'],
+            submitted_at=item['submitted_at'],
+            message_hash=item['message_hash'],
+            spam_score=spam_score(item['name'], item['email'], item['message']),
+        ))
+    Visitor.objects.bulk_create(rows)
+    return len(rows)
+
+
+class IntakeBuffer:
+    """
+    In-process write buffer. ``write(items)`` stores a batch; the
+    ``<prefix>_BATCH_SIZE``, ``<prefix>_FLUSH_SECONDS`` and
+    ``<prefix>_BACKGROUND`` settings control when, and
+    ``<prefix>_MAX_RETRIES`` how many failed flushes in a row are retried
+    before the buffer is dropped. Also used by core.activity.
+    """
+    def __init__(self, write, prefix='VISITOR_INTAKE', name='visitor-intake', batch_size=50, flush_seconds=2.0):
+        self._write = write
+        self._prefix = prefix
+        self._name = name
+        self._defaults = {'BATCH_SIZE': batch_size, 'FLUSH_SECONDS': flush_seconds, 'BACKGROUND': True,
+                          'MAX_RETRIES': 5}
+        self._items = []
+        self._failures = 0  # failed flushes in a row
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def _option(self, name):
+        return _setting(f'{self._prefix}_{name}', self._defaults[name])
+
+    def append(self, item):
+        self.extend([item])
+
+    def extend(self, items):
+        with self._lock:
+            self._items.extend(items)
+            full = len(self._items) >= self._option('BATCH_SIZE')
+        if not self._option('BACKGROUND'):
+            if full:
+                self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self, matching=None):
+        """Write the buffered items, or only those ``matching(item)`` accepts."""
+        with self._lock:
+            if matching is None:
+                items, self._items = self._items, []
+            else:
+                items, rest = [], []
+                for item in self._items:
+                    (items if matching(item) else rest).append(item)
+                self._items = rest
+        if not items:
+            return 0
+        try:
+            written = self._write(items)
+        except Exception:
+            with self._lock:
+                self._failures += 1
+                if self._failures <= self._option('MAX_RETRIES'):
+                    # Put them back so the next flush retries
+                    self._items[:0] = items
+                    items = None
+                else:
+                    self._failures = 0
+            if items is not None:
+                # Counts only: the items themselves hold personal data
+                logger.error("%s dropped %d items after %d failed flushes",
+                             self._name, len(items), self._option('MAX_RETRIES') + 1)
+            raise
+        with self._lock:
+            self._failures = 0
+        return written
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=self._option('FLUSH_SECONDS'))
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("%s flush failed", self._name)
+            finally:
+                close_old_connections()
+
+
+buffer = IntakeBuffer(write_batch)
+
+
+def submit(name, email, message):
+    """Queue an inquiry from the landing page form."""
+    buffer.append({'name': name, 'email': email, 'message': message, 'submitted_at': timezone.now()})
+
+
+def flush():
+    """Write everything currently buffered; return the number of rows stored."""
+    return buffer.flush()
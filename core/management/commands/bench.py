@@ -0,0 +1,373 @@
+"""
+End-to-end benchmark of the hot HTTP and WebSocket paths.
+
+Everything runs in-process against a scratch SQLite file (never the real
+database): HTTP scenarios through django.test.Client from a pool of
+threads, the chat scenario through WebsocketCommunicator over the
+in-memory channel layer with one socket per concurrent user.
+
+Latency is measured around each operation; queries come from the
+core.metrics histograms (MetricsMiddleware / InstrumentedConsumerMixin),
+which are cleared before every scenario. ``--save`` writes the results as
+JSON and ``--compare`` prints the change against such a file.
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as clock_time, timedelta
+
+import django
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client as TestClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core import caseload, metrics, presence
+from core.models import Availability, Case, ChatMembership, ChatRoom, Client, LawyerProfile
+from core.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+ADMIN_CHANGELISTS = ('case', 'client', 'document', 'appointment', 'visitor', 'notification')
+DAYS = ('MON', 'TUE', 'WED', 'THU', 'FRI')
+CASE_STATUSES = ('open', 'closed', 'pending')
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered), max(1, math.ceil(q * len(ordered)))) - 1]
+
+
+def summarize(latencies, elapsed, queries, errors=0):
+    ordered = sorted(latencies)
+    ops = len(ordered)
+    return {
+        'ops': ops,
+        'errors': errors,
+        'throughput': ops / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'queries_per_op': queries / ops if ops else 0.0,
+    }
+
+
+def compare(baseline, current):
+    """Rows of (scenario, metric, before, after, change %) for scenarios in both runs."""
+    rows = []
+    for name, after in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ('throughput', 'p95_ms', 'queries_per_op'):
+            old, new = before[metric], after[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            rows.append((name, metric, old, new, change))
+    return rows
+
+
+def regressions(rows, threshold):
+    """Rows that got worse by more than ``threshold`` percent."""
+    return [
+        row for row in rows
+        if (row[4] < -threshold if row[1] == 'throughput' else row[4] > threshold)
+    ]
+
+
+def recorded_queries():
+    series = metrics.registry.snapshot().get('queries', {})
+    return sum(total for _, _, total in series.values())
+
+
+class Suite:
+    """Seeded data plus one method per scenario; used by the command and its tests."""
+
+    scenarios = ('dashboard', 'case_detail', 'lawyer_availability', 'book_slot', 'admin_changelist', 'chat')
+
+    def __init__(self, concurrency=4, requests=200, seed=0):
+        self.concurrency = concurrency
+        self.requests = requests
+        self.seed = seed
+
+    # Data
+
+    def populate(self, clients=50, cases_per_client=4, lawyers=10):
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        lawyer_group, _ = Group.objects.get_or_create(name='Lawyer')
+        self.admin = User.objects.create_superuser(username='bench-admin', email='bench-admin@example.com')
+        admin_group.user_set.add(self.admin)
+
+        self.lawyers = []
+        for n in range(lawyers):
+            user = User.objects.create_user(username=f'bench-lawyer-{n}', email=f'bench-lawyer-{n}@example.com')
+            lawyer_group.user_set.add(user)
+            self.lawyers.append(LawyerProfile.objects.create(user=user, bio='General practice'))
+        self.slots = Availability.objects.bulk_create([
+            Availability(lawyer=lawyer, day=day, start_time=clock_time(9), end_time=clock_time(17))
+            for lawyer in self.lawyers for day in DAYS
+        ])
+
+        users = [
+            User.objects.create_user(username=f'bench-client-{n}', email=f'bench-client-{n}@example.com')
+            for n in range(clients)
+        ]
+        self.clients = Client.objects.bulk_create([
+            Client(user=user, name=f'Bench Client {n}', email=user.email) for n, user in enumerate(users)
+        ])
+        rng = random.Random(self.seed)
+        today = date.today()
+        self.cases = Case.objects.bulk_create([
+            Case(
+                title=f'Case {n} of {client.name}',
+                client=client,
+                description='Synthetic benchmark case. ' * 5,
+                lawyer=rng.choice(self.lawyers).user,
+                status=rng.choice(CASE_STATUSES),
+                due_date=today + timedelta(days=rng.randint(1, 120)),
+            )
+            for client in self.clients for n in range(cases_per_client)
+        ])
+        caseload.rebuild()  # bulk_create skips the signals that maintain it
+
+        self.room = ChatRoom.objects.create(name='bench-room')
+        self.chatters = users[:max(self.concurrency, 2)]
+        ChatMembership.objects.bulk_create([ChatMembership(room=self.room, user=user) for user in self.chatters])
+
+    # Drivers
+
+    def run(self, name):
+        metrics.registry.clear()
+        if name == 'chat':
+            latencies, elapsed, errors = asyncio.run(self.run_chat())
+        else:
+            latencies, elapsed, errors = self.run_http(getattr(self, f'op_{name}'))
+        return summarize(latencies, elapsed, recorded_queries(), errors)
+
+    def run_http(self, operation):
+        per_worker = max(1, self.requests // self.concurrency)
+        results = []
+        lock = threading.Lock()
+
+        def worker(n):
+            rng = random.Random(self.seed * 1000 + n)
+            http = TestClient()
+            local = []
+            try:
+                for _ in range(per_worker):
+                    started = time.perf_counter()
+                    ok = operation(http, rng)
+                    local.append((ok, time.perf_counter() - started))
+            finally:
+                connections.close_all()
+            with lock:
+                results.extend(local)
+
+        # One untimed pass warms templates, URL resolvers and sessions
+        operation(TestClient(), random.Random(self.seed))
+        metrics.registry.clear()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            list(pool.map(worker, range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for ok, latency in results if ok]
+        return latencies, elapsed, len(results) - len(latencies)
+
+    async def run_chat(self):
+        application = URLRouter(websocket_urlpatterns)
+        path = f'/ws/chat/{self.room.name}/'
+        per_socket = max(1, self.requests // self.concurrency)
+        sockets = []
+        for user in self.chatters[:self.concurrency]:
+            communicator = WebsocketCommunicator(application, path)
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise CommandError(f"Chat socket for {user.username} was rejected")
+            sockets.append((user, communicator))
+        await self.drain(sockets)
+        metrics.registry.clear()
+
+        async def chatter(n, user, communicator):
+            latencies, errors = [], 0
+            for i in range(per_socket):
+                text = f'bench {n}-{i}'
+                started = time.perf_counter()
+                await communicator.send_json_to({'message': text})
+                try:
+                    # Our own broadcast coming back is the end of the round trip
+                    while True:
+                        event = await communicator.receive_json_from(timeout=5)
+                        if event.get('message') == text and event.get('sender') == user.username:
+                            break
+                    latencies.append(time.perf_counter() - started)
+                except asyncio.TimeoutError:
+                    errors += 1
+            return latencies, errors
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(
+            chatter(n, user, communicator) for n, (user, communicator) in enumerate(sockets)
+        ))
+        elapsed = time.perf_counter() - started
+        for _, communicator in sockets:
+            await communicator.disconnect()
+        presence.registry.clear()
+        latencies = [latency for result, _ in outcomes for latency in result]
+        return latencies, elapsed, sum(errors for _, errors in outcomes)
+
+    async def drain(self, sockets):
+        for _, communicator in sockets:
+            while not await communicator.receive_nothing(timeout=0.1):
+                await communicator.receive_from()
+
+    # Operations: each returns True when the response was the expected one
+
+    def login(self, http, user):
+        if '_bench_user' not in http.__dict__ or http._bench_user != user.pk:
+            http.force_login(user)
+            http._bench_user = user.pk
+
+    def op_dashboard(self, http, rng):
+        self.login(http, rng.choice(self.lawyers).user)
+        return http.get(reverse('dashboard')).status_code == 200
+
+    def op_case_detail(self, http, rng):
+        self.login(http, rng.choice(self.lawyers).user)
+        return http.get(reverse('case_detail', args=[rng.choice(self.cases).pk])).status_code == 200
+
+    def op_lawyer_availability(self, http, rng):
+        self.login(http, rng.choice(self.clients).user)
+        lawyer = rng.choice(self.lawyers)
+        return http.get(reverse('lawyer_availability', args=[lawyer.user_id])).status_code == 200
+
+    def op_book_slot(self, http, rng):
+        self.login(http, rng.choice(self.clients).user)
+        return http.post(reverse('book_slot', args=[rng.choice(self.slots).pk])).status_code == 302
+
+    def op_admin_changelist(self, http, rng):
+        self.login(http, self.admin)
+        model = rng.choice(ADMIN_CHANGELISTS)
+        return http.get(reverse(f'admin:core_{model}_changelist')).status_code == 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark dashboard, case detail, availability, booking, admin changelists and the "
+        "chat consumer in-process against a scratch database; report latency percentiles, "
+        "throughput and queries per operation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Threads (HTTP) or sockets (chat) running at once (default: 4).')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Operations per scenario, split across workers (default: 200).')
+        parser.add_argument('--scenario', action='append', choices=Suite.scenarios,
+                            help='Run only this scenario; repeatable (default: all).')
+        parser.add_argument('--clients', type=int, default=50, help='Seeded clients (default: 50).')
+        parser.add_argument('--cases-per-client', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save', metavar='PATH', help='Write results as JSON.')
+        parser.add_argument('--compare', metavar='PATH', help='Compare against a JSON file written by --save.')
+        parser.add_argument('--max-regression', type=float, metavar='PERCENT',
+                            help='With --compare, fail if throughput, p95 or queries per operation '
+                                 'got worse by more than this.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)['scenarios']
+        suite = Suite(options['concurrency'], options['requests'], options['seed'])
+        names = options['scenario'] or Suite.scenarios
+
+        results = {}
+        with scratch_database(), override_settings(
+            METRICS_ENABLED=True, CHANNEL_LAYERS=IN_MEMORY_LAYER, ALLOWED_HOSTS=['testserver'],
+            RATELIMIT_ENABLED=False, DEBUG=False,
+        ):
+            suite.populate(options['clients'], options['cases_per_client'])
+            self.stdout.write(
+                f"{options['concurrency']} workers x {options['requests']} ops per scenario, "
+                f"{len(suite.clients)} clients / {len(suite.cases)} cases"
+            )
+            self.stdout.write(f"{'scenario':<22}{'ops':>6}{'err':>5}{'ops/s':>9}"
+                              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/op':>7}")
+            for name in names:
+                result = results[name] = suite.run(name)
+                self.stdout.write(
+                    f"{name:<22}{result['ops']:>6}{result['errors']:>5}{result['throughput']:>9.0f}"
+                    f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                    f"{result['queries_per_op']:>7.1f}"
+                )
+
+        if options['save']:
+            with open(options['save'], 'w') as handle:
+                json.dump({'meta': self.meta(options), 'scenarios': results}, handle, indent=2)
+            self.stdout.write(f"Saved to {options['save']}")
+        if baseline is not None:
+            rows = compare(baseline, results)
+            self.stdout.write(f"\n{'scenario':<22}{'metric':<16}{'before':>10}{'after':>10}{'change':>9}")
+            for name, metric, old, new, change in rows:
+                self.stdout.write(f"{name:<22}{metric:<16}{old:>10.1f}{new:>10.1f}{change:>+8.1f}%")
+            if options['max_regression'] is not None:
+                worse = regressions(rows, options['max_regression'])
+                if worse:
+                    raise CommandError(
+                        "Regressed: " + ', '.join(f"{name} {metric}" for name, metric, *_ in worse)
+                    )
+
+    def meta(self, options):
+        return {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'clients': options['clients'],
+            'cases_per_client': options['cases_per_client'],
+            'seed': options['seed'],
+        }
+
+
+class scratch_database:
+    """Point the default alias at a migrated temporary SQLite file for the duration."""
+
+    def __enter__(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3', prefix='bench-')
+        os.close(fd)
+        setup_test_environment()
+        self.test_settings = connection.settings_dict.get('TEST', {})
+        connection.settings_dict['TEST'] = {**self.test_settings, 'NAME': self.path}
+        self.old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Charge queries to the metrics collectors even if metrics were off at startup
+        connection_created.connect(metrics.install_query_wrapper, dispatch_uid='core.metrics')
+        metrics.install_query_wrapper(None, connection)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            connection.creation.destroy_test_db(self.old_name, verbosity=0)
+        finally:
+            connection.settings_dict['TEST'] = self.test_settings
+            teardown_test_environment()
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+        return False
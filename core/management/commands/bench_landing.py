@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core.pagecache import invalidate
+
+
+class Command(BaseCommand):
+    help = "Compare anonymous landing page requests/sec with and without the page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Requests per run (default: 2000).')
+
+    def run(self, count, revalidate=False):
+        client = Client()
+        url = reverse('landing_page')
+        # Warm up: templates, cache entry, CSRF cookie
+        headers = {'HTTP_IF_NONE_MATCH': client.get(url)['ETag']} if revalidate else {}
+        started = time.perf_counter()
+        for _ in range(count):
+            response = client.get(url, **headers)
+        elapsed = time.perf_counter() - started
+        return count / elapsed, response.status_code
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        setup_test_environment()
+        try:
+            # "revalidated" is a browser that already holds the page
+            runs = [('uncached', 0, False), ('cached', 300, False), ('revalidated', 300, True)]
+            for label, seconds, revalidate in runs:
+                invalidate('landing')
+                with override_settings(PAGE_CACHE_SECONDS=seconds, ALLOWED_HOSTS=['testserver']):
+                    rate, status = self.run(count, revalidate)
+                self.stdout.write(f"{label:<12}{rate:>10.0f} req/s  (HTTP {status})")
+        finally:
+            teardown_test_environment()
@@ -0,0 +1,110 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import time as clock_time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+from core.dbtuning import DEFAULT_PRAGMAS, retry_on_locked
+from core.models import Availability, Booking, ChatRoom, LawyerProfile, Message, User
+
+ALIAS = 'bench'
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark: threads mixing chat message and booking writes "
+        "against a scratch SQLite file, with stock settings and with core.dbtuning."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=200, help='Operations per thread (default: 200).')
+
+    def handle(self, *args, **options):
+        stock = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 0}
+        runs = [('stock', stock, False), ('tuned', DEFAULT_PRAGMAS, True)]
+        self.stdout.write(f"{options['threads']} threads x {options['ops']} ops, 80% chat / 20% booking")
+        self.stdout.write(f"{'config':<8}{'ops/s':>10}{'failed':>8}{'p95 ms':>9}")
+        for label, pragmas, retry in runs:
+            ops, failed, p95 = self.run(pragmas, retry, options['threads'], options['ops'])
+            self.stdout.write(f"{label:<8}{ops:>10.0f}{failed:>8}{p95 * 1000:>9.1f}")
+
+    def run(self, pragmas, retry, threads, ops):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        connections.databases[ALIAS] = {**connections.databases['default'], 'NAME': path, 'CONN_MAX_AGE': None}
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                call_command('migrate', database=ALIAS, verbosity=0)
+                room, slots, clients = self.seed(threads)
+                results = []
+                workers = [
+                    threading.Thread(target=self.worker, args=(n, room, slots, clients, ops, retry, results))
+                    for n in range(threads)
+                ]
+                started = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - started
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.databases[ALIAS]
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        latencies = sorted(latency for ok, latency in results if ok)
+        failed = sum(not ok for ok, _ in results)
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        return len(latencies) / elapsed, failed, p95
+
+    def seed(self, threads):
+        db = User.objects.db_manager(ALIAS)
+        lawyers = [
+            LawyerProfile.objects.using(ALIAS).create(user=db.create_user(username=f'bench-lawyer-{n}'))
+            for n in range(40)
+        ]
+        clients = [db.create_user(username=f'bench-client-{n}') for n in range(threads)]
+        room = ChatRoom.objects.using(ALIAS).create(name='bench')
+        slots = Availability.objects.using(ALIAS).bulk_create([
+            Availability(lawyer=lawyer, day=day, start_time=clock_time(9), end_time=clock_time(16))
+            for day in ('MON', 'TUE', 'WED', 'THU', 'FRI') for lawyer in lawyers
+        ])
+        return room, slots, clients
+
+    def worker(self, n, room, slots, clients, ops, retry, results):
+        rng = random.Random(n)
+        client = clients[n]
+
+        def chat():
+            Message.objects.using(ALIAS).create(room=room, sender=client, text=f"message from {n}")
+
+        def book():
+            slot = rng.choice(slots)
+            with transaction.atomic(using=ALIAS):
+                if not Booking.objects.using(ALIAS).filter(availability=slot, status='pending').exists():
+                    Booking.objects.using(ALIAS).create(availability=slot, client=client)
+
+        if retry:
+            chat = retry_on_locked(chat, using=ALIAS)
+            book = retry_on_locked(book, using=ALIAS)
+        try:
+            for _ in range(ops):
+                operation = chat if rng.random() < 0.8 else book
+                started = time.perf_counter()
+                try:
+                    operation()
+                    results.append((True, time.perf_counter() - started))
+                except OperationalError:
+                    # Lock errors, and FTS5 failing to open its shadow tables under contention
+                    results.append((False, 0))
+        finally:
+            connections[ALIAS].close()
@@ -0,0 +1,71 @@
+import json
+import random
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+
+from core import wire
+
+
+def sample_frames(count, seed=0):
+    """A chat-like mix: 60% WebRTC ICE signals, 30% messages, 10% read receipts."""
+    rng = random.Random(seed)
+    frames = []
+    for n in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            frames.append({'type': 'signal', 'sender': 'lawyer42', 'signal': {'candidate': {
+                'candidate': f"candidate:{rng.getrandbits(32)} 1 udp 2122260223 192.168.1.{n % 255} "
+                             f"{rng.randint(1024, 65535)} typ host generation 0",
+                'sdpMid': '0', 'sdpMLineIndex': 0,
+            }}})
+        elif roll < 0.9:
+            frames.append({'id': 100_000 + n, 'sender': 'client7',
+                           'message': 'Could we move the hearing prep call to Thursday afternoon?'})
+        else:
+            frames.append({'type': 'read', 'message_id': 100_000 + n, 'sender': 'lawyer42'})
+    return frames
+
+
+def deflated_size(payloads):
+    """Bytes after permessage-deflate with context takeover (one stream per connection)."""
+    compressor = zlib.compressobj(wbits=-15)
+    total = 0
+    for payload in payloads:
+        # Each message ends with a sync flush whose 4-byte tail is not sent
+        total += len(compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total
+
+
+class Command(BaseCommand):
+    help = "Compare JSON and MessagePack chat frames: bytes on the wire and CPU time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=10_000,
+                            help='Frames per run (default: 10000).')
+
+    def measure(self, frames, encode, decode):
+        started = time.process_time()
+        encoded = [encode(frame) for frame in frames]
+        encode_cpu = time.process_time() - started
+        started = time.process_time()
+        for payload in encoded:
+            decode(payload)
+        decode_cpu = time.process_time() - started
+        raw = [payload.encode('utf-8') if isinstance(payload, str) else payload for payload in encoded]
+        return sum(map(len, raw)), deflated_size(raw), encode_cpu, decode_cpu
+
+    def handle(self, *args, **options):
+        frames = sample_frames(options['messages'])
+        formats = {
+            wire.JSON: (lambda frame: json.dumps(frame, separators=(',', ':')), json.loads),
+            wire.MSGPACK: (wire.packb, wire.unpackb),
+        }
+        self.stdout.write(f"{len(frames)} frames")
+        self.stdout.write(f"{'format':<14}{'bytes':>12}{'deflated':>12}{'encode ms':>12}{'decode ms':>12}")
+        for name, (encode, decode) in formats.items():
+            size, deflated, encode_cpu, decode_cpu = self.measure(frames, encode, decode)
+            self.stdout.write(
+                f"{name:<14}{size:>12}{deflated:>12}{encode_cpu * 1000:>12.1f}{decode_cpu * 1000:>12.1f}"
+            )
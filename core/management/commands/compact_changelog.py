@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.sync import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove sync change log entries older than SYNC_RETENTION_DAYS and "
+        "entries superseded by a newer change to the same object. Run daily."
+    )
+
+    def handle(self, *args, **options):
+        removed = compact()
+        self.stdout.write(f"Removed {removed} change log entries.")
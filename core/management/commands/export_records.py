@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream cases, clients, bookings or appointments to a CSV or XLSX "
+        "file, reading EXPORT_CHUNK_SIZE rows at a time, so memory use "
+        "does not grow with the table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS),
+                            help="Output format (default: from the --output extension, else csv).")
+        parser.add_argument('--output', '-o', default='-', help="File to write (default: stdout, CSV only).")
+        parser.add_argument('--status', action='append', default=[],
+                            help='Only cases or bookings in this status (repeatable).')
+        parser.add_argument('--chunk-size', type=int, help='Rows per database fetch (default: EXPORT_CHUNK_SIZE).')
+        parser.add_argument('--database', default='default', help='Database alias (default: %(default)s).')
+
+    def handle(self, *args, **options):
+        name, output = options['export'], options['output']
+        fmt = options['format'] or ('xlsx' if output.endswith('.xlsx') else 'csv')
+        export = exports.EXPORTS[name]
+        queryset = export.model.objects.using(options['database']).all()
+        if options['status']:
+            if name not in ('cases', 'bookings'):
+                raise CommandError("--status only applies to cases and bookings.")
+            queryset = queryset.filter(status__in=options['status'])
+
+        if fmt == 'csv':
+            chunks = exports.csv_chunks(export, queryset, options['chunk_size'])
+        else:
+            chunks = exports.xlsx_chunks(export, queryset, options['chunk_size'], sheet_name=name.capitalize())
+        if output == '-':
+            if fmt != 'csv':
+                raise CommandError("XLSX needs --output; it can't be written to the terminal.")
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+        written = 0
+        with open(output, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+        self.stderr.write(f"Wrote {written} bytes to {output}.")
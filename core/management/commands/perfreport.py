@@ -0,0 +1,54 @@
+import json
+import sys
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metrics import parse_prometheus, report_rows
+
+
+def format_table(rows, limit=None):
+    header = f"{'kind':<9}{'name':<44}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'db ms':>8}{'bytes':>9}"
+    lines = [header, '-' * len(header)]
+    for row in rows[:limit]:
+        queries = '' if row['avg_queries'] is None else f"{row['avg_queries']:.1f}"
+        size = '' if row['avg_bytes'] is None else f"{row['avg_bytes']:.0f}"
+        lines.append(
+            f"{row['kind']:<9}{row['name'][:43]:<44}{row['count']:>7}{row['p50_ms']:>9.1f}"
+            f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{queries:>9}{row['avg_db_ms']:>8.1f}{size:>9}"
+        )
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise /metrics per view and consumer event: p50/p95/p99 latency, "
+        "average queries, DB time and response size, slowest first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/metrics',
+                            help='Metrics endpoint of a running server (default: %(default)s).')
+        parser.add_argument('--file', help="Read a saved /metrics export instead ('-' for stdin).")
+        parser.add_argument('--limit', type=int, help='Show only the N slowest rows.')
+        parser.add_argument('--json', action='store_true', help='Print rows as JSON.')
+
+    def handle(self, *args, **options):
+        if options['file'] == '-':
+            text = sys.stdin.read()
+        elif options['file']:
+            with open(options['file'], encoding='utf-8') as handle:
+                text = handle.read()
+        else:
+            try:
+                with urlopen(options['url'], timeout=10) as response:
+                    text = response.read().decode('utf-8')
+            except OSError as exc:
+                raise CommandError(f"Could not fetch {options['url']}: {exc}")
+        rows = report_rows(parse_prometheus(text))
+        if options['json']:
+            self.stdout.write(json.dumps(rows[:options['limit']], indent=2))
+        elif not rows:
+            self.stdout.write("No samples recorded yet.")
+        else:
+            self.stdout.write(format_table(rows, options['limit']))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.activity import prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete case activity entries older than ACTIVITY_RETENTION_DAYS, "
+        "in chunks. Run daily."
+    )
+
+    def handle(self, *args, **options):
+        removed = prune()
+        self.stdout.write(f"Removed {removed} activity entries.")
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import caseops
+from core.models import Case
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-update cases with set-based UPDATEs: reassign them to another "
+        "lawyer, change their status or shift their due dates. One operation "
+        "per run, so it cannot change the cases its own selection matches; "
+        "each run writes one CaseBulkChange audit record."
+    )
+
+    def add_arguments(self, parser):
+        selection = parser.add_argument_group('selection (at least one)')
+        selection.add_argument('--from', dest='from_lawyer', metavar='USERNAME',
+                               help="Cases assigned to this lawyer.")
+        selection.add_argument('--client', type=int, action='append', default=[], metavar='ID',
+                               help='Cases of this client (repeatable).')
+        selection.add_argument('--case', type=int, action='append', default=[], metavar='ID',
+                               help='This case (repeatable).')
+        selection.add_argument('--status', action='append', default=[], choices=dict(Case.STATUS),
+                               help='Only cases currently in this status (repeatable).')
+        selection.add_argument('--all', action='store_true', help='Every case.')
+
+        operation = parser.add_argument_group('operation (exactly one)').add_mutually_exclusive_group(required=True)
+        operation.add_argument('--to', dest='to_lawyer', metavar='USERNAME', help='Assign to this lawyer.')
+        operation.add_argument('--unassign', action='store_true', help='Remove the assigned lawyer.')
+        operation.add_argument('--set-status', choices=dict(Case.STATUS), help='Change the status.')
+        operation.add_argument('--shift-due', type=int, metavar='DAYS',
+                               help='Move due dates by DAYS (negative for earlier).')
+
+        parser.add_argument('--actor', metavar='USERNAME', help='Recorded as the actor in the audit record.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the counts, then roll back.')
+        parser.add_argument('--database', default='default', help='Database alias (default: %(default)s).')
+
+    def user(self, username, database):
+        if username is None:
+            return None
+        try:
+            return get_user_model().objects.using(database).get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {username!r}.") from None
+
+    def handle(self, *args, **options):
+        database = options['database']
+        if not (options['from_lawyer'] or options['client'] or options['case'] or options['status']
+                or options['all']):
+            raise CommandError("Select cases with --from, --client, --case or --status (or --all).")
+        cases = Case.objects.using(database).all()
+        from_lawyer = self.user(options['from_lawyer'], database)
+        if from_lawyer is not None:
+            cases = cases.filter(lawyer=from_lawyer)
+        if options['client']:
+            cases = cases.filter(client_id__in=options['client'])
+        if options['case']:
+            cases = cases.filter(pk__in=options['case'])
+        if options['status']:
+            cases = cases.filter(status__in=options['status'])
+
+        if options['set_status']:
+            operation, value = caseops.set_status, options['set_status']
+        elif options['shift_due'] is not None:
+            operation, value = caseops.shift_due_dates, options['shift_due']
+        else:
+            operation, value = caseops.reassign, self.user(options['to_lawyer'], database)
+        actor = self.user(options['actor'], database)
+
+        with transaction.atomic(using=database):
+            change = operation(cases, value, actor=actor, source='command')
+            self.stdout.write(
+                f"{change.get_action_display()}: {change.updated} updated, {change.unchanged} unchanged"
+            )
+            if options['dry_run']:
+                transaction.set_rollback(True, using=database)
+                self.stdout.write("Dry run: rolled back.")
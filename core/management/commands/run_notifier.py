@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications (email + WebSocket push) in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Notifications delivered per batch (default: 50).')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty (default: 5).')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the currently due notifications and exit.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(f"Notifier started (batch size {batch_size}).")
+        try:
+            while True:
+                sent, failed = deliver_pending(batch_size=batch_size)
+                if sent or failed:
+                    self.stdout.write(f"Delivered {sent}, failed {failed}.")
+                if sent + failed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Notifier stopped."))
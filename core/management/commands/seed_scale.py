@@ -0,0 +1,327 @@
+"""
+Generate a large, reproducible dataset for scale testing.
+
+Rows are built in Python from a seeded RNG and written with bulk_create in
+chunks, one transaction per chunk, so model save() methods and signals
+are skipped. Timestamps (opened_on, booked_at, message timestamps...) are
+spread over the past year instead of all being "now". Documents point at
+a small pool of placeholder files in MEDIA_ROOT rather than one file each.
+
+Every username and email starts with --prefix, so several datasets can
+live side by side and a second run with the same prefix is refused.
+
+    python manage.py seed_scale --clients 20000 --messages 1000000
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, time as clock_time, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from core import caseload
+from core.models import (
+    WEEKDAYS, Appointment, Availability, Booking, Case, ChatMembership, ChatRoom, Client, Document,
+    LawyerProfile, Message, User,
+)
+
+FIRST_NAMES = (
+    'Amina', 'Ben', 'Carla', 'David', 'Esther', 'Farid', 'Grace', 'Hugo', 'Ines', 'Jonas', 'Kemi',
+    'Lucas', 'Marie', 'Nadia', 'Omar', 'Paul', 'Rita', 'Samuel', 'Tatiana', 'Yves',
+)
+LAST_NAMES = (
+    'Abena', 'Bello', 'Dubois', 'Eto', 'Fotso', 'Kamga', 'Mbarga', 'Martin', 'Ngono', 'Nkemelu',
+    'Owona', 'Petit', 'Simo', 'Tabi', 'Tchana', 'Wamba',
+)
+MATTERS = (
+    'Lease dispute', 'Employment contract review', 'Divorce settlement', 'Property transfer',
+    'Debt recovery', 'Company registration', 'Inheritance claim', 'Insurance claim',
+    'Trademark registration', 'Custody hearing', 'Land title verification', 'Wrongful dismissal',
+)
+DOCUMENT_KINDS = ('Contract', 'Court filing', 'Correspondence', 'Evidence', 'Invoice', 'Affidavit')
+PHRASES = (
+    'Thank you for the update.', 'Could we move the meeting to Thursday?', 'I have sent the signed copy.',
+    'The hearing has been scheduled.', 'Please bring your ID and the original contract.',
+    'Do you need anything else from me?', 'The other party replied this morning.',
+    'I will call you after the court session.', 'Can you confirm the amount?', 'Noted, thanks.',
+)
+CASE_STATUSES = (('open', 6), ('pending', 3), ('closed', 4))
+BOOKING_STATUSES = (('pending', 3), ('approved', 5), ('declined', 2))
+DURATIONS = [choice for choice, _ in Appointment.DURATION_CHOICES if choice <= 60]
+PLACEHOLDER_FILES = 20
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep generated auto_now/auto_now_add values instead of "now"."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a seeded, reproducible large dataset (clients, cases, documents, lawyers, "
+        "availability, bookings, appointments, chat) with chunked bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--cases-per-client', type=int, default=5)
+        parser.add_argument('--documents-per-case', type=int, default=1)
+        parser.add_argument('--lawyers', type=int, default=50)
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--appointments', type=int, default=5000)
+        parser.add_argument('--rooms', type=int, default=500, help='Client/lawyer chat rooms (default: 500).')
+        parser.add_argument('--messages', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='scale', help='Username/email prefix (default: scale).')
+        parser.add_argument('--password', help='Give every generated user this password (default: unusable).')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk insert (default: 5000).')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.db = options['database']
+        self.chunk_size = options['chunk_size']
+        self.prefix = options['prefix']
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        if User.objects.using(self.db).filter(username__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f"Users prefixed '{self.prefix}-' already exist; pick another --prefix.")
+        # One hash for everyone: hashing per user would dominate the run time
+        self.password = make_password(options['password'])
+
+        started = time.perf_counter()
+        with explicit_timestamps(
+            Client._meta.get_field('created_at'), Client._meta.get_field('updated_at'),
+            Case._meta.get_field('opened_on'), Document._meta.get_field('uploaded_at'),
+            Booking._meta.get_field('booked_at'), Message._meta.get_field('timestamp'),
+        ):
+            lawyers = self.create_lawyers(options['lawyers'])
+            slots = self.create_availability(lawyers)
+            clients = self.create_clients(options['clients'])
+            cases = self.create_cases(clients, lawyers, options['cases_per_client'])
+            self.create_documents(cases, options['documents_per_case'])
+            self.create_bookings(slots, clients, options['bookings'])
+            self.create_appointments(slots, clients, options['appointments'])
+            self.create_chat(clients, lawyers, options['rooms'], options['messages'])
+        # bulk_create skips the signals that keep the statistics in step
+        caseload.rebuild(using=self.db)
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
+
+    # Helpers
+
+    def insert(self, label, model, rows, total, keep=True):
+        """bulk_create ``rows`` (any iterable) in chunks; return the created objects if ``keep``."""
+        created, done = [], 0
+        started = time.perf_counter()
+        for chunk in chunked(rows, self.chunk_size):
+            with transaction.atomic(using=self.db):
+                objects = model.objects.using(self.db).bulk_create(chunk)
+            if keep:
+                created.extend(objects)
+            done += len(chunk)
+            self.stdout.write(f"{label}: {done}/{total} ({time.perf_counter() - started:.1f}s)")
+        return created
+
+    def past(self, days=365):
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def users(self, kind, count):
+        names = [self.person() for _ in range(count)]
+        rows = (
+            User(
+                username=f'{self.prefix}-{kind}-{n}',
+                email=f'{self.prefix}-{kind}-{n}@example.com',
+                first_name=first,
+                last_name=last,
+                password=self.password,
+                date_joined=self.past(),
+            )
+            for n, (first, last) in enumerate(names)
+        )
+        return self.insert(f'{kind} users', User, rows, count)
+
+    # Generators
+
+    def create_lawyers(self, count):
+        users = self.users('lawyer', count)
+        group, _ = Group.objects.using(self.db).get_or_create(name='Lawyer')
+        self.insert('lawyer groups', User.groups.through, (
+            User.groups.through(user_id=user.pk, group_id=group.pk) for user in users
+        ), count, keep=False)
+        return self.insert('lawyer profiles', LawyerProfile, (
+            LawyerProfile(user=user, bio=f"{self.rng.choice(MATTERS)} and related matters.") for user in users
+        ), count)
+
+    def create_availability(self, lawyers):
+        rows = (
+            Availability(
+                lawyer=lawyer,
+                day=day,
+                start_time=clock_time(self.rng.choice((8, 9, 10))),
+                end_time=clock_time(self.rng.choice((14, 15, 16))),
+            )
+            for lawyer in lawyers for day, _ in WEEKDAYS
+        )
+        return self.insert('availability', Availability, rows, len(lawyers) * len(WEEKDAYS))
+
+    def create_clients(self, count):
+        users = self.users('client', count)
+        rows = []
+        for user in users:
+            created = self.past()
+            rows.append(Client(
+                user=user,
+                name=f'{user.first_name} {user.last_name}',
+                email=user.email,
+                phone=f'+2376{self.rng.randrange(10 ** 8):08d}',
+                created_at=created,
+                updated_at=created,
+            ))
+        return self.insert('clients', Client, rows, count)
+
+    def create_cases(self, clients, lawyers, per_client):
+        today = date.today()
+
+        def rows():
+            for client in clients:
+                for _ in range(per_client):
+                    opened = today - timedelta(days=self.rng.randrange(365))
+                    yield Case(
+                        title=f'{self.rng.choice(MATTERS)} - {client.name}',
+                        client_id=client.pk,
+                        description=' '.join(self.rng.sample(PHRASES, 3)),
+                        lawyer_id=self.rng.choice(lawyers).user_id,
+                        status=weighted(self.rng, CASE_STATUSES),
+                        opened_on=opened,
+                        due_date=opened + timedelta(days=self.rng.randrange(14, 240)),
+                    )
+
+        return self.insert('cases', Case, rows(), len(clients) * per_client)
+
+    def create_documents(self, cases, per_case):
+        total = len(cases) * per_case
+        if not total:
+            return
+        pool = []
+        for n in range(min(PLACEHOLDER_FILES, total)):
+            name = f'docs/{self.prefix}/placeholder-{n}.txt'
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(f'Placeholder document {n}\n'.encode()))
+            pool.append(name)
+        rows = (
+            Document(
+                title=f'{self.rng.choice(DOCUMENT_KINDS)} {n + 1}',
+                case_id=case.pk,
+                file=self.rng.choice(pool),
+                uploaded_at=self.past(),
+            )
+            for case in cases for n in range(per_case)
+        )
+        self.insert('documents', Document, rows, total, keep=False)
+
+    def create_bookings(self, slots, clients, count):
+        if not (slots and clients):
+            return
+        rows = (
+            Booking(
+                availability_id=self.rng.choice(slots).pk,
+                client_id=self.rng.choice(clients).user_id,
+                status=weighted(self.rng, BOOKING_STATUSES),
+                booked_at=self.past(),
+            )
+            for _ in range(count)
+        )
+        self.insert('bookings', Booking, rows, count, keep=False)
+
+    def create_appointments(self, slots, clients, count):
+        """Hourly, non-overlapping appointments inside each lawyer's availability."""
+        if not (slots and clients):
+            return
+        windows = {}
+        for slot in slots:
+            windows.setdefault(slot.lawyer_id, {})[slot.day] = (slot.start_time.hour, slot.end_time.hour)
+        days = [code for code, _ in WEEKDAYS]
+
+        def free_starts(week_days):
+            day = date.today() - timedelta(days=90)
+            while True:
+                if day.weekday() < len(days) and days[day.weekday()] in week_days:
+                    start, end = week_days[days[day.weekday()]]
+                    for hour in range(start, end):
+                        yield day, clock_time(hour)
+                day += timedelta(days=1)
+
+        calendars = [(lawyer_id, free_starts(week_days)) for lawyer_id, week_days in windows.items()]
+
+        def rows():
+            for n in range(count):
+                lawyer_id, calendar = calendars[n % len(calendars)]
+                day, start = next(calendar)
+                yield Appointment(
+                    client_id=self.rng.choice(clients).pk,
+                    lawyer_id=lawyer_id,
+                    date=day,
+                    time=start,
+                    duration=self.rng.choice(DURATIONS),
+                    message=self.rng.choice(MATTERS),
+                )
+
+        self.insert('appointments', Appointment, rows(), count, keep=False)
+
+    def create_chat(self, clients, lawyers, room_count, message_count):
+        pairs = set()
+        room_count = min(room_count, len(clients) * len(lawyers))
+        while len(pairs) < room_count:
+            pairs.add((self.rng.choice(clients).user_id, self.rng.choice(lawyers).user_id))
+        pairs = sorted(pairs)
+        rooms = self.insert('chat rooms', ChatRoom, (
+            ChatRoom(name=f'dm-{min(pair)}-{max(pair)}') for pair in pairs
+        ), room_count)
+        self.insert('chat memberships', ChatMembership, (
+            ChatMembership(room=room, user_id=user_id) for room, pair in zip(rooms, pairs) for user_id in pair
+        ), room_count * 2, keep=False)
+        if not rooms or not message_count:
+            return
+
+        # Evenly spaced over the past year, so timestamp order matches id order
+        start = self.now - timedelta(days=365)
+        step = timedelta(days=365) / message_count
+        members = list(zip(rooms, pairs))
+        rows = (
+            Message(
+                room=room,
+                sender_id=self.rng.choice(pair),
+                text=self.rng.choice(PHRASES),
+                timestamp=start + step * n,
+            )
+            for n, (room, pair) in enumerate(self.rng.choice(members) for _ in range(message_count))
+        )
+        self.insert('messages', Message, rows, message_count, keep=False)
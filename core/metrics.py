@@ -0,0 +1,292 @@
+"""
+In-process performance metrics.
+
+When METRICS_ENABLED is true:
+
+* every database connection gets an execute wrapper that charges each
+  query and its duration to the current collector, if any;
+* MetricsMiddleware opens a collector per HTTP request and records
+  latency, query count, DB time and response size under the view name;
+* InstrumentedConsumerMixin does the same per Channels consumer event
+  (``ChatConsumer.websocket.receive``, ``ChatConsumer.chat_message``...).
+  Queries run through database_sync_to_async are charged too, because the
+  collector lives in a context variable that asgiref copies into threads.
+
+Values go into fixed-bucket histograms in this process. ``/metrics``
+exports them in the Prometheus text format, together with the rate-limit
+and lock-retry counters. ``manage.py perfreport`` turns that text into a
+per-view table.
+
+When disabled, no wrapper is installed and the middleware removes itself,
+so nothing runs per request or per query.
+"""
+import math
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# metric name -> (help text, buckets)
+METRICS = {
+    'latency_seconds': ('Total handling time', LATENCY_BUCKETS),
+    'db_seconds': ('Time spent in database queries', LATENCY_BUCKETS),
+    'queries': ('Database queries executed', QUERY_BUCKETS),
+    'response_bytes': ('Response body size', SIZE_BUCKETS),
+}
+PREFIX = 'lawfirm_'
+
+_collector = ContextVar('metrics_collector', default=None)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total, result = 0, []
+        for bound, count in zip((*self.buckets, math.inf), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._lock = Lock()
+        self._histograms = defaultdict(dict)  # metric -> {(kind, name): Histogram}
+
+    def observe(self, kind, name, values):
+        with self._lock:
+            for metric, value in values.items():
+                series = self._histograms[metric]
+                histogram = series.get((kind, name))
+                if histogram is None:
+                    histogram = series[(kind, name)] = Histogram(METRICS[metric][1])
+                histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                metric: {key: (h.cumulative(), h.count, h.sum) for key, h in series.items()}
+                for metric, series in self._histograms.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+class Collector:
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+def query_wrapper(execute, sql, params, many, context):
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.queries += 1
+        collector.db_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver; wired in CoreConfig.ready when enabled."""
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def start():
+    collector = Collector()
+    return collector, _collector.set(collector), time.perf_counter()
+
+
+def finish(kind, name, collector, token, started, size=None):
+    _collector.reset(token)
+    values = {
+        'latency_seconds': time.perf_counter() - started,
+        'db_seconds': collector.db_seconds,
+        'queries': collector.queries,
+    }
+    if size is not None:
+        values['response_bytes'] = size
+    registry.observe(kind, name, values)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector, token, started = start()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            size = None
+            if response is not None and not response.streaming:
+                size = len(response.content)
+            finish('view', view_name(request), collector, token, started, size)
+
+
+class InstrumentedConsumerMixin:
+    """Record metrics for every message a Channels consumer dispatches."""
+
+    async def dispatch(self, message):
+        if not enabled():
+            return await super().dispatch(message)
+        collector, token, started = start()
+        try:
+            return await super().dispatch(message)
+        finally:
+            finish('consumer', f"{type(self).__name__}.{message['type']}", collector, token, started)
+
+
+# Export
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+def render_prometheus(snapshot=None):
+    from .dbtuning import lock_retry_counts
+    from .ratelimit import over_limit_counts
+
+    snapshot = registry.snapshot() if snapshot is None else snapshot
+    lines = []
+    for metric, series in sorted(snapshot.items()):
+        name = PREFIX + metric
+        lines.append(f"# HELP {name} {METRICS[metric][0]}")
+        lines.append(f"# TYPE {name} histogram")
+        for (kind, label), (cumulative, count, total) in sorted(series.items()):
+            labels = f'kind="{kind}",name="{_escape(label)}"'
+            for bound, value in cumulative:
+                lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {value}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total!r}')
+    for name, label, counts, help_text in (
+        ('ratelimit_rejected_total', 'limit', over_limit_counts(), 'Requests or frames rejected by rate limits'),
+        ('db_lock_retries_total', 'function', lock_retry_counts(), 'Units of work retried after SQLite lock errors'),
+    ):
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} counter")
+        for key, value in sorted(counts.items()):
+            lines.append(f'{PREFIX}{name}{{{label}="{_escape(key)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+SAMPLE_RE = re.compile(r'^(\w+?)(_bucket|_count|_sum)\{(.*)\} (\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_prometheus(text):
+    """Inverse of render_prometheus for histogram samples (used by perfreport)."""
+    snapshot = defaultdict(dict)
+    for line in text.splitlines():
+        match = SAMPLE_RE.match(line)
+        if not match or not match.group(1).startswith(PREFIX):
+            continue
+        metric, part, labels, value = match.groups()
+        metric = metric[len(PREFIX):]
+        if metric not in METRICS:
+            continue
+        labels = {key: raw.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+                  for key, raw in LABEL_RE.findall(labels)}
+        key = (labels.get('kind'), labels.get('name'))
+        cumulative, count, total = snapshot[metric].get(key, ([], 0, 0.0))
+        if part == '_bucket':
+            cumulative = cumulative + [(float(labels['le']), int(float(value)))]
+        elif part == '_count':
+            count = int(float(value))
+        else:
+            total = float(value)
+        snapshot[metric][key] = (cumulative, count, total)
+    return dict(snapshot)
+
+
+def quantile(cumulative, q):
+    """Estimate a quantile from cumulative buckets by linear interpolation."""
+    if not cumulative or cumulative[-1][1] == 0:
+        return 0.0
+    rank = q * cumulative[-1][1]
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in cumulative:
+        if count >= rank:
+            if bound == math.inf:
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def report_rows(snapshot):
+    """One row per view/consumer event: count, p50/p95/p99 ms, avg queries, avg DB ms, avg bytes."""
+    rows = []
+    latency = snapshot.get('latency_seconds', {})
+    for key, (cumulative, count, total) in latency.items():
+        def average(metric):
+            _, n, s = snapshot.get(metric, {}).get(key, ([], 0, 0.0))
+            return s / n if n else None
+        rows.append({
+            'kind': key[0],
+            'name': key[1],
+            'count': count,
+            'p50_ms': quantile(cumulative, 0.50) * 1000,
+            'p95_ms': quantile(cumulative, 0.95) * 1000,
+            'p99_ms': quantile(cumulative, 0.99) * 1000,
+            'avg_ms': total / count * 1000 if count else 0.0,
+            'avg_queries': average('queries'),
+            'avg_db_ms': (average('db_seconds') or 0.0) * 1000,
+            'avg_bytes': average('response_bytes'),
+        })
+    return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
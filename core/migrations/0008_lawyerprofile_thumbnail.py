@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_remove_message_lawyer_id_message_room_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lawyerprofile',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='lawyer_photos/thumbs/'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0 on 2026-10-19 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_lawyerprofile_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['lawyer', 'date'], name='appointment_lawyer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['lawyer', 'due_date'], name='case_lawyer_due_idx'),
+        ),
+    ]
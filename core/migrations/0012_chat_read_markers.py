@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-19 06:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomReadMarker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_name', models.CharField(max_length=255)),
+                ('last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room_name', 'id'], name='message_room_idx'),
+        ),
+        migrations.AddField(
+            model_name='roomreadmarker',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_read_markers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='roomreadmarker',
+            unique_together={('user', 'room_name')},
+        ),
+    ]
@@ -0,0 +1,107 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def convert_string_rooms(apps, schema_editor):
+    """
+    Turn every distinct Message.room_name / RoomReadMarker.room_name into a
+    ChatRoom. Everyone who has posted in or opened a room becomes a member,
+    and read markers become the membership's last_read_id.
+    """
+    ChatRoom = apps.get_model('core', 'ChatRoom')
+    ChatMembership = apps.get_model('core', 'ChatMembership')
+    Message = apps.get_model('core', 'Message')
+    RoomReadMarker = apps.get_model('core', 'RoomReadMarker')
+    db = schema_editor.connection.alias
+
+    names = set(Message.objects.using(db).values_list('room_name', flat=True).distinct())
+    names |= set(RoomReadMarker.objects.using(db).values_list('room_name', flat=True).distinct())
+
+    rooms = {}
+    taken = set()
+    # Names that are already valid slugs keep them; the rest are slugified
+    for name in sorted(names, key=lambda name: (slugify(name) != name, name)):
+        slug = base = slugify(name)[:240] or 'room'
+        counter = 1
+        while slug in taken:
+            slug = f"{base}-{counter}"
+            counter += 1
+        taken.add(slug)
+        rooms[name] = ChatRoom.objects.using(db).create(name=slug)
+        Message.objects.using(db).filter(room_name=name).update(room=rooms[name])
+
+    members = {
+        (room_name, user_id): 0
+        for room_name, user_id in Message.objects.using(db).values_list('room_name', 'sender_id').distinct()
+    }
+    for room_name, user_id, last_read_id in RoomReadMarker.objects.using(db).values_list('room_name', 'user_id', 'last_read_id'):
+        members[(room_name, user_id)] = last_read_id
+    ChatMembership.objects.using(db).bulk_create([
+        ChatMembership(room=rooms[room_name], user_id=user_id, last_read_id=last_read_id)
+        for (room_name, user_id), last_read_id in members.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_chat_read_markers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatRoom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='core.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'room')},
+            },
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='members',
+            field=models.ManyToManyField(related_name='chat_rooms', through='core.ChatMembership', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='room',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='core.chatroom'),
+        ),
+        migrations.RunPython(convert_string_rooms, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='message',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='core.chatroom'),
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_room_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='room_name',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'id'], name='message_room_id_idx'),
+        ),
+        migrations.DeleteModel(
+            name='RoomReadMarker',
+        ),
+    ]
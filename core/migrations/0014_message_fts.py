@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# External-content FTS5 index over core_message.text. Triggers keep it in
+# step with the table, so rows written by bulk_create, raw SQL or the admin
+# are indexed exactly like ones saved through the ORM.
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_message_fts USING fts5(
+        text, content='core_message', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER core_message_fts_ai AFTER INSERT ON core_message BEGIN
+        INSERT INTO core_message_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER core_message_fts_ad AFTER DELETE ON core_message BEGIN
+        INSERT INTO core_message_fts(core_message_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER core_message_fts_au AFTER UPDATE OF text ON core_message BEGIN
+        INSERT INTO core_message_fts(core_message_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO core_message_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO core_message_fts(core_message_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_message_fts_au",
+    "DROP TRIGGER IF EXISTS core_message_fts_ad",
+    "DROP TRIGGER IF EXISTS core_message_fts_ai",
+    "DROP TABLE IF EXISTS core_message_fts",
+]
+
+
+def run_on_sqlite(statements):
+    def apply(apps, schema_editor):
+        # Other backends fall back to the LIKE search in core.chat
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_chatroom'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(FTS_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,89 @@
+import hashlib
+import re
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Frozen copies of core.intake's helpers as of this migration, so later
+# changes to the live scoring don't change what this migration does.
+SPAM_WORDS = {
+    'bitcoin', 'casino', 'crypto', 'viagra', 'cialis', 'loan', 'loans', 'seo', 'backlink',
+    'backlinks', 'ranking', 'traffic', 'forex', 'investment', 'winner', 'prize', 'unsubscribe',
+}
+DISPOSABLE_DOMAINS = {
+    'mailinator.com', 'guerrillamail.com', '10minutemail.com', 'tempmail.com', 'yopmail.com',
+    'trashmail.com', 'sharklasers.com',
+}
+URL_RE = re.compile(r'https?://|www\.|\[url', re.IGNORECASE)
+WORD_RE = re.compile(r'[^\W\d_]+')
+
+
+def normalize_message(message):
+    return ' '.join(message.lower().split())
+
+
+def message_hash(message):
+    return hashlib.sha256(normalize_message(message).encode('utf-8')).hexdigest()
+
+
+def spam_score(name, email, message):
+    score = 0
+    links = len(URL_RE.findall(message))
+    score += min(links * 15, 45)
+    if URL_RE.search(name):
+        score += 30
+    words = WORD_RE.findall(message.lower())
+    if words:
+        spammy = sum(word in SPAM_WORDS for word in words)
+        score += min(spammy * 10, 30)
+        letters = [ch for ch in message if ch.isalpha()]
+        upper = sum(ch.isupper() for ch in letters)
+        if len(letters) >= 20 and upper / len(letters) > 0.6:
+            score += 15
+    if len(normalize_message(message)) < 10:
+        score += 10
+    if re.search(r'(.)\1{5,}', message):
+        score += 10
+    if email.rsplit('@', 1)[-1].lower() in DISPOSABLE_DOMAINS:
+        score += 20
+    return min(score, 100)
+
+
+def score_existing(apps, schema_editor):
+    Visitor = apps.get_model('core', 'Visitor')
+    db = schema_editor.connection.alias
+    visitors = list(Visitor.objects.using(db).all())
+    for visitor in visitors:
+        visitor.message_hash = message_hash(visitor.message)
+        visitor.spam_score = spam_score(visitor.name, visitor.email, visitor.message)
+    Visitor.objects.using(db).bulk_update(visitors, ['message_hash', 'spam_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_message_fts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visitor',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='message_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='spam_score',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['email', 'message_hash', 'submitted_at'], name='visitor_dedupe_idx'),
+        ),
+        migrations.RunPython(score_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_case_document_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('client_user_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('lawyer_user_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('room_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [
+                    models.Index(fields=['model', 'object_id'], name='changelog_object_idx'),
+                    models.Index(fields=['created_at'], name='changelog_created_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='client_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='client_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='case_title_lower_idx'),
+        ),
+    ]
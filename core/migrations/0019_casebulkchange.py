@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_autocomplete_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseBulkChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('status', 'Status change'), ('reassign', 'Lawyer reassignment'), ('shift_due', 'Due date shift')], max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('case_ids', models.JSONField(blank=True, default=list)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('unchanged', models.PositiveIntegerField(default=0)),
+                ('source', models.CharField(default='admin', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_casebulkchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('opened', 'Case opened'), ('status', 'Status changed'), ('reassigned', 'Lawyer changed'), ('due_date', 'Due date changed'), ('document_added', 'Document added'), ('document_removed', 'Document removed')], max_length=20)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('case', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.case')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['case', 'created_at', 'id'], name='activity_case_time_idx'), models.Index(fields=['created_at'], name='activity_created_idx')],
+            },
+        ),
+    ]
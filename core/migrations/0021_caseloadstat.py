@@ -0,0 +1,59 @@
+import datetime
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate(apps, schema_editor):
+    """Count the existing cases and bookings, as ``manage.py reconcile_caseload`` does."""
+    Case = apps.get_model('core', 'Case')
+    Booking = apps.get_model('core', 'Booking')
+    CaseloadStat = apps.get_model('core', 'CaseloadStat')
+    db = schema_editor.connection.alias
+    cases = Case.objects.using(db).order_by()
+    stats = [
+        CaseloadStat(metric='cases', lawyer_id=lawyer_id, status=status, count=n)
+        for lawyer_id, status, n in cases.values_list('lawyer_id', 'status').annotate(n=models.Count('pk'))
+    ]
+    stats += [
+        CaseloadStat(metric='cases_due', lawyer_id=lawyer_id, status=status, day=day, count=n)
+        for lawyer_id, status, day, n in cases.filter(due_date__isnull=False)
+        .values_list('lawyer_id', 'status', 'due_date').annotate(n=models.Count('pk'))
+    ]
+    stats += [
+        CaseloadStat(metric='bookings', lawyer_id=lawyer_id, status=status, count=n)
+        for lawyer_id, status, n in Booking.objects.using(db).order_by()
+        .values_list('availability__lawyer__user_id', 'status').annotate(n=models.Count('pk'))
+    ]
+    CaseloadStat.objects.using(db).bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_caseactivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseloadStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('cases', 'Cases'), ('cases_due', 'Cases by due date'), ('bookings', 'Bookings')], max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('day', models.DateField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('lawyer', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'day'], name='caseload_metric_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='caseloadstat',
+            constraint=models.UniqueConstraint(models.F('metric'), django.db.models.functions.comparison.Coalesce('lawyer', models.Value(0)), models.F('status'), django.db.models.functions.comparison.Coalesce('day', models.Value(datetime.date(1, 1, 1))), name='caseload_stat_key'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
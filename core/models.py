@@ -1,12 +1,17 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Coalesce, Lower
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from datetime import time   # ✅ correct import
+from datetime import date, time   # ✅ correct import
 
 from django.utils import timezone
+from django.utils.functional import cached_property
 # ...existing code...
 
+# Members of these groups (and superusers) work on every case and client
+FIRM_GROUPS = ('Admin', 'Lawyer')
+
 WEEKDAYS = [
     ('MON', 'Monday'),
     ('TUE', 'Tuesday'),
@@ -19,20 +24,128 @@ class LawyerProfile(models.Model):
     user = models.OneToOneField('User', on_delete=models.CASCADE, related_name='lawyer_profile')
     bio = models.TextField(blank=True, help_text="Short biography")
     photo = models.ImageField(upload_to='lawyer_photos/', blank=True, null=True)
+    thumbnail = models.ImageField(upload_to='lawyer_photos/thumbs/', blank=True, null=True, editable=False)
 
     def __str__(self):
         return f"Profile of {self.user.get_full_name() or self.user.username}"
 
+    def save(self, *args, **kwargs):
+        """Regenerate the directory thumbnail whenever a new photo is uploaded."""
+        from .thumbnails import build_thumbnail
+
+        previous_photo = None
+        if self.pk:
+            previous_photo = LawyerProfile.objects.filter(pk=self.pk).values_list('photo', flat=True).first()
+
+        photo_changed = (self.photo.name or None) != (previous_photo or None)
+        if photo_changed or (self.photo and not self.thumbnail):
+            if self.thumbnail:
+                self.thumbnail.delete(save=False)
+            thumb = build_thumbnail(self.photo) if self.photo else None
+            if thumb is not None:
+                self.thumbnail.save(thumb.name, thumb, save=False)
+            else:
+                self.thumbnail = None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'thumbnail'}
+
+        super().save(*args, **kwargs)
+
 
 class User(AbstractUser):
     """Custom user for future role tweaks (leave empty for now)."""
 
+    @cached_property
+    def group_names(self):
+        """The user's group names, loaded once per instance (i.e. once per request)."""
+        return frozenset(self.groups.values_list('name', flat=True))
+
+    @property
+    def has_firm_access(self):
+        return self.is_superuser or not self.group_names.isdisjoint(FIRM_GROUPS)
+
     @property
     def client(self):
         """Return related Client instance if present for backward compatibility."""
         return getattr(self, 'client_profile', None)
 
 
+# Visibility. Each visible_to() is a single query: firm staff get the
+# unfiltered queryset, everyone else an indexed filter on their own rows
+# (subqueries rather than joins, so no DISTINCT is needed).
+
+class ClientQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """A client's own record, plus clients of cases assigned to the user."""
+        if not user.is_authenticated:
+            return self.none()
+        if user.has_firm_access:
+            return self
+        return self.filter(
+            models.Q(user=user) | models.Q(pk__in=Case.objects.filter(lawyer=user).values('client_id'))
+        )
+
+
+class CaseQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Cases of the user's own client record, plus cases assigned to them."""
+        if not user.is_authenticated:
+            return self.none()
+        if user.has_firm_access:
+            return self
+        return self.filter(
+            models.Q(client__in=Client.objects.filter(user=user).values('pk')) | models.Q(lawyer=user)
+        )
+
+    def touch(self):
+        """Mark the cases changed without loading them (e.g. a document was added)."""
+        return self.update(version=models.F('version') + 1, updated_at=timezone.now())
+
+
+class DocumentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Documents of visible cases."""
+        if not user.is_authenticated:
+            return self.none()
+        if user.has_firm_access:
+            return self
+        return self.filter(case__in=Case.objects.visible_to(user).values('pk'))
+
+
+class MessageQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Messages in rooms the user belongs to; firm staff included, chats are private."""
+        if not user.is_authenticated:
+            return self.none()
+        return self.filter(room__in=ChatMembership.objects.filter(user=user).values('room_id'))
+
+
+class AppointmentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """A client's own appointments, and a lawyer's."""
+        if not user.is_authenticated:
+            return self.none()
+        if user.has_firm_access:
+            return self
+        return self.filter(
+            models.Q(client__in=Client.objects.filter(user=user).values('pk'))
+            | models.Q(lawyer__in=LawyerProfile.objects.filter(user=user).values('pk'))
+        )
+
+
+class BookingQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """A client's own bookings, and bookings of a lawyer's slots."""
+        if not user.is_authenticated:
+            return self.none()
+        if user.has_firm_access:
+            return self
+        return self.filter(
+            models.Q(client=user)
+            | models.Q(availability__in=Availability.objects.filter(lawyer__user=user).values('pk'))
+        )
+
+
 class Client(models.Model):
     user = models.OneToOneField(
         User, 
@@ -80,6 +193,8 @@ class Client(models.Model):
         blank=True  # Allow blank in forms
     )
 
+    objects = ClientQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
         verbose_name = 'Client'
@@ -87,6 +202,9 @@ class Client(models.Model):
         indexes = [
             models.Index(fields=['email'], name='client_email_idx'),
             models.Index(fields=['name'], name='client_name_idx'),
+            # Prefix search in core.autocomplete
+            models.Index(Lower('name'), name='client_name_lower_idx'),
+            models.Index(Lower('email'), name='client_email_lower_idx'),
         ]
 
     def __str__(self):
@@ -240,16 +358,38 @@ class Case(models.Model):
     status    = models.CharField(max_length=20, choices=STATUS, default='open')
     opened_on = models.DateField(auto_now_add=True)
     due_date  = models.DateField(null=True, blank=True)
+    # Change tracking for conditional GET: bumped on every save, and by
+    # signals whenever one of the case's documents changes
+    updated_at = models.DateTimeField(auto_now=True)
+    version   = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = CaseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lawyer', 'due_date'], name='case_lawyer_due_idx'),
+            models.Index(Lower('title'), name='case_title_lower_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'version', 'updated_at'}
+        super().save(*args, **kwargs)
+
 
 class Document(models.Model):
     title       = models.CharField(max_length=255, default='Untitled Document')
     case        = models.ForeignKey(Case, on_delete=models.CASCADE)
     file        = models.FileField(upload_to='docs/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    objects = DocumentQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -259,7 +399,16 @@ class Visitor(models.Model):
     name = models.CharField(max_length=255)
     email = models.EmailField()
     message = models.TextField()
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Set when the form is posted, not when core.intake writes the batch
+    submitted_at = models.DateTimeField(default=timezone.now)
+    # Filled in by core.intake: normalized-message hash for dedupe, 0-100 spam score
+    message_hash = models.CharField(max_length=64, blank=True, editable=False)
+    spam_score = models.PositiveSmallIntegerField(default=0, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['email', 'message_hash', 'submitted_at'], name='visitor_dedupe_idx'),
+        ]
 
     def __str__(self):
         return f"Inquiry from {self.name} on {self.submitted_at.strftime('%Y-%m-%d')}"
@@ -268,31 +417,41 @@ class Visitor(models.Model):
 class Appointment(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='appointments')
     lawyer = models.ForeignKey('LawyerProfile', on_delete=models.CASCADE)
+    DURATION_CHOICES = [
+        (15, '15 minutes'),
+        (30, '30 minutes'),
+        (45, '45 minutes'),
+        (60, '1 hour'),
+        (90, '1.5 hours'),
+        (120, '2 hours'),
+    ]
+
     date = models.DateField()
     time = models.TimeField()
+    duration = models.PositiveSmallIntegerField(choices=DURATION_CHOICES, default=30, help_text="Length in minutes")
     message = models.TextField(blank=True, null=True)
 
+    objects = AppointmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lawyer', 'date'], name='appointment_lawyer_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['lawyer', 'date', 'time'], name='appointment_unique_start'),
+        ]
+
     def clean(self):
-        # Cannot book in the past
-        if self.date < date.today():
-            raise ValidationError("Cannot book an appointment for a past date.")
-
-        # Check weekday
-        weekday_map = ['MON','TUE','WED','THU','FRI','SAT','SUN']
-        day_code = weekday_map[self.date.weekday()]
-        if day_code not in [a.day for a in Availability.objects.filter(lawyer=self.lawyer)]:
-            raise ValidationError(f"Lawyer is not available on {self.date.strftime('%A')}.")
-
-        # Check time is within availability
-        avail = Availability.objects.filter(lawyer=self.lawyer, day=day_code).first()
-        if avail:
-            if not (avail.start_time <= self.time <= avail.end_time):
-                raise ValidationError(f"Appointment time must be between {avail.start_time} and {avail.end_time}.")
-        else:
-            raise ValidationError("No availability found for this day.")
+        # Field errors (e.g. a missing date) are reported by the form already
+        if not (self.lawyer_id and self.date and self.time and self.duration):
+            return
+        from .availability import validate_slot
+        from .scheduling import check_appointment_conflict
+        validate_slot(self.lawyer_id, self.date, self.time, self.duration)
+        check_appointment_conflict(self.lawyer_id, self.date, self.time, self.duration, exclude_pk=self.pk)
 
     def __str__(self):
-        return f"Appointment for {self.client_name} with {self.lawyer.user.user} on {self.date} at {self.time}"
+        return f"Appointment for {self.client.name} with {self.lawyer.user} on {self.date} at {self.time}"
 
 # Lawyer availability
 class Availability(models.Model):
@@ -320,18 +479,58 @@ class Availability(models.Model):
         return f"{self.lawyer.user} available on {self.get_day_display()} from {self.start_time} to {self.end_time}"
 
 
+class ChatRoom(models.Model):
+    name = models.SlugField(max_length=255, unique=True)  # used in chat URLs
+    members = models.ManyToManyField(User, through='ChatMembership', related_name='chat_rooms')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def direct_room_name(cls, user_a, user_b):
+        low, high = sorted([user_a.pk, user_b.pk])
+        return f"dm-{low}-{high}"
+
+    @classmethod
+    def get_or_create_direct(cls, user_a, user_b):
+        """Return the one-to-one room between two users, creating it if needed."""
+        room, _ = cls.objects.get_or_create(name=cls.direct_room_name(user_a, user_b))
+        for user in {user_a, user_b}:
+            ChatMembership.objects.get_or_create(room=room, user=user)
+        return room
+
+
+class ChatMembership(models.Model):
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_memberships')
+    joined_at = models.DateTimeField(auto_now_add=True)
+    last_read_id = models.PositiveBigIntegerField(default=0)  # highest message id seen
+
+    class Meta:
+        unique_together = ('user', 'room')
+
+    def __str__(self):
+        return f"{self.user} in {self.room}"
+
+
 class Message(models.Model):
-    room_name = models.CharField(max_length=255)  # identify which chat room
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['room', 'id'], name='message_room_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.text[:30]}"
-    
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -344,6 +543,211 @@ class Booking(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     booked_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BookingQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.client} booked {self.availability} ({self.status})"
 
+
+
+class Notification(models.Model):
+    """
+    Outbox row for a user-facing notification. Rows are written in the same
+    transaction as the status change that caused them and delivered later
+    by ``manage.py run_notifier``.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=50)
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.recipient} ({self.status})"
+
+
+class ChangeLogQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Entries whose object the user could see when it changed. Uses the
+        scope columns rather than the objects, which may be gone.
+        """
+        if not user.is_authenticated:
+            return self.none()
+        in_my_rooms = models.Q(
+            model='message', room_id__in=ChatMembership.objects.filter(user=user).values('room_id'),
+        )
+        others = ~models.Q(model='message')
+        if not user.has_firm_access:
+            others &= models.Q(client_user_id=user.pk) | models.Q(lawyer_user_id=user.pk)
+        return self.filter(in_my_rooms | others)
+
+
+class ChangeLogEntry(models.Model):
+    """
+    One row per create/update/delete of a synced model, written by signals
+    and read by core.sync. The id is the feed position. Scope columns are
+    plain integers (no foreign keys) so entries outlive their objects.
+    """
+    model = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    client_user_id = models.PositiveBigIntegerField(null=True, blank=True)
+    lawyer_user_id = models.PositiveBigIntegerField(null=True, blank=True)
+    room_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ChangeLogQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['model', 'object_id'], name='changelog_object_idx'),
+            models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.model} {self.object_id}{' deleted' if self.deleted else ''}"
+
+
+class CaseBulkChange(models.Model):
+    """
+    Audit record for one set-based operation from core.caseops (admin
+    actions, ``manage.py reassign_cases``): one row however many cases
+    it touched.
+    """
+    ACTIONS = [
+        ('status', 'Status change'),
+        ('reassign', 'Lawyer reassignment'),
+        ('shift_due', 'Due date shift'),
+    ]
+
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    params = models.JSONField(default=dict, blank=True)
+    case_ids = models.JSONField(default=list, blank=True)  # the cases actually changed
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)  # matched but already in the target state
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    source = models.CharField(max_length=20, default='admin')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return f"{self.get_action_display()} of {self.updated} case(s)"
+
+
+class CaseActivityQuerySet(models.QuerySet):
+    def timeline(self, case_id, before=None):
+        """
+        A case's entries, newest first. ``before`` is a ``(created_at, id)``
+        cursor from the previous page: keyset pagination on the
+        (case, created_at, id) index, so every page costs the same.
+        """
+        entries = self.filter(case_id=case_id)
+        if before is not None:
+            created_at, pk = before
+            # The plain range lets the index seek; the OR breaks ties on id
+            entries = entries.filter(created_at__lte=created_at).filter(
+                models.Q(created_at__lt=created_at) | models.Q(created_at=created_at, pk__lt=pk)
+            )
+        return entries.order_by('-created_at', '-pk')
+
+
+class CaseActivity(models.Model):
+    """
+    Append-only history of a case, written in batches by core.activity.
+    The case and actor are not foreign key constraints, so entries
+    outlive deleted cases and users until the retention policy
+    (``manage.py prune_activity``) removes them.
+    """
+    VERBS = [
+        ('opened', 'Case opened'),
+        ('status', 'Status changed'),
+        ('reassigned', 'Lawyer changed'),
+        ('due_date', 'Due date changed'),
+        ('document_added', 'Document added'),
+        ('document_removed', 'Document removed'),
+    ]
+
+    # activity_case_time_idx covers lookups by case
+    case = models.ForeignKey(Case, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    verb = models.CharField(max_length=20, choices=VERBS)
+    detail = models.JSONField(default=dict, blank=True)
+    actor = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name='+',
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = CaseActivityQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['case', 'created_at', 'id'], name='activity_case_time_idx'),
+            models.Index(fields=['created_at'], name='activity_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_verb_display()} on case {self.case_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Case activity is append-only.")
+        super().save(*args, **kwargs)
+
+
+class CaseloadStat(models.Model):
+    """
+    One counter of the materialized caseload statistics (core.caseload):
+    how many cases or bookings a lawyer has in a status, optionally on one
+    due date. Maintained incrementally; ``manage.py reconcile_caseload``
+    rebuilds it from scratch.
+    """
+    METRICS = [
+        ('cases', 'Cases'),
+        ('cases_due', 'Cases by due date'),
+        ('bookings', 'Bookings'),
+    ]
+
+    metric = models.CharField(max_length=20, choices=METRICS)
+    # Not a constraint: a deleted lawyer's counters are moved to "unassigned"
+    lawyer = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                               null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20)
+    day = models.DateField(null=True, blank=True)  # the due date, for cases_due only
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # NULLs are distinct in a plain unique constraint, so compare them as 0/0001-01-01
+            models.UniqueConstraint(
+                'metric', Coalesce('lawyer', models.Value(0)), 'status',
+                Coalesce('day', models.Value(date.min)), name='caseload_stat_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['metric', 'day'], name='caseload_metric_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.status} lawyer={self.lawyer_id} day={self.day}: {self.count}"
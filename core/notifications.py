@@ -0,0 +1,179 @@
+"""
+Notification outbox and delivery.
+
+Views and signals only ever call ``notify()`` (``notify_many()`` for bulk
+operations), which inserts pending Notification rows and returns
+immediately. ``deliver_pending()`` (driven by
+``manage.py run_notifier``) claims due rows in batches, sends their
+emails over a single backend connection outside any transaction, pushes them to the recipient's
+open WebSocket connections and reschedules failures with exponential
+backoff.
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+BACKOFF_BASE_SECONDS = getattr(settings, 'NOTIFICATION_BACKOFF_SECONDS', 30)
+BACKOFF_MAX_SECONDS = 60 * 60
+# How long a claimed batch is leased to a worker before it's due again
+CLAIM_SECONDS = getattr(settings, 'NOTIFICATION_CLAIM_SECONDS', 5 * 60)
+
+
+def user_group_name(user_id):
+    """Channels group every connection of a user joins."""
+    return f"notifications_{user_id}"
+
+
+def notify(recipient, kind, subject, body='', *, using=None, **payload):
+    if recipient is None:
+        return None
+    # ``using`` keeps the outbox row in the database the triggering write went to
+    return Notification.objects.using(using).create(
+        recipient=recipient, kind=kind, subject=subject, body=body, payload=payload,
+    )
+
+
+def notify_many(notifications, *, using=None):
+    """
+    notify() for set-based updates: ``notifications`` yields
+    ``(recipient_id, kind, subject, body, payload)``. One INSERT per batch.
+    """
+    rows = [
+        Notification(recipient_id=recipient_id, kind=kind, subject=subject, body=body, payload=payload)
+        for recipient_id, kind, subject, body, payload in notifications if recipient_id is not None
+    ]
+    return Notification.objects.using(using).bulk_create(rows, batch_size=500)
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _push(notifications):
+    """Best-effort real-time push; email delivery is the durable channel."""
+    try:
+        from channels.layers import get_channel_layer
+        channel_layer = get_channel_layer()
+    except Exception:
+        logger.warning("Channel layer unavailable, skipping real-time push", exc_info=True)
+        return
+    if channel_layer is None:
+        return
+
+    for notification in notifications:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                user_group_name(notification.recipient_id),
+                {
+                    'type': 'notify',
+                    'id': notification.pk,
+                    'kind': notification.kind,
+                    'subject': notification.subject,
+                    'body': notification.body,
+                    'payload': notification.payload,
+                },
+            )
+        except Exception:
+            logger.warning("Real-time push failed for notification %s", notification.pk, exc_info=True)
+
+
+def _claim(batch_size, now):
+    """
+    Lease up to ``batch_size`` due notifications to this worker: their
+    ``next_attempt_at`` moves CLAIM_SECONDS ahead and ``attempts`` goes up,
+    in one short transaction. The lease time doubles as the claim token,
+    so rows another worker leased between our SELECT and UPDATE (SQLite
+    has no ``SKIP LOCKED``) are left out.
+    """
+    lease_until = now + timedelta(seconds=CLAIM_SECONDS)
+    with transaction.atomic():
+        due = Notification.objects.filter(status='pending', next_attempt_at__lte=now)
+        ids = list(
+            due.select_for_update(skip_locked=True)
+            .order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        due.filter(id__in=ids).update(next_attempt_at=lease_until, attempts=F('attempts') + 1)
+        return list(
+            Notification.objects.select_related('recipient')
+            .filter(id__in=ids, status='pending', next_attempt_at=lease_until).order_by('next_attempt_at', 'id')
+        )
+
+
+def _send(batch):
+    """Email ``batch`` over one backend connection; returns ``(sent, failed)``."""
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for notification in batch:
+            if not notification.recipient.email:
+                # Nothing to email; the WebSocket push is all we can do
+                sent.append(notification)
+                continue
+            message = EmailMessage(
+                subject=notification.subject,
+                body=notification.body,
+                to=[notification.recipient.email],
+                connection=connection,
+            )
+            try:
+                message.send()
+                sent.append(notification)
+            except Exception as e:
+                notification.last_error = str(e)
+                failed.append(notification)
+    except Exception as e:
+        # Could not open the connection, so nothing in the batch went out
+        logger.warning("Email backend unavailable: %s", e)
+        for notification in batch:
+            notification.last_error = str(e)
+        sent, failed = [], batch
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def deliver_pending(batch_size=50):
+    """
+    Deliver one batch of due notifications. Returns ``(sent, failed)``.
+
+    No transaction is open while emails go out: the batch is claimed in
+    one short transaction and the results are recorded in another, so a
+    slow SMTP server never holds SQLite's write lock. A worker that dies
+    mid-batch leaves its rows leased; they come due again after
+    CLAIM_SECONDS, so a notification may be emailed twice but never lost.
+    """
+    batch = _claim(batch_size, timezone.now())
+    if not batch:
+        return 0, 0
+
+    sent, failed = _send(batch)
+
+    now = timezone.now()
+    for notification in sent:
+        notification.status = 'sent'
+        notification.sent_at = now
+        notification.last_error = ''
+    for notification in failed:
+        if notification.attempts >= MAX_ATTEMPTS:
+            notification.status = 'failed'
+        else:
+            notification.next_attempt_at = now + backoff_delay(notification.attempts)
+    with transaction.atomic():
+        Notification.objects.bulk_update(batch, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+
+    _push(sent)
+    return len(sent), len(failed)
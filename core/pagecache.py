@@ -0,0 +1,82 @@
+"""
+Full-page caching for anonymous visitors.
+
+The page is rendered once with a placeholder where ``{% csrf_token %}``
+goes and stored in the Django cache. Each request gets the cached body with
+its own CSRF token substituted, so the form keeps working.
+
+Responses carry an ETag and Last-Modified and conditional requests get a
+304. The ETag covers the visitor's CSRF secret as well as the page, so a
+browser is never told to reuse a copy whose token no longer matches its
+cookie.
+
+Authenticated users, pages with pending flash messages and non-GET
+requests always render normally.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+CSRF_PLACEHOLDER = '__CSRF_TOKEN_PLACEHOLDER__'
+CACHE_PREFIX = 'core:page:'
+
+
+def is_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not request.GET
+        # len() loads pending messages without marking them as shown
+        and not len(messages.get_messages(request))
+    )
+
+
+def _build(name, template_name, get_context, request):
+    context = {**get_context(), 'csrf_token': CSRF_PLACEHOLDER}
+    body = render_to_string(template_name, context, request)
+    entry = {
+        'body': body,
+        'digest': hashlib.sha256(body.encode('utf-8')).hexdigest()[:32],
+        'modified': int(time.time()),
+    }
+    cache.set(CACHE_PREFIX + name, entry, getattr(settings, 'PAGE_CACHE_SECONDS', 300))
+    return entry
+
+
+def cached_page(request, name, template_name, get_context):
+    """
+    Return the response for ``template_name`` from the page cache, or None
+    when the request must be rendered normally. ``get_context`` is only
+    called on a cache miss.
+    """
+    if not getattr(settings, 'PAGE_CACHE_SECONDS', 300) or not is_cacheable(request):
+        return None
+    entry = cache.get(CACHE_PREFIX + name) or _build(name, template_name, get_context, request)
+
+    token = get_token(request)
+    secret = request.META.get('CSRF_COOKIE', '')
+    etag = '"%s"' % hashlib.sha256(f"{entry['digest']}:{secret}".encode()).hexdigest()[:32]
+    # If-Modified-Since alone can't tell whether the client's copy has a
+    # valid token, so it only counts alongside a matching If-None-Match
+    last_modified = entry['modified'] if 'HTTP_IF_NONE_MATCH' in request.META else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(entry['body'].replace(CSRF_PLACEHOLDER, token))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['modified'])
+    # Personalised by the CSRF token: browsers may keep it, shared caches may not
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def invalidate(name):
+    cache.delete(CACHE_PREFIX + name)
@@ -0,0 +1,44 @@
+"""
+Chat room presence.
+
+Each worker process keeps a PresenceRegistry mapping room -> channel name ->
+user. The registry is only ever changed in response to channel layer
+events (join, leave, announce), so every process that hosts a consumer in
+a room converges on the same view of who is connected, without a shared
+store. Keying by channel name makes every update idempotent: processes
+with several consumers in the same room apply each event once per
+consumer, harmlessly.
+"""
+from collections import defaultdict
+from threading import Lock
+
+
+class PresenceRegistry:
+    def __init__(self):
+        self._rooms = defaultdict(dict)
+        self._lock = Lock()
+
+    def join(self, room, channel_name, user_id, username):
+        with self._lock:
+            self._rooms[room][channel_name] = (user_id, username)
+
+    def leave(self, room, channel_name):
+        with self._lock:
+            members = self._rooms.get(room)
+            if members is None:
+                return
+            members.pop(channel_name, None)
+            if not members:
+                del self._rooms[room]
+
+    def online(self, room):
+        """Return ``{user_id: username}`` for users with at least one connection."""
+        with self._lock:
+            return dict(self._rooms.get(room, {}).values())
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+
+
+registry = PresenceRegistry()
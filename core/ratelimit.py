@@ -0,0 +1,214 @@
+"""
+Rate limiting for views and WebSocket consumers.
+
+Limits are named and configured in ``RATELIMIT_RATES`` as ``"count/period"``
+strings, where period is ``s``, ``m``, ``h`` or ``d`` with an optional
+multiplier (``"20/10s"``, ``"5/h"``). The store is chosen with
+``RATELIMIT_STORE``:
+
+* ``TokenBucketStore`` (default) - in-process token bucket; allows short
+  bursts up to ``count`` and refills continuously.
+* ``SlidingWindowStore`` - in-process exact sliding-window log.
+* ``CacheStore`` - sliding-window counter in the Django cache, shared by
+  every process when the cache is (for example) Redis or Memcached.
+
+Every rejected hit is logged and counted; ``over_limit_counts()`` exposes
+the counters for metrics.
+"""
+import logging
+import re
+import time
+from collections import Counter, deque
+from functools import lru_cache, wraps
+from threading import Lock
+
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = 'core.ratelimit.TokenBucketStore'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+_over_limit = Counter()
+_over_limit_lock = Lock()
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``"20/10s"`` -> ``(20, 10.0)``: at most 20 hits per 10 seconds."""
+    match = RATE_RE.match(rate.replace(' ', ''))
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '5/m' or '20/10s'")
+    count, multiplier, unit = match.groups()
+    return int(count), float(int(multiplier or 1) * PERIODS[unit])
+
+
+class TokenBucketStore:
+    # Full buckets are forgotten every SWEEP_EVERY calls to bound memory
+    SWEEP_EVERY = 1000
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = {}
+        self._lock = Lock()
+        self._calls = 0
+
+    def allow(self, key, limit, period):
+        now = self.clock()
+        refill = limit / period
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (limit, now, period))
+            tokens = min(limit, tokens + (now - updated) * refill)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now, period)
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+        return allowed
+
+    def _sweep(self, now):
+        # A bucket idle for a full period has refilled completely
+        stale = [key for key, (_, updated, period) in self._buckets.items() if now - updated > period]
+        for key in stale:
+            del self._buckets[key]
+
+
+class SlidingWindowStore:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._logs = {}
+        self._lock = Lock()
+
+    def allow(self, key, limit, period):
+        now = self.clock()
+        with self._lock:
+            log = self._logs.setdefault(key, deque())
+            while log and log[0] <= now - period:
+                log.popleft()
+            if len(log) >= limit:
+                return False
+            log.append(now)
+            return True
+
+
+class CacheStore:
+    """
+    Sliding-window counter: the previous fixed window's count is weighted by
+    how much of it still overlaps the sliding window. Two cache keys per
+    client, atomic increments, safe across processes.
+    """
+
+    def __init__(self, clock=time.time, backend=None):
+        self.clock = clock
+        self.cache = backend or cache
+
+    def allow(self, key, limit, period):
+        now = self.clock()
+        window = int(now // period)
+        current_key = f"ratelimit:{key}:{window}"
+        previous = self.cache.get(f"ratelimit:{key}:{window - 1}", 0)
+        self.cache.add(current_key, 0, timeout=int(period * 2) + 1)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.set(current_key, 1, timeout=int(period * 2) + 1)
+            current = 1
+        overlap = 1 - (now % period) / period
+        return previous * overlap + current <= limit
+
+
+@lru_cache(maxsize=None)
+def _store(path):
+    return import_string(path)()
+
+
+def get_store():
+    return _store(getattr(settings, 'RATELIMIT_STORE', DEFAULT_STORE))
+
+
+def hit(name, key):
+    """
+    Record a hit for ``key`` against the limit ``name``; return whether it is
+    allowed. Limits missing from RATELIMIT_RATES are not enforced.
+    """
+    rate = getattr(settings, 'RATELIMIT_RATES', {}).get(name)
+    if not rate or not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return True
+    limit, period = parse_rate(rate)
+    if get_store().allow(f"{name}:{key}", limit, period):
+        return True
+    with _over_limit_lock:
+        _over_limit[name] += 1
+    logger.warning("Rate limit %s exceeded by %s", name, key)
+    return False
+
+
+def over_limit_counts():
+    """Rejected hits per limit name since the process started."""
+    with _over_limit_lock:
+        return dict(_over_limit)
+
+
+def reset():
+    """Forget all buckets and counters (used by tests)."""
+    _store.cache_clear()
+    with _over_limit_lock:
+        _over_limit.clear()
+
+
+def client_key(user, address):
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{address or 'unknown'}"
+
+
+def ratelimit(name, methods=('POST',)):
+    """
+    View decorator: answer 429 once the client exceeds the ``name`` limit.
+    Only ``methods`` count, so a form page can be viewed freely while its
+    submissions are limited.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                key = client_key(getattr(request, 'user', None), request.META.get('REMOTE_ADDR'))
+                if not hit(name, key):
+                    return HttpResponse(
+                        'Too many requests. Please wait a moment and try again.', status=429
+                    )
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """
+    Channels middleware dropping incoming WebSocket frames over the ``name``
+    limit before they reach the consumer. Must sit inside the auth
+    middleware so frames are counted per user rather than per IP.
+    """
+
+    def __init__(self, inner, name='websocket'):
+        super().__init__(inner)
+        self.name = name
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'websocket':
+            return await super().__call__(scope, receive, send)
+        client = scope.get('client') or (None,)
+        key = client_key(scope.get('user'), client[0])
+
+        async def limited_receive():
+            while True:
+                event = await receive()
+                if event['type'] != 'websocket.receive' or hit(self.name, key):
+                    return event
+
+        return await super().__call__(scope, limited_receive, send)
@@ -4,5 +4,6 @@ from . import consumers
 from core import consumers
 
 websocket_urlpatterns = [
-    re_path(r'ws/chat/(?P<lawyer_id>\w+)/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/chat/(?P<room_name>[-\w]+)/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Overlap detection for a lawyer's appointments on a single day.
+
+An appointment can only overlap ``[start, end)`` if it starts before
+``end`` and no more than the longest allowed duration before ``start``.
+So the check is one range query on the unique (lawyer, date, time)
+index that reads just that window, however many appointments the day
+has. The window also finds a long appointment hidden behind shorter
+ones, so it doesn't rely on existing appointments being disjoint.
+"""
+from datetime import time
+
+from django.core.exceptions import ValidationError
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def find_conflict(lawyer_id, day, start, end, exclude_pk=None):
+    """
+    Return ``(start, end, pk)`` of an appointment overlapping the
+    half-open minute interval ``[start, end)``, or None. One query.
+    """
+    from .models import Appointment
+
+    longest = max(minutes for minutes, _ in Appointment.DURATION_CHOICES)
+    rows = Appointment.objects.filter(lawyer_id=lawyer_id, date=day)
+    if start > longest:
+        rows = rows.filter(time__gt=to_time(start - longest))
+    if end < 24 * 60:
+        rows = rows.filter(time__lt=to_time(end))
+    if exclude_pk is not None:
+        rows = rows.exclude(pk=exclude_pk)
+    for at, duration, pk in rows.order_by('time').values_list('time', 'duration', 'pk'):
+        if to_minutes(at) + duration > start:
+            return to_minutes(at), to_minutes(at) + duration, pk
+    return None
+
+
+def check_appointment_conflict(lawyer_id, day, at, duration, exclude_pk=None):
+    """Raise ValidationError if the slot overlaps an existing appointment."""
+    start = to_minutes(at)
+    conflict = find_conflict(lawyer_id, day, start, start + duration, exclude_pk=exclude_pk)
+    if conflict is not None:
+        raise ValidationError(
+            f"This lawyer already has an appointment from {format_minutes(conflict[0])} "
+            f"to {format_minutes(conflict[1])} that day."
+        )
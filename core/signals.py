@@ -0,0 +1,210 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import activity, caseload, sync
+from .models import Appointment, Availability, Booking, Case, Document, LawyerProfile, User
+from .availability import invalidate_availability
+from .directory import invalidate_lawyer_directory
+from .notifications import notify
+
+
+@receiver(post_save, sender=LawyerProfile)
+@receiver(post_delete, sender=LawyerProfile)
+def lawyer_profile_changed(sender, instance, **kwargs):
+    invalidate_lawyer_directory()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the directory doesn't show
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_lawyer_directory()
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def document_changed(sender, instance, using, **kwargs):
+    # The case page lists its documents, so its ETag has to change too;
+    # sync clients get the case's new version
+    Case.objects.using(using).filter(pk=instance.case_id).touch()
+    case = Case.objects.using(using).filter(pk=instance.case_id).first()
+    if case is not None:
+        sync.record(case, using=using)
+
+
+# Change log for core.sync
+
+def record_sync_change(sender, instance, using, signal, **kwargs):
+    sync.record(instance, deleted=signal is post_delete, using=using)
+
+
+for _model in sync.MODEL_NAMES:
+    post_save.connect(record_sync_change, sender=_model, dispatch_uid=f'core.sync.save.{_model.__name__}')
+    post_delete.connect(record_sync_change, sender=_model, dispatch_uid=f'core.sync.delete.{_model.__name__}')
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def availability_changed(sender, instance, **kwargs):
+    invalidate_availability(instance.lawyer_id)
+
+
+# The tracked fields as loaded are kept on the instance, in one snapshot
+# that the notification, activity and caseload receivers below all read,
+# so post_save can tell a transition from a plain re-save without querying
+# the old row. Deferred fields are NOT_LOADED. refresh_loaded_state, at
+# the end of this module, takes the next snapshot once every post_save
+# receiver has seen this one.
+
+TRACKED_FIELDS = {Case: ('status', 'lawyer_id', 'due_date'), Booking: ('status', 'availability_id')}
+NOT_LOADED = object()
+
+
+def _snapshot(instance, fields):
+    return {name: instance.__dict__.get(name, NOT_LOADED) for name in fields}
+
+
+@receiver(post_init, sender=Booking)
+@receiver(post_init, sender=Case)
+def remember_loaded_state(sender, instance, **kwargs):
+    instance._loaded = _snapshot(instance, TRACKED_FIELDS[sender])
+
+
+# Status-transition notifications
+
+@receiver(post_save, sender=Booking)
+def booking_status_changed(sender, instance, created, using, **kwargs):
+    previous = instance._loaded['status']
+    slot = instance.availability
+    if created:
+        notify(
+            slot.lawyer.user, 'booking_requested',
+            f"New booking request from {instance.client.get_full_name() or instance.client.username}",
+            f"{slot.get_day_display()} {slot.start_time:%H:%M}-{slot.end_time:%H:%M} is awaiting your approval.",
+            booking_id=instance.pk, status=instance.status, using=using,
+        )
+    elif previous is not NOT_LOADED and previous != instance.status:
+        notify(
+            instance.client, 'booking_status',
+            f"Your booking was {instance.get_status_display().lower()}",
+            f"Your booking for {slot.get_day_display()} {slot.start_time:%H:%M}-{slot.end_time:%H:%M} "
+            f"is now {instance.get_status_display().lower()}.",
+            booking_id=instance.pk, status=instance.status, previous=previous, using=using,
+        )
+
+
+@receiver(post_save, sender=Case)
+def case_status_changed(sender, instance, created, using, **kwargs):
+    previous = instance._loaded['status']
+    if created or previous is NOT_LOADED or previous == instance.status:
+        return
+    subject = f'Case "{instance.title}" is now {instance.get_status_display().lower()}'
+    for recipient in {instance.client.user, instance.lawyer} - {None}:
+        notify(
+            recipient, 'case_status', subject, subject + '.',
+            case_id=instance.pk, status=instance.status, previous=previous, using=using,
+        )
+
+
+# Case activity log (core.activity); deferred fields are not tracked
+
+@receiver(post_save, sender=Case)
+def case_activity(sender, instance, created, using, **kwargs):
+    loaded = instance._loaded
+    if created:
+        activity.record(instance.pk, 'opened', {'title': instance.title}, using=using)
+        return
+    changed = {
+        name: (loaded[name], getattr(instance, name)) for name in TRACKED_FIELDS[Case]
+        if loaded[name] is not NOT_LOADED and loaded[name] != getattr(instance, name)
+    }
+    if 'status' in changed:
+        activity.record(instance.pk, 'status', dict(zip(('from', 'to'), changed['status'])), using=using)
+    if 'lawyer_id' in changed:
+        labels = activity.user_labels(changed['lawyer_id'], using)
+        activity.record(instance.pk, 'reassigned',
+                        {'from': labels[changed['lawyer_id'][0]], 'to': labels[changed['lawyer_id'][1]]}, using=using)
+    if 'due_date' in changed:
+        dates = [day.isoformat() if day else None for day in changed['due_date']]
+        activity.record(instance.pk, 'due_date', dict(zip(('from', 'to'), dates)), using=using)
+
+
+@receiver(post_save, sender=Document)
+def document_added(sender, instance, created, using, **kwargs):
+    if created:
+        activity.record(instance.case_id, 'document_added',
+                        {'document_id': instance.pk, 'title': instance.title}, using=using)
+
+
+@receiver(post_delete, sender=Document)
+def document_removed(sender, instance, using, **kwargs):
+    activity.record(instance.case_id, 'document_removed',
+                    {'document_id': instance.pk, 'title': instance.title}, using=using)
+
+
+# Caseload statistics (core.caseload); a deferred field counts as unchanged.
+# The order of the fields is the order core.caseload's deltas take them in.
+
+CASELOAD_FIELDS = {Case: ('lawyer_id', 'status', 'due_date'), Booking: ('availability_id', 'status')}
+
+
+def _caseload_saved(instance):
+    """The counted fields as they are in the database before this save or delete."""
+    loaded = instance._loaded
+    return tuple(
+        getattr(instance, name) if loaded[name] is NOT_LOADED else loaded[name]
+        for name in CASELOAD_FIELDS[type(instance)]
+    )
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=Case)
+def caseload_saved(sender, instance, created, using, **kwargs):
+    old = None if created else _caseload_saved(instance)
+    new = tuple(getattr(instance, name) for name in CASELOAD_FIELDS[sender])
+    if old != new:
+        deltas = caseload.case_deltas if sender is Case else caseload.booking_deltas
+        caseload.apply(deltas(old, new, using=using), using)
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Case)
+def caseload_deleted(sender, instance, using, **kwargs):
+    deltas = caseload.case_deltas if sender is Case else caseload.booking_deltas
+    caseload.apply(deltas(_caseload_saved(instance), None, using=using), using)
+
+
+@receiver(post_delete, sender=User)
+def caseload_lawyer_deleted(sender, instance, using, **kwargs):
+    # Their cases were unassigned by an UPDATE, without Case signals
+    caseload.lawyer_removed(instance.pk, using)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_booked(sender, instance, created, using, **kwargs):
+    # Appointments have no status of their own; booking one is the transition
+    if not created:
+        return
+    when = f"{instance.date:%A %d %B} at {instance.time:%H:%M}"
+    notify(
+        instance.lawyer.user, 'appointment_booked',
+        f"New appointment with {instance.client.name}",
+        f"{instance.client.name} booked {instance.duration} minutes on {when}.",
+        appointment_id=instance.pk, using=using,
+    )
+    notify(
+        instance.client.user, 'appointment_booked',
+        "Your appointment is booked",
+        f"Your appointment is on {when}.",
+        appointment_id=instance.pk, using=using,
+    )
+
+
+# Connected after every post_save receiver above, so they all saw the state
+# from before this save
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=Case)
+def refresh_loaded_state(sender, instance, **kwargs):
+    instance._loaded = _snapshot(instance, TRACKED_FIELDS[sender])
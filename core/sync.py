@@ -0,0 +1,238 @@
+"""
+Incremental sync for offline-capable clients.
+
+Signals append a ChangeLogEntry for every save and delete of the synced
+models. ``GET /api/sync/`` pages through that log using an opaque, signed
+token:
+
+* With no token, the client gets a snapshot: every object it can see,
+  one model at a time in id order. The last snapshot page hands over to
+  the change feed at the log position taken when the snapshot started, so
+  nothing written during the snapshot is missed.
+* With a token, the client gets the changes after the token's position.
+  Each change is either an upsert with the object's current fields or a
+  delete. Several changes to one object within a page collapse into one.
+
+The log is filtered with ChangeLogEntry.objects.visible_to, and upserts
+are loaded through each model's visible_to, so a client only receives
+what it may see.
+
+``compact()`` (``manage.py compact_changelog``) removes entries older
+than SYNC_RETENTION_DAYS and entries superseded by a newer entry for the
+same object and scope. A token older than the retention period may have
+lost entries to compaction, so it is refused with ``reset`` and the
+client starts over with a snapshot. Entries younger than SYNC_SETTLE_SECONDS
+are held back, because a transaction that commits late can make a
+smaller id visible after a larger one has been served.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Appointment, Availability, Booking, Case, ChangeLogEntry, Client, Document, LawyerProfile, Message,
+)
+
+TOKEN_SALT = 'core.sync'
+MAX_PAGE_SIZE = 1000
+
+# name -> (model, fields sent to clients); snapshot order follows this
+SYNCED = {
+    'client': (Client, ('id', 'user_id', 'name', 'email', 'phone', 'address', 'date_of_birth', 'updated_at')),
+    'case': (Case, ('id', 'title', 'client_id', 'description', 'lawyer_id', 'status', 'opened_on', 'due_date',
+                    'updated_at', 'version')),
+    'document': (Document, ('id', 'title', 'case_id', 'file', 'uploaded_at', 'updated_at')),
+    'booking': (Booking, ('id', 'availability_id', 'client_id', 'status', 'booked_at')),
+    'appointment': (Appointment, ('id', 'client_id', 'lawyer_id', 'date', 'time', 'duration', 'message')),
+    'message': (Message, ('id', 'room_id', 'sender_id', 'text', 'timestamp')),
+}
+MODEL_NAMES = {model: name for name, (model, _) in SYNCED.items()}
+
+
+class TokenError(Exception):
+    """The token is malformed (``reset`` False) or too old to resume from (``reset`` True)."""
+
+    def __init__(self, message, reset=False):
+        super().__init__(message)
+        self.reset = reset
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Recording
+
+def scope(instance, using=None):
+    """Return ``(client_user_id, lawyer_user_id, room_id)`` for a synced object."""
+    def user_of(model, pk, field='user_id'):
+        return model.objects.using(using).filter(pk=pk).values_list(field, flat=True).first()
+
+    if isinstance(instance, Message):
+        return None, None, instance.room_id
+    if isinstance(instance, Client):
+        return instance.user_id, None, None
+    if isinstance(instance, Case):
+        return user_of(Client, instance.client_id), instance.lawyer_id, None
+    if isinstance(instance, Document):
+        row = Case.objects.using(using).filter(pk=instance.case_id).values_list('client__user_id', 'lawyer_id').first()
+        return (*(row or (None, None)), None)
+    if isinstance(instance, Booking):
+        return instance.client_id, user_of(Availability, instance.availability_id, 'lawyer__user_id'), None
+    if isinstance(instance, Appointment):
+        return user_of(Client, instance.client_id), user_of(LawyerProfile, instance.lawyer_id), None
+    raise TypeError(f"{type(instance).__name__} is not synced")
+
+
+SCOPE_FIELDS = ('client_user_id', 'lawyer_user_id', 'room_id')
+
+
+def record(instance, deleted=False, using=None):
+    """Append a change for ``instance``; called from signals."""
+    name = MODEL_NAMES[type(instance)]
+    entries = ChangeLogEntry.objects.using(using)
+    current = scope(instance, using)
+    previous = (
+        entries.filter(model=name, object_id=instance.pk).order_by('-id').values_list(*SCOPE_FIELDS).first()
+    )
+    if previous is not None and previous != current:
+        # The object moved (a case reassigned, say): log it under the old
+        # scope as well, so users who lose sight of it are told to drop it
+        entries.create(model=name, object_id=instance.pk, deleted=deleted, **dict(zip(SCOPE_FIELDS, previous)))
+    entries.create(model=name, object_id=instance.pk, deleted=deleted, **dict(zip(SCOPE_FIELDS, current)))
+
+
+def record_bulk(name, changes, using=None):
+    """
+    record() for set-based updates, which send no signals. ``changes``
+    yields ``(object_id, old_scope, new_scope)``; as in record(), an entry
+    under the old scope is added when the two differ.
+    """
+    entries = []
+    for object_id, old, new in changes:
+        for scope_values in ((old, new) if old != new else (new,)):
+            entries.append(ChangeLogEntry(model=name, object_id=object_id, **dict(zip(SCOPE_FIELDS, scope_values))))
+    ChangeLogEntry.objects.using(using).bulk_create(entries, batch_size=500)
+
+
+def compact(now=None):
+    """Drop expired and superseded entries; return the number removed."""
+    now = now or timezone.now()
+    # Tokens hold ids, which are never reused (AUTOINCREMENT on SQLite,
+    # sequences elsewhere), so any entry can go, the newest included
+    entries = ChangeLogEntry.objects.all()
+    cutoff = now - timedelta(days=_setting('SYNC_RETENTION_DAYS', 30))
+    expired, _ = entries.filter(created_at__lt=cutoff).delete()
+    # Superseded means a newer entry for the same object and scope; the
+    # last entry under an old scope is what tells its users to drop it
+    same_scope = {f'{field}_': Coalesce(OuterRef(field), 0) for field in SCOPE_FIELDS}
+    newer = (
+        ChangeLogEntry.objects
+        .annotate(**{f'{field}_': Coalesce(field, 0) for field in SCOPE_FIELDS})
+        .filter(model=OuterRef('model'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'), **same_scope)
+    )
+    superseded, _ = entries.filter(Exists(newer)).delete()
+    return expired + superseded
+
+
+# Tokens
+
+def make_token(**state):
+    return signing.dumps(state, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token):
+    try:
+        state = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise TokenError("Invalid sync token.") from None
+    retention = _setting('SYNC_RETENTION_DAYS', 30) * 86400
+    if time.time() - state['t'] > retention:
+        raise TokenError("Sync token expired; start a new snapshot.", reset=True)
+    return state
+
+
+# Feed
+
+def serialize(name, rows):
+    return [{'model': name, 'id': row['id'], 'op': 'upsert', 'data': row} for row in rows]
+
+
+def snapshot_page(user, state, limit):
+    names = list(SYNCED)
+    name = names[state['m']]
+    model, fields = SYNCED[name]
+    rows = list(model.objects.visible_to(user).filter(pk__gt=state['a']).order_by('pk').values(*fields)[:limit + 1])
+    has_more_here = len(rows) > limit
+    rows = rows[:limit]
+    if has_more_here:
+        next_state = {**state, 'a': rows[-1]['id']}
+    elif state['m'] + 1 < len(names):
+        next_state = {**state, 'm': state['m'] + 1, 'a': 0}
+    else:
+        # Snapshot complete: replay everything logged since it started
+        next_state = {'p': state['h'], 't': state['t']}
+    # Always more to fetch: the change feed follows the snapshot
+    return serialize(name, rows), next_state, True
+
+
+def changes_page(user, state, limit):
+    settled = timezone.now() - timedelta(seconds=_setting('SYNC_SETTLE_SECONDS', 1))
+    entries = list(
+        ChangeLogEntry.objects.visible_to(user)
+        .filter(id__gt=state['p'], created_at__lte=settled)
+        .order_by('id')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return [], {'p': state['p'], 't': time.time()}, False
+
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.model, entry.object_id), None)  # keep the latest position
+        latest[(entry.model, entry.object_id)] = entry
+    upserts = {}
+    for (name, object_id), entry in latest.items():
+        if not entry.deleted:
+            upserts.setdefault(name, []).append(object_id)
+    current = {}
+    for name, ids in upserts.items():
+        model, fields = SYNCED[name]
+        for row in model.objects.visible_to(user).filter(pk__in=ids).values(*fields):
+            current[(name, row['id'])] = row
+
+    changes = []
+    for key, entry in latest.items():
+        if key in current:
+            changes.append({'model': entry.model, 'id': entry.object_id, 'op': 'upsert', 'data': current[key]})
+        else:
+            # Deleted, or no longer visible to this user: either way the
+            # client should drop its copy
+            changes.append({'model': entry.model, 'id': entry.object_id, 'op': 'delete'})
+    # Only a drained feed proves the client is up to date as of now
+    issued = state['t'] if has_more else time.time()
+    return changes, {'p': entries[-1].pk, 't': issued}, has_more
+
+
+def feed(user, token=None, limit=None):
+    """
+    Return ``{'changes': [...], 'next': token, 'has_more': bool}`` for
+    ``user``. Raises TokenError for bad or expired tokens.
+    """
+    limit = max(1, min(limit or _setting('SYNC_PAGE_SIZE', 200), MAX_PAGE_SIZE))
+    if token:
+        state = read_token(token)
+    else:
+        head = ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        state = {'m': 0, 'a': 0, 'h': head, 't': time.time()}
+    if 'm' in state:
+        changes, next_state, has_more = snapshot_page(user, state, limit)
+    else:
+        changes, next_state, has_more = changes_page(user, state, limit)
+    return {'changes': changes, 'next': make_token(**next_state), 'has_more': has_more}
@@ -0,0 +1,15 @@
+from django import template
+
+from core import caseload
+
+register = template.Library()
+
+
+@register.simple_tag
+def caseload_stats(user):
+    # Firm admins see every lawyer, lawyers their own row, everyone else nothing
+    if user.is_superuser or 'Admin' in getattr(user, 'group_names', ()):
+        return caseload.summary()
+    if 'Lawyer' in getattr(user, 'group_names', ()):
+        return caseload.summary(lawyer=user)
+    return None
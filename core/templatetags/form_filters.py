@@ -11,4 +11,5 @@ def add_class(field, css_class):
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    # User.group_names is cached, so repeated checks in a template cost one query
+    return group_name in getattr(user, 'group_names', ())
@@ -0,0 +1,135 @@
+import io
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import activity, caseops
+from core.models import Case, CaseActivity, Client, Document
+
+User = get_user_model()
+
+
+@override_settings(ACTIVITY_LOG_BACKGROUND=False, ACTIVITY_LOG_BATCH_SIZE=100)
+class CaseActivityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123', first_name='Ada',
+                                              last_name='Lovelace')
+        cls.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        cls.other = User.objects.create_user(username='other', password='testpass123')
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.client_record = Client.objects.create(user=cls.alice, name='Alice', email='alice@example.com')
+
+    def setUp(self):
+        activity.buffer.flush()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.case = Case.objects.create(title='Lease', client=self.client_record, lawyer=self.lawyer)
+
+    def verbs(self):
+        return [entry.verb for entry in activity.page(self.case.pk)[0]]
+
+    def test_changes_are_buffered_then_written_in_one_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.case.status = 'pending'
+            self.case.lawyer = self.other
+            self.case.due_date = date(2026, 5, 1)
+            self.case.save()
+            Document.objects.create(title='Lease', case=self.case, file='docs/lease.txt')
+        self.assertEqual(len(activity.buffer), 5)
+        self.assertFalse(CaseActivity.objects.exists())
+
+        with self.assertNumQueries(1):
+            activity.flush()
+        self.assertEqual(self.verbs(), ['document_added', 'due_date', 'reassigned', 'status', 'opened'])
+        reassigned = CaseActivity.objects.get(verb='reassigned')
+        self.assertEqual(reassigned.detail, {'from': 'Ada Lovelace', 'to': 'other'})
+
+    def test_reads_flush_only_that_cases_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            other_case = Case.objects.create(title='Will', client=self.client_record, lawyer=self.lawyer)
+        self.assertEqual(len(activity.buffer), 2)
+        with self.assertNumQueries(2):  # the write and the page
+            self.assertEqual(self.verbs(), ['opened'])
+        # The other case's entry stays buffered
+        self.assertEqual(len(activity.buffer), 1)
+        self.assertFalse(CaseActivity.objects.filter(case_id=other_case.pk).exists())
+        self.assertEqual([entry.verb for entry in activity.page(other_case.pk)[0]], ['opened'])
+        self.assertEqual(len(activity.buffer), 0)
+
+    def test_rolled_back_changes_leave_no_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.case.status = 'closed'
+                    self.case.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.verbs(), ['opened'])
+
+    def test_keyset_pagination(self):
+        start = timezone.now()
+        CaseActivity.objects.bulk_create(
+            CaseActivity(case=self.case, verb='status', created_at=start + timedelta(seconds=i // 2))
+            for i in range(25)
+        )
+        first, cursor = activity.page(self.case.pk, size=10)
+        self.assertEqual(len(first), 10)
+        seen = [entry.pk for entry in first]
+        while cursor:
+            with self.assertNumQueries(1):
+                entries, cursor = activity.page(self.case.pk, cursor, size=10)
+            seen += [entry.pk for entry in entries]
+        self.assertEqual(len(seen), 26)  # including 'opened'
+        self.assertEqual(len(set(seen)), 26)
+        for cursor in ('garbage', '99999999999999999999-1', '999999999999999999-1', '1-99999999999999999999'):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                activity.page(self.case.pk, cursor)
+
+    def test_bulk_operations_record_activity(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            change = caseops.reassign(Case.objects.filter(pk=self.case.pk), self.other, actor=self.lawyer)
+        entry = activity.page(self.case.pk)[0][0]
+        self.assertEqual((entry.verb, entry.actor), ('reassigned', self.lawyer))
+        self.assertEqual(entry.detail, {'from': 'Ada Lovelace', 'to': 'other', 'bulk_change': change.pk})
+
+    def test_entries_are_append_only_and_pruned(self):
+        entry = CaseActivity.objects.create(case=self.case, verb='status')
+        with self.assertRaises(ValueError):
+            entry.save()
+        activity.flush()
+        CaseActivity.objects.filter(pk=entry.pk).update(created_at=timezone.now() - timedelta(days=800))
+        with self.settings(ACTIVITY_PRUNE_CHUNK_SIZE=1):
+            call_command('prune_activity', stdout=io.StringIO())
+        self.assertEqual(self.verbs(), ['opened'])
+
+    def test_case_page_shows_timeline(self):
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('case_detail', args=[self.case.pk]))
+        self.assertContains(response, 'Case opened')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.case.status = 'closed'
+            self.case.save()
+        # The new entry changes the ETag even before it is flushed
+        revalidated = self.client.get(reverse('case_detail', args=[self.case.pk]),
+                                      HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(revalidated, 'Status changed from <strong>Open</strong> to <strong>Closed</strong>')
+
+        with self.settings(ACTIVITY_PAGE_SIZE=1):
+            response = self.client.get(reverse('case_detail', args=[self.case.pk]))
+            more = self.client.get(reverse('case_timeline', args=[self.case.pk]),
+                                   {'before': response.context['next_cursor']})
+        self.assertContains(more, 'Case opened')
+        # Cursors past what a datetime can hold are a bad request, not a crash
+        for cursor in ('99999999999999999999-1', '999999999999999999-1', '1-99999999999999999999'):
+            self.assertEqual(self.client.get(reverse('case_timeline', args=[self.case.pk]),
+                                             {'before': cursor}).status_code, 400)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('case_timeline', args=[self.case.pk])).status_code, 404)
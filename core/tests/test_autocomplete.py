@@ -0,0 +1,92 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.urls import reverse
+
+from core.forms import AppointmentForm, CaseForm
+from core.models import Case, Client, LawyerProfile
+
+User = get_user_model()
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        lawyers = Group.objects.create(name='Lawyer')
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123',
+                                              first_name='Ada', last_name='Lovelace')
+        cls.lawyer.groups.add(lawyers)
+        cls.profile = LawyerProfile.objects.create(user=cls.lawyer)
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.alice_client = Client.objects.create(user=cls.alice, name='Alice Abbott', email='alice@example.com')
+        cls.others = Client.objects.bulk_create(
+            Client(name=f'Abel {i:02}', email=f'abel{i}@example.com') for i in range(30)
+        )
+        cls.case = Case.objects.create(title='Lease dispute', client=cls.alice_client, lawyer=cls.lawyer)
+        Case.objects.create(title='Lease renewal', client=cls.others[0], lawyer=cls.lawyer)
+        cls.admin = User.objects.create_superuser(username='admin', password='testpass123', email='a@example.com')
+
+    def lookup(self, source, **params):
+        response = self.client.get(reverse('autocomplete', args=[source]), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_prefix_match_is_limited_and_ordered(self):
+        self.client.force_login(self.lawyer)
+        data = self.lookup('clients', q='ab')
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['more'])
+        texts = [result['text'] for result in data['results']]
+        self.assertEqual(texts[0], 'Abel 00 (abel0@example.com)')
+        self.assertEqual(texts, sorted(texts, key=str.lower))
+
+        # Email prefix, case-insensitive; no infix matches
+        self.assertEqual([r['id'] for r in self.lookup('clients', q='ALICE@')['results']], [self.alice_client.pk])
+        self.assertEqual(self.lookup('clients', q='bbott')['results'], [])
+        self.assertEqual(len(self.lookup('clients', q='abel 1', limit=5)['results']), 5)
+
+    def test_results_are_visible_to_the_user(self):
+        self.client.force_login(self.alice)
+        self.assertEqual([r['id'] for r in self.lookup('clients', q='a')['results']], [self.alice_client.pk])
+        self.assertEqual(self.lookup('cases', q='lease')['results'],
+                         [{'id': self.case.pk, 'text': 'Lease dispute (Alice Abbott)'}])
+        self.assertEqual(self.lookup('lawyers', q='love')['results'],
+                         [{'id': self.profile.pk, 'text': 'Ada Lovelace'}])
+
+    def test_unknown_source_and_anonymous(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['users'])).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['clients'])).status_code, 302)
+
+    def test_widgets_render_only_the_selected_option(self):
+        form = CaseForm(instance=self.case)
+        html = str(form['client'])
+        self.assertIn('data-autocomplete-url="/api/autocomplete/clients/"', html)
+        self.assertEqual(html.count('<option'), 2)  # the empty choice and Alice
+        self.assertIn('selected>Alice Abbott', html)
+        self.assertEqual(str(AppointmentForm()['lawyer']).count('<option'), 1)  # just the empty choice
+
+        form = CaseForm(data={'title': 'Will', 'client': self.others[5].pk, 'status': 'open'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['client'], self.others[5])
+
+    def test_admin_autocomplete_uses_prefix_search(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:autocomplete')
+        params = {'app_label': 'core', 'model_name': 'case', 'field_name': 'client', 'term': 'alice'}
+        data = json.loads(self.client.get(url, params).content)
+        self.assertEqual([r['id'] for r in data['results']], [str(self.alice_client.pk)])
+
+        params.update(field_name='lawyer', term='')
+        data = json.loads(self.client.get(url, params).content)
+        self.assertEqual([r['id'] for r in data['results']], [str(self.lawyer.pk)])
+
+    def test_case_changelist_does_not_list_every_user(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:core_case_changelist'))
+        self.assertEqual(response.status_code, 200)
+        # One selected option per list_editable lawyer select, no full user list
+        self.assertNotContains(response, '>alice</option>')
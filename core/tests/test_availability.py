@@ -0,0 +1,99 @@
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from core.availability import get_availability_map, validate_slot
+from core.forms import AppointmentForm
+from core.models import Appointment, Availability, Client, LawyerProfile
+
+User = get_user_model()
+
+
+def next_weekday(code):
+    """Return the next future date falling on the given weekday code."""
+    codes = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+    day = timezone.localdate() + timedelta(days=1)
+    while codes[day.weekday()] != code:
+        day += timedelta(days=1)
+    return day
+
+
+class AvailabilityLookupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = LawyerProfile.objects.create(
+            user=User.objects.create_user(username='lawyer', password='testpass123')
+        )
+        self.monday = Availability.objects.create(
+            lawyer=self.lawyer, day='MON', start_time=time(9, 0), end_time=time(12, 0)
+        )
+        self.next_monday = next_weekday('MON')
+
+    def test_map_loaded_once(self):
+        with self.assertNumQueries(1):
+            get_availability_map(self.lawyer.pk)
+            get_availability_map(self.lawyer.pk)
+        with self.assertNumQueries(0):
+            validate_slot(self.lawyer.pk, self.next_monday, time(10, 0))
+
+    def test_window_boundaries_are_inclusive(self):
+        validate_slot(self.lawyer.pk, self.next_monday, time(9, 0))
+        validate_slot(self.lawyer.pk, self.next_monday, time(12, 0))
+
+    def test_just_outside_window(self):
+        with self.assertRaises(ValidationError):
+            validate_slot(self.lawyer.pk, self.next_monday, time(8, 59))
+        with self.assertRaises(ValidationError):
+            validate_slot(self.lawyer.pk, self.next_monday, time(12, 1))
+
+    def test_unavailable_day_and_past_date(self):
+        with self.assertRaises(ValidationError):
+            validate_slot(self.lawyer.pk, next_weekday('TUE'), time(10, 0))
+        with self.assertRaises(ValidationError):
+            validate_slot(self.lawyer.pk, next_weekday('SAT'), time(10, 0))
+        with self.assertRaises(ValidationError):
+            validate_slot(self.lawyer.pk, self.next_monday - timedelta(days=7 * 52), time(10, 0))
+
+    def test_save_invalidates_map(self):
+        get_availability_map(self.lawyer.pk)
+        self.monday.start_time = time(10, 0)
+        self.monday.save()
+        with self.assertRaises(ValidationError):
+            validate_slot(self.lawyer.pk, self.next_monday, time(9, 30))
+
+        self.monday.delete()
+        self.assertEqual(get_availability_map(self.lawyer.pk), {})
+
+
+class AppointmentFormTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = LawyerProfile.objects.create(
+            user=User.objects.create_user(username='lawyer', password='testpass123')
+        )
+        Availability.objects.create(lawyer=self.lawyer, day='WED', start_time=time(8, 0), end_time=time(16, 0))
+        user = User.objects.create_user(username='client', email='client@example.com', password='testpass123')
+        self.client_profile = Client.objects.create(user=user, name='Client', email='client@example.com')
+        self.wednesday = next_weekday('WED')
+
+    def test_valid_slot(self):
+        form = AppointmentForm(data={'lawyer': self.lawyer.pk, 'date': self.wednesday, 'time': '15:30', 'duration': 30})
+        self.assertTrue(form.is_valid(), form.errors)
+        appointment = form.save(commit=False)
+        appointment.client = self.client_profile
+        appointment.save()
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_outside_hours_rejected(self):
+        form = AppointmentForm(data={'lawyer': self.lawyer.pk, 'date': self.wednesday, 'time': '16:01', 'duration': 30})
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.non_field_errors())
+
+    def test_lawyer_required(self):
+        form = AppointmentForm(data={'date': self.wednesday, 'time': '10:00', 'duration': 30})
+        self.assertFalse(form.is_valid())
+        self.assertIn('lawyer', form.errors)
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core.management.commands.bench import IN_MEMORY_LAYER, Suite, compare, percentile, regressions, summarize
+from core.presence import registry
+
+User = get_user_model()
+
+
+class BenchMathTest(SimpleTestCase):
+    def test_percentiles(self):
+        ordered = [n / 1000 for n in range(1, 101)]
+        self.assertEqual(percentile(ordered, 0.50), 0.050)
+        self.assertEqual(percentile(ordered, 0.99), 0.099)
+        self.assertEqual(percentile([0.2], 0.95), 0.2)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_summary(self):
+        result = summarize([0.01, 0.02, 0.03, 0.04], elapsed=0.5, queries=12, errors=1)
+        self.assertEqual((result['ops'], result['errors']), (4, 1))
+        self.assertEqual(result['throughput'], 8.0)
+        self.assertEqual(result['queries_per_op'], 3.0)
+        self.assertAlmostEqual(result['p50_ms'], 20.0)
+
+    def test_compare_and_regressions(self):
+        baseline = {
+            'dashboard': {'throughput': 100.0, 'p95_ms': 10.0, 'queries_per_op': 4.0},
+            'gone': {'throughput': 1.0, 'p95_ms': 1.0, 'queries_per_op': 1.0},
+        }
+        current = {
+            'dashboard': {'throughput': 70.0, 'p95_ms': 10.5, 'queries_per_op': 5.0},
+            'new': {'throughput': 1.0, 'p95_ms': 1.0, 'queries_per_op': 1.0},
+        }
+        rows = compare(baseline, current)
+        self.assertEqual([row[:2] for row in rows], [
+            ('dashboard', 'throughput'), ('dashboard', 'p95_ms'), ('dashboard', 'queries_per_op'),
+        ])
+        self.assertAlmostEqual(rows[0][4], -30.0)
+        worse = {row[1] for row in regressions(rows, threshold=20)}
+        self.assertEqual(worse, {'throughput', 'queries_per_op'})
+
+
+@override_settings(METRICS_ENABLED=True, CHANNEL_LAYERS=IN_MEMORY_LAYER, RATELIMIT_ENABLED=False)
+class BenchSuiteTest(TransactionTestCase):
+    def setUp(self):
+        registry.clear()
+        # One worker: the shared-cache in-memory test database takes table locks
+        self.suite = Suite(concurrency=1, requests=3)
+        self.suite.populate(clients=3, cases_per_client=2, lawyers=2)
+
+    def test_every_scenario_runs_cleanly(self):
+        for name in Suite.scenarios:
+            with self.subTest(scenario=name):
+                result = self.suite.run(name)
+                self.assertEqual((result['ops'], result['errors']), (3, 0))
+                self.assertGreater(result['queries_per_op'], 0)
+                self.assertGreater(result['throughput'], 0)
@@ -0,0 +1,140 @@
+import io
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import activity, caseload, caseops
+from core.models import Availability, Booking, Case, CaseloadStat, Client, LawyerProfile, Notification
+
+User = get_user_model()
+
+
+class CaseloadStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123', first_name='Ada',
+                                              last_name='Lovelace')
+        cls.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        cls.other = User.objects.create_user(username='other', password='testpass123')
+        cls.admin = User.objects.create_superuser(username='admin', password='testpass123', email='a@example.com')
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.client_record = Client.objects.create(user=cls.alice, name='Alice', email='alice@example.com')
+        cls.slot = Availability.objects.create(lawyer=LawyerProfile.objects.create(user=cls.lawyer), day='MON')
+        cls.today = date(2026, 10, 21)  # a Wednesday
+
+    def counters(self):
+        return {key: count for key, count in caseload.expected().items() if count}
+
+    def assertInStep(self):
+        stored = {
+            (metric, lawyer_id, status, day): count
+            for metric, lawyer_id, status, day, count in
+            CaseloadStat.objects.values_list('metric', 'lawyer_id', 'status', 'day', 'count') if count
+        }
+        self.assertEqual(stored, self.counters())
+
+    def test_transitions_keep_counters_in_step(self):
+        case = Case.objects.create(title='Lease', client=self.client_record, lawyer=self.lawyer,
+                                   due_date=self.today)
+        Case.objects.create(title='Will', client=self.client_record)
+        self.assertInStep()
+
+        case.status = 'pending'
+        case.lawyer = self.other
+        case.due_date = self.today + timedelta(days=1)
+        case.save()
+        self.assertInStep()
+
+        # A re-save without changes leaves the counters alone
+        with CaptureQueriesContext(connection) as queries:
+            Case.objects.get(pk=case.pk).save(update_fields=['title'])
+        self.assertFalse([query for query in queries if 'core_caseloadstat' in query['sql']])
+
+        Case.objects.get(pk=case.pk).delete()
+        self.assertInStep()
+        self.assertEqual(CaseloadStat.objects.get(metric='cases', lawyer=self.other, status='pending').count, 0)
+
+    @override_settings(ACTIVITY_LOG_BACKGROUND=False)
+    def test_one_instance_saved_twice(self):
+        # Every receiver reading the loaded-state snapshot sees it refreshed by the first save
+        case = Case.objects.create(title='Lease', client=self.client_record, lawyer=self.lawyer)
+        case = Case.objects.get(pk=case.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            case.status = 'pending'
+            case.save()
+            case.status = 'closed'
+            case.save()
+        self.assertInStep()
+        self.assertEqual(
+            list(Notification.objects.filter(kind='case_status', recipient=self.lawyer)
+                 .values_list('payload__previous', 'payload__status')),
+            [('open', 'pending'), ('pending', 'closed')],
+        )
+        activity.flush()
+        self.assertEqual([entry.detail for entry in activity.page(case.pk)[0][:2]],
+                         [{'from': 'pending', 'to': 'closed'}, {'from': 'open', 'to': 'pending'}])
+
+    def test_bookings_and_bulk_operations(self):
+        booking = Booking.objects.create(availability=self.slot, client=self.alice)
+        booking.status = 'approved'
+        booking.save()
+        cases = [Case.objects.create(title=f'Case {n}', client=self.client_record, lawyer=self.lawyer,
+                                     due_date=self.today) for n in range(3)]
+        everything = Case.objects.filter(pk__in=[case.pk for case in cases])
+
+        caseops.set_status(everything, 'closed')
+        self.assertInStep()
+        caseops.reassign(everything, self.other)
+        self.assertInStep()
+        caseops.shift_due_dates(everything, 2)
+        self.assertInStep()
+        booking.delete()
+        self.assertInStep()
+
+    def test_deleted_lawyer_moves_to_unassigned(self):
+        Case.objects.create(title='Lease', client=self.client_record, lawyer=self.other, due_date=self.today)
+        self.other.delete()
+        self.assertInStep()
+        self.assertEqual(CaseloadStat.objects.get(metric='cases', lawyer=None).count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        Case.objects.bulk_create([Case(title='Imported', client=self.client_record, lawyer=self.lawyer)])
+        CaseloadStat.objects.create(metric='cases', lawyer=self.other, status='open', count=7)
+        out = io.StringIO()
+        call_command('reconcile_caseload', stdout=out)
+        self.assertIn('2 counters were out of step', out.getvalue())
+        self.assertInStep()
+        self.assertEqual(caseload.rebuild(), 0)
+
+    def test_summary_reads_only_the_counters(self):
+        Case.objects.create(title='Due', client=self.client_record, lawyer=self.lawyer, due_date=self.today)
+        Case.objects.create(title='Later', client=self.client_record, lawyer=self.lawyer,
+                            due_date=self.today + timedelta(days=7))
+        Case.objects.create(title='Done', client=self.client_record, lawyer=self.other, status='closed',
+                            due_date=self.today)
+        Booking.objects.create(availability=self.slot, client=self.alice)
+
+        with self.assertNumQueries(2):
+            stats = caseload.summary(today=self.today)
+        ada, other = stats['lawyers']
+        self.assertEqual((ada['lawyer'], ada['cases']['open'], ada['due_this_week']), ('Ada Lovelace', 2, 1))
+        self.assertEqual(ada['bookings']['pending'], 1)
+        self.assertEqual((other['cases']['closed'], other['due_this_week']), (1, 0))
+        self.assertEqual(stats['totals']['cases'], {'open': 2, 'pending': 0, 'closed': 1})
+        self.assertEqual(stats['week'], (date(2026, 10, 19), date(2026, 10, 25)))
+        self.assertEqual(len(caseload.summary(lawyer=self.other)['lawyers']), 1)
+
+    def test_panels(self):
+        Case.objects.create(title='Lease', client=self.client_record, lawyer=self.lawyer)
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse('dashboard')), 'id="caseload-stats"')
+        self.assertContains(self.client.get(reverse('admin:index')), 'Ada Lovelace')
+
+        self.client.force_login(self.alice)
+        self.assertNotContains(self.client.get(reverse('dashboard')), 'id="caseload-stats"')
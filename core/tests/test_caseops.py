@@ -0,0 +1,124 @@
+import io
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import caseops
+from core.models import Case, CaseBulkChange, ChangeLogEntry, Client, Notification
+
+User = get_user_model()
+
+
+class CaseOpsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        lawyers = Group.objects.create(name='Lawyer')
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.bob = User.objects.create_user(username='bob', password='testpass123')
+        lawyers.user_set.add(cls.alice, cls.bob)
+        cls.carol = User.objects.create_user(username='carol', password='testpass123')
+        cls.carol_client = Client.objects.create(user=cls.carol, name='Carol', email='carol@example.com')
+        cls.cases = [
+            Case.objects.create(title=f'Case {i}', client=cls.carol_client, lawyer=cls.alice,
+                                due_date=date(2026, 3, 1) if i % 2 else None)
+            for i in range(6)
+        ]
+        cls.cases[0].status = 'closed'
+        cls.cases[0].save()
+        cls.admin = User.objects.create_superuser(username='admin', password='testpass123', email='a@example.com')
+
+    def test_set_status_is_set_based(self):
+        cases = Case.objects.filter(lawyer=self.alice)
+        notified = Notification.objects.count()
+        # count, read, one UPDATE, change log, caseload counters (read, insert
+        # the new ones, one UPDATE), notifications, audit (+ savepoint)
+        with self.assertNumQueries(11):
+            change = caseops.set_status(cases, 'closed', actor=self.admin)
+        self.assertEqual((change.updated, change.unchanged), (5, 1))
+        self.assertEqual(change.action, 'status')
+        self.assertEqual(sorted(change.case_ids), sorted(c.pk for c in self.cases[1:]))
+        self.assertEqual(Case.objects.filter(status='closed').count(), 6)
+        self.assertEqual(Case.objects.get(pk=self.cases[1].pk).version, 2)
+        # Client and lawyer hear about each case, as with a single save
+        self.assertEqual(Notification.objects.count() - notified, 10)
+        self.assertEqual(CaseBulkChange.objects.count(), 1)
+
+    def test_reassign_logs_old_and_new_scope(self):
+        before = ChangeLogEntry.objects.count()
+        change = caseops.reassign(Case.objects.filter(lawyer=self.alice), self.bob, source='command')
+        self.assertEqual(change.updated, 6)
+        self.assertFalse(Case.objects.filter(lawyer=self.alice).exists())
+        entries = ChangeLogEntry.objects.filter(model='case')[before:]
+        self.assertEqual(ChangeLogEntry.objects.count() - before, 12)
+        self.assertEqual({e.lawyer_user_id for e in entries}, {self.alice.pk, self.bob.pk})
+
+        change = caseops.reassign(Case.objects.all(), None)
+        self.assertEqual(change.updated, 6)
+        self.assertFalse(Case.objects.filter(lawyer__isnull=False).exists())
+
+    def test_chunked_updates(self):
+        with self.settings(CASEOPS_CHUNK_SIZE=2):
+            change = caseops.shift_due_dates(Case.objects.all(), -10)
+        self.assertEqual((change.updated, change.unchanged), (3, 3))
+        self.assertEqual(set(Case.objects.exclude(due_date=None).values_list('due_date', flat=True)),
+                         {date(2026, 2, 19)})
+
+    def test_unknown_status(self):
+        with self.assertRaises(ValueError):
+            caseops.set_status(Case.objects.all(), 'archived')
+
+    def test_admin_actions(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:core_case_changelist')
+        selected = [c.pk for c in self.cases[:3]]
+        response = self.client.post(url, {'action': 'mark_pending', '_selected_action': selected})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Case.objects.filter(status='pending').count(), 3)
+
+        data = {'action': 'reassign_lawyer', '_selected_action': selected}
+        response = self.client.post(url, data)
+        self.assertContains(response, '3 cases selected.')
+        response = self.client.post(url, {**data, 'apply': '1', 'lawyer': self.bob.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(set(Case.objects.filter(lawyer=self.bob).values_list('pk', flat=True)), set(selected))
+        change = CaseBulkChange.objects.first()
+        self.assertEqual((change.action, change.actor, change.params), ('reassign', self.admin, {'lawyer': self.bob.pk}))
+
+    def test_admin_actions_need_change_permission(self):
+        viewer = User.objects.create_user(username='viewer', password='testpass123', is_staff=True)
+        viewer.groups.add(Group.objects.get(name='Lawyer'))
+        viewer.user_permissions.add(Permission.objects.get(codename='view_case'))
+        self.client.force_login(viewer)
+        url = reverse('admin:core_case_changelist')
+        actions = dict(self.client.get(url).context['action_form'].fields['action'].choices)
+        self.assertIn('export_csv', actions)
+        for action in ('mark_open', 'mark_pending', 'mark_closed', 'reassign_lawyer', 'shift_due_dates'):
+            self.assertNotIn(action, actions)
+
+        self.client.post(url, {'action': 'mark_closed', '_selected_action': [self.cases[1].pk]})
+        self.client.post(url, {'action': 'shift_due_dates', '_selected_action': [self.cases[1].pk],
+                               'apply': '1', 'days': 3})
+        self.cases[1].refresh_from_db()
+        self.assertEqual((self.cases[1].status, self.cases[1].due_date), ('open', date(2026, 3, 1)))
+        self.assertFalse(CaseBulkChange.objects.exists())
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('reassign_cases', '--from', 'alice', '--to', 'bob', '--dry-run', stdout=out)
+        self.assertIn('6 updated', out.getvalue())
+        self.assertEqual(Case.objects.filter(lawyer=self.bob).count(), 0)
+        self.assertFalse(CaseBulkChange.objects.exists())
+
+        call_command('reassign_cases', '--from', 'alice', '--status', 'open', '--to', 'bob',
+                     '--actor', 'admin', stdout=io.StringIO())
+        self.assertEqual(Case.objects.filter(lawyer=self.bob).count(), 5)
+        self.assertEqual(CaseBulkChange.objects.get().source, 'command')
+
+        with self.assertRaises(CommandError):
+            call_command('reassign_cases', '--set-status', 'closed', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('reassign_cases', '--all', '--to', 'nobody', stdout=io.StringIO())
@@ -0,0 +1,169 @@
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import wire
+from core.chat import mark_room_read, unread_counts
+from core.models import ChatMembership, ChatRoom, Message
+from core.presence import registry
+from core.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class UnreadCountTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.room1 = ChatRoom.get_or_create_direct(self.alice, self.bob)
+        self.room2 = ChatRoom.objects.create(name='room2')
+        ChatMembership.objects.create(room=self.room2, user=self.alice)
+        self.messages = [
+            Message.objects.create(room=self.room1, sender=self.bob, text=f'hi {n}') for n in range(3)
+        ]
+        Message.objects.create(room=self.room2, sender=self.bob, text='other')
+        Message.objects.create(room=self.room1, sender=self.alice, text='mine')
+
+    def test_counts_for_all_rooms_in_one_query(self):
+        mark_room_read(self.alice, self.room1.pk, self.messages[0].pk)
+        with self.assertNumQueries(1):
+            counts = unread_counts(self.alice)
+        # Own messages never count as unread
+        self.assertEqual(counts, {self.room1.name: 2, 'room2': 1})
+
+    def test_read_pointer_never_moves_back(self):
+        mark_room_read(self.alice, self.room1.pk, self.messages[2].pk)
+        mark_room_read(self.alice, self.room1.pk, self.messages[0].pk)
+        membership = ChatMembership.objects.get(room=self.room1, user=self.alice)
+        self.assertEqual(membership.last_read_id, self.messages[2].pk)
+
+    def test_opening_room_marks_it_read(self):
+        self.client.login(username='alice', password='testpass123')
+        self.client.get(reverse('chat_room', args=[self.room1.name]))
+        response = self.client.get(reverse('chat_unread_counts'))
+        self.assertEqual(response.json(), {'rooms': {self.room1.name: 0, 'room2': 1}, 'total': 1})
+
+    def test_non_member_cannot_open_room(self):
+        User.objects.create_user(username='eve', password='testpass123')
+        self.client.login(username='eve', password='testpass123')
+        response = self.client.get(reverse('chat_room', args=[self.room1.name]))
+        self.assertRedirects(response, reverse('dashboard'))
+
+    def test_start_chat_creates_direct_room(self):
+        carol = User.objects.create_user(username='carol', password='testpass123')
+        self.client.login(username='alice', password='testpass123')
+        response = self.client.get(reverse('start_chat', args=[carol.pk]))
+        room = ChatRoom.objects.get(name=ChatRoom.direct_room_name(self.alice, carol))
+        self.assertRedirects(response, reverse('chat_room', args=[room.name]))
+        self.assertEqual(set(room.members.values_list('username', flat=True)), {'alice', 'carol'})
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class ChatPresenceTest(TransactionTestCase):
+    def setUp(self):
+        registry.clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        ChatRoom.get_or_create_direct(self.alice, self.bob)
+        self.path = f"/ws/chat/{ChatRoom.direct_room_name(self.alice, self.bob)}/"
+        self.application = URLRouter(websocket_urlpatterns)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(self.application, self.path)
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def latest_presence(self, communicator):
+        presence = None
+        while not await communicator.receive_nothing(timeout=0.2):
+            event = await communicator.receive_json_from()
+            if event.get('type') == 'presence':
+                presence = event['online']
+        return presence
+
+    async def test_presence_join_and_leave(self):
+        alice = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+        self.assertEqual(await self.latest_presence(bob), ['alice', 'bob'])
+        self.assertEqual(await self.latest_presence(alice), ['alice', 'bob'])
+
+        await bob.disconnect()
+        self.assertEqual(await self.latest_presence(alice), ['alice'])
+        await alice.disconnect()
+
+    async def test_message_carries_id_and_read_receipt(self):
+        alice = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+        await self.latest_presence(alice)
+        await self.latest_presence(bob)
+
+        await alice.send_json_to({'message': 'hello'})
+        event = await bob.receive_json_from()
+        self.assertEqual(event['sender'], 'alice')
+        await bob.send_json_to({'read': event['id']})
+        receipt = await alice.receive_json_from()
+        while receipt.get('type') != 'read':
+            receipt = await alice.receive_json_from()
+        self.assertEqual(receipt['message_id'], event['id'])
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_malformed_read_markers_are_ignored(self):
+        alice = await self.connect(self.alice)
+        bob = await self.connect(self.bob)
+        await self.latest_presence(alice)
+        await self.latest_presence(bob)
+
+        for frame in ('{"read": "x"}', '{"read": [1]}', '{"read": 1e400}', '{"read": -5}', '{"read": true}',
+                      '{"read": 99999999999999999999999}'):
+            await bob.send_to(text_data=frame)
+        self.assertTrue(await alice.receive_nothing(timeout=0.2))
+        # Bob's socket is still open
+        await bob.send_json_to({'message': 'still here'})
+        self.assertEqual((await alice.receive_json_from())['message'], 'still here')
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_binary_and_json_clients_share_a_room(self):
+        alice = await self.connect(self.alice)
+        bob = WebsocketCommunicator(self.application, self.path, subprotocols=[wire.MSGPACK])
+        bob.scope['user'] = self.bob
+        connected, subprotocol = await bob.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, wire.MSGPACK)
+        await self.latest_presence(alice)
+        while not await bob.receive_nothing(timeout=0.2):
+            await bob.receive_from()
+
+        await bob.send_to(bytes_data=wire.packb({'message': 'binary hello'}))
+        event = await alice.receive_json_from()
+        self.assertEqual((event['message'], event['sender']), ('binary hello', 'bob'))
+        frame = wire.unpackb(await bob.receive_from())
+        self.assertEqual(frame, event)
+
+        # Garbage frames are dropped without closing the socket
+        await bob.send_to(bytes_data=b'\xc1')
+        self.assertTrue(await alice.receive_nothing(timeout=0.2))
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_anonymous_rejected(self):
+        from django.contrib.auth.models import AnonymousUser
+        communicator = WebsocketCommunicator(self.application, self.path)
+        communicator.scope['user'] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def test_non_member_rejected(self):
+        from channels.db import database_sync_to_async
+        eve = await database_sync_to_async(User.objects.create_user)(username='eve', password='testpass123')
+        communicator = WebsocketCommunicator(self.application, self.path)
+        communicator.scope['user'] = eve
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.chat import fts_query, search_messages
+from core.models import ChatRoom, Message
+
+User = get_user_model()
+
+
+class ChatSearchTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.eve = User.objects.create_user(username='eve', password='testpass123')
+        self.room = ChatRoom.get_or_create_direct(self.alice, self.bob)
+        self.private = ChatRoom.get_or_create_direct(self.bob, self.eve)
+
+    def test_bulk_created_messages_are_indexed(self):
+        Message.objects.bulk_create([
+            Message(room=self.room, sender=self.bob, text=f'note {n} about the settlement agreement')
+            for n in range(30)
+        ])
+        results, total = search_messages(self.alice, 'settlement', per_page=10)
+        self.assertEqual(total, 30)
+        self.assertEqual(len(results), 10)
+        results, _ = search_messages(self.alice, 'settlement', page=3, per_page=10)
+        self.assertEqual(len(results), 10)
+
+    def test_only_rooms_the_user_belongs_to(self):
+        Message.objects.create(room=self.room, sender=self.bob, text='contract draft attached')
+        Message.objects.create(room=self.private, sender=self.bob, text='contract for eve only')
+        results, total = search_messages(self.alice, 'contract')
+        self.assertEqual(total, 1)
+        self.assertEqual(results[0]['message'].room, self.room)
+
+    def test_stemming_prefix_and_highlight(self):
+        Message.objects.create(room=self.room, sender=self.bob, text='The hearing <b>was</b> postponed')
+        results, _ = search_messages(self.alice, 'postpone')
+        self.assertEqual(len(results), 1)
+        snippet = results[0]['snippet']
+        self.assertIn('<mark>postponed</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+        self.assertEqual(len(search_messages(self.alice, 'hear')[0]), 1)
+
+    def test_edits_and_deletes_update_index(self):
+        message = Message.objects.create(room=self.room, sender=self.bob, text='invoice pending')
+        message.text = 'receipt attached'
+        message.save()
+        self.assertEqual(search_messages(self.alice, 'invoice')[1], 0)
+        self.assertEqual(search_messages(self.alice, 'receipt')[1], 1)
+        message.delete()
+        self.assertEqual(search_messages(self.alice, 'receipt')[1], 0)
+
+    def test_sender_and_date_filters(self):
+        old = Message.objects.create(room=self.room, sender=self.alice, text='witness statement')
+        Message.objects.filter(pk=old.pk).update(timestamp=timezone.now() - timedelta(days=30))
+        Message.objects.create(room=self.room, sender=self.bob, text='witness list')
+        self.assertEqual(search_messages(self.alice, 'witness', sender='bob')[1], 1)
+        since = (timezone.now() - timedelta(days=7)).date()
+        results, total = search_messages(self.alice, 'witness', start=since)
+        self.assertEqual(total, 1)
+        self.assertEqual(results[0]['message'].sender, self.bob)
+
+    def test_query_syntax_is_neutralised(self):
+        Message.objects.create(room=self.room, sender=self.bob, text='appeal filed')
+        self.assertIsNone(fts_query('"*()'))
+        self.assertEqual(search_messages(self.alice, 'appeal" OR NEAR(')[1], 0)
+        self.assertEqual(search_messages(self.alice, '  appeal  ')[1], 1)
+
+    def test_search_page(self):
+        Message.objects.create(room=self.room, sender=self.bob, text='deposition scheduled')
+        self.client.login(username='alice', password='testpass123')
+        response = self.client.get(reverse('chat_search'), {'q': 'deposition', 'start': 'bad'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<mark>deposition</mark>')
@@ -0,0 +1,105 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Case, Client, Document
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ConditionalDetailTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        cls.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.client_record = Client.objects.create(user=cls.alice, name='Alice', email='alice@example.com')
+        cls.case = Case.objects.create(title='Lease', client=cls.client_record, lawyer=cls.lawyer)
+
+    def setUp(self):
+        self.case_url = reverse('case_detail', args=[self.case.pk])
+        self.client_url = reverse('client_detail', args=[self.client_record.pk])
+        self.client.force_login(self.lawyer)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_case_is_not_modified(self):
+        first = self.client.get(self.case_url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('no-cache', first['Cache-Control'])
+        # session, user, groups and the freshness query - no documents, no template
+        with self.assertNumQueries(4):
+            second = self.revalidate(self.case_url, first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertFalse(second.templates)
+
+    def test_edits_and_documents_change_the_case_etag(self):
+        etags = [self.client.get(self.case_url)['ETag']]
+        self.case.status = 'closed'
+        self.case.save()
+        self.assertEqual(self.case.version, 2)
+        etags.append(self.client.get(self.case_url)['ETag'])
+
+        document = Document.objects.create(title='Lease', case=self.case, file='docs/lease.txt')
+        etags.append(self.client.get(self.case_url)['ETag'])
+        document.delete()
+        etags.append(self.client.get(self.case_url)['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.version, 4)
+
+    def test_upload_through_the_page_changes_the_etag(self):
+        before = self.client.get(self.case_url)
+        self.client.post(self.case_url, {'title': 'Scan', 'file': SimpleUploadedFile('scan.txt', b'scan')})
+        # The success message is shown in full even for a stale ETag...
+        with_message = self.revalidate(self.case_url, before)
+        self.assertEqual(with_message.status_code, 200)
+        self.assertContains(with_message, 'has been uploaded successfully')
+        # ...and afterwards the page has a new ETag anyway
+        after = self.revalidate(self.case_url, before)
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+
+    def test_etag_is_per_viewer(self):
+        lawyer_etag = self.client.get(self.case_url)['ETag']
+        self.client.force_login(self.alice)
+        response = self.client.get(self.case_url, HTTP_IF_NONE_MATCH=lawyer_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], lawyer_etag)
+
+    def test_invisible_case_is_404_even_with_etag(self):
+        first = self.client.get(self.case_url)
+        bob = User.objects.create_user(username='bob', password='testpass123')
+        self.client.force_login(bob)
+        self.assertEqual(self.revalidate(self.case_url, first).status_code, 404)
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        first = self.client.get(self.case_url)
+        response = self.client.get(self.case_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_client_page_tracks_its_cases(self):
+        first = self.client.get(self.client_url)
+        self.assertEqual(self.revalidate(self.client_url, first).status_code, 304)
+
+        new_case = Case.objects.create(title='Divorce', client=self.client_record)
+        second = self.revalidate(self.client_url, first)
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, 'Divorce')
+
+        new_case.delete()
+        third = self.revalidate(self.client_url, second)
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], second['ETag'])
+
+        self.client_record.phone = '+237600000000'
+        self.client_record.save()
+        self.assertEqual(self.revalidate(self.client_url, third).status_code, 200)
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from core.dbrouter import PIN_COOKIE, ReplicaPinningMiddleware, pin_to_primary, routing_scope
+
+User = get_user_model()
+
+PRIMARY, REPLICA = 'router_primary', 'router_replica'
+
+
+def stand_in(alias):
+    path = os.path.join(tempfile.gettempdir(), f'lawfirm_test_{alias}_{os.getpid()}.sqlite3')
+    default = connections.databases['default']
+    return {**default, 'NAME': path, 'TEST': {**default['TEST'], 'NAME': path}}
+
+
+@override_settings(PRIMARY_DATABASE=PRIMARY, REPLICA_DATABASES=[REPLICA], REPLICA_PIN_SECONDS=5)
+class PrimaryReplicaRouterTest(TransactionTestCase):
+    """Two SQLite files stand in for a primary and a (never replicating) replica."""
+
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        # The stand-in aliases exist only while this class runs, so the test
+        # runner never sees them: their databases are created here.
+        for alias in (PRIMARY, REPLICA):
+            connections.databases[alias] = stand_in(alias)
+            cls.addClassCleanup(cls.remove_stand_in, alias)
+            connections[alias].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        cls.databases = {'default', PRIMARY, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def remove_stand_in(cls, alias):
+        connection = connections[alias]
+        connection.creation.destroy_test_db(connection.settings_dict['NAME'], verbosity=0)
+        del connections[alias]
+        del connections.databases[alias]
+
+    def setUp(self):
+        # Only present on the replica, so reads that find it were routed there
+        User.objects.using(REPLICA).create(username='on-replica')
+        self.factory = RequestFactory()
+
+    def through_middleware(self, request, view):
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_reads_use_replica_and_writes_use_primary(self):
+        def view(request):
+            found = User.objects.filter(username='on-replica').exists()
+            return HttpResponse(str(found))
+
+        self.assertEqual(self.through_middleware(self.factory.get('/'), view).content, b'True')
+        User.objects.create(username='written')
+        self.assertTrue(User.objects.using(PRIMARY).filter(username='written').exists())
+        self.assertFalse(User.objects.using(REPLICA).filter(username='written').exists())
+
+    def test_request_that_writes_reads_its_own_writes_and_pins_the_user(self):
+        def view(request):
+            User.objects.create(username='new-client')
+            return HttpResponse(str(User.objects.filter(username='new-client').exists()))
+
+        response = self.through_middleware(self.factory.get('/'), view)
+        self.assertEqual(response.content, b'True')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        def read_view(request):
+            return HttpResponse(str(User.objects.filter(username='new-client').exists()))
+
+        pinned = self.factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.through_middleware(pinned, read_view).content, b'True')
+
+        expired = self.factory.get('/')
+        expired.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.through_middleware(expired, read_view).content, b'False')
+        self.assertNotIn(PIN_COOKIE, self.through_middleware(expired, read_view).cookies)
+
+    def test_unsafe_methods_read_from_primary(self):
+        def view(request):
+            return HttpResponse(str(User.objects.filter(username='on-replica').exists()))
+
+        self.assertEqual(self.through_middleware(self.factory.post('/'), view).content, b'False')
+
+    def test_transactions_and_explicit_pins_read_from_primary(self):
+        with routing_scope():
+            with transaction.atomic(using=PRIMARY):
+                self.assertEqual(User.objects.all().db, PRIMARY)
+            with pin_to_primary():
+                self.assertEqual(User.objects.all().db, PRIMARY)
+            self.assertEqual(User.objects.all().db, REPLICA)
+
+    def test_sessions_always_use_primary(self):
+        from django.contrib.sessions.models import Session
+        self.assertEqual(Session.objects.all().db, PRIMARY)
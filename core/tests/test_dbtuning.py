@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+
+from core import dbtuning
+
+
+class SqlitePragmaTest(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+
+class RetryOnLockedTest(SimpleTestCase):
+    databases = {'default'}
+
+    def test_retries_locked_errors_then_succeeds(self):
+        calls = []
+
+        @dbtuning.retry_on_locked(base_delay=0)
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(write(), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertGreaterEqual(dbtuning.lock_retry_counts()[write.__qualname__], 2)
+
+    def test_gives_up_after_attempts(self):
+        failing = mock.Mock(side_effect=OperationalError('database is locked'), __qualname__='failing')
+        with self.assertRaises(OperationalError):
+            dbtuning.retry_on_locked(failing, attempts=3, base_delay=0)()
+        self.assertEqual(failing.call_count, 3)
+
+    def test_other_errors_and_outer_transactions_are_not_retried(self):
+        other = mock.Mock(side_effect=OperationalError('no such table: x'), __qualname__='other')
+        with self.assertRaises(OperationalError):
+            dbtuning.retry_on_locked(other, base_delay=0)()
+        self.assertEqual(other.call_count, 1)
+
+        locked = mock.Mock(side_effect=OperationalError('database is locked'), __qualname__='locked')
+        with transaction.atomic(), self.assertRaises(OperationalError):
+            dbtuning.retry_on_locked(locked, base_delay=0)()
+        self.assertEqual(locked.call_count, 1)
@@ -0,0 +1,58 @@
+import tempfile
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.directory import get_lawyer_directory
+from core.models import LawyerProfile
+
+User = get_user_model()
+
+
+def make_image(name='photo.png', size=(800, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class LawyerDirectoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='lawyer', password='testpass123', first_name='Ada', last_name='Stone'
+        )
+        self.profile = LawyerProfile.objects.create(user=self.user, bio='Contracts', photo=make_image())
+
+    def test_thumbnail_generated_on_upload(self):
+        self.assertTrue(self.profile.thumbnail)
+        with Image.open(self.profile.thumbnail.path) as thumb:
+            self.assertLessEqual(max(thumb.size), 240)
+
+    def test_directory_is_cached(self):
+        get_lawyer_directory()
+        with self.assertNumQueries(0):
+            directory = get_lawyer_directory()
+        self.assertEqual(directory[0]['name'], 'Ada Stone')
+        self.assertTrue(directory[0]['thumbnail_url'])
+
+    def test_cache_invalidated_on_user_and_profile_change(self):
+        get_lawyer_directory()
+        self.user.first_name = 'Grace'
+        self.user.save()
+        self.assertEqual(get_lawyer_directory()[0]['name'], 'Grace Stone')
+
+        self.profile.bio = 'Litigation'
+        self.profile.save()
+        self.assertEqual(get_lawyer_directory()[0]['bio'], 'Litigation')
+
+    def test_json_endpoint(self):
+        self.client.login(username='lawyer', password='testpass123')
+        response = self.client.get(reverse('lawyers_directory_json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['lawyers'][0]['user_id'], self.user.pk)
@@ -0,0 +1,154 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date, time
+from unittest import mock
+from urllib.parse import urlencode
+from xml.etree import ElementTree
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import exports
+from core.models import Appointment, Availability, Booking, Case, Client, LawyerProfile
+
+User = get_user_model()
+SHEET = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def read_csv(chunks):
+    return list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+
+
+def read_xlsx(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert workbook.testzip() is None
+        sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+    return [
+        [cell.findtext(f'{SHEET}v') or ''.join(cell.itertext()) for cell in row]
+        for row in sheet.iter(f'{SHEET}row')
+    ]
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        cls.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        profile = LawyerProfile.objects.create(user=cls.lawyer)
+        cls.alice = User.objects.create_user(username='alice', password='testpass123', email='alice@example.com')
+        cls.alice_client = Client.objects.create(user=cls.alice, name='Alice', email='alice@example.com')
+        cls.bob_client = Client.objects.create(name='=hyperlink("x")', email='bob@example.com')
+        for n in range(5):
+            Case.objects.create(title=f'Case {n}', client=cls.bob_client if n % 2 else cls.alice_client,
+                                lawyer=cls.lawyer, due_date=date(2026, 11, n + 1))
+        slot = Availability.objects.create(lawyer=profile, day='MON')
+        Booking.objects.create(availability=slot, client=cls.alice)
+        Appointment.objects.create(client=cls.alice_client, lawyer=profile, date=date(2026, 11, 2),
+                                   time=time(9, 30), message='Bring \x07the lease')
+        cls.admin = User.objects.create_superuser(username='admin', password='testpass123', email='a@example.com')
+
+    def test_csv_streams_related_columns_in_one_query(self):
+        chunks = exports.csv_chunks(exports.EXPORTS['cases'], Case.objects.all(), chunk_size=2)
+        with self.assertNumQueries(1):
+            chunks = list(chunks)
+        self.assertEqual(len(chunks), 3)  # header + 2 rows, 2 rows, 1 row
+        rows = read_csv(chunks)
+        self.assertEqual(rows[0][:5], ['ID', 'Title', 'Client', 'Client email', 'Lawyer'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][1:5], ['Case 0', 'Alice', 'alice@example.com', 'lawyer'])
+        self.assertEqual(rows[1][7], '2026-11-01')
+        # Cells that a spreadsheet would run as a formula are quoted
+        self.assertEqual(rows[2][2], '\'=hyperlink("x")')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        with self.assertNumQueries(1):
+            data = b''.join(exports.xlsx_chunks(exports.EXPORTS['appointments'], Appointment.objects.all(),
+                                                chunk_size=1))
+        rows = read_xlsx(data)
+        self.assertEqual(rows[0][0], 'ID')
+        self.assertEqual(rows[1][1:], ['Alice', 'alice@example.com', 'lawyer', '2026-11-02', '09:30:00', '30',
+                                       'Bring the lease'])
+
+    def test_admin_actions_stream_the_selection(self):
+        self.client.force_login(self.admin)
+        cases = Case.objects.order_by('pk')[:2]
+        response = self.client.post(reverse('admin:core_case_changelist'), {
+            'action': 'export_csv', '_selected_action': [case.pk for case in cases],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="cases-', response['Content-Disposition'])
+        self.assertEqual([row[1] for row in read_csv(response.streaming_content)[1:]], ['Case 0', 'Case 1'])
+
+        response = self.client.post(reverse('admin:core_booking_changelist'), {
+            'action': 'export_xlsx', '_selected_action': list(Booking.objects.values_list('pk', flat=True)),
+        })
+        rows = read_xlsx(b''.join(response.streaming_content))
+        self.assertEqual(rows[1][1:5], ['alice', 'alice@example.com', 'lawyer', 'MON'])
+
+    def test_asgi_sends_each_chunk_as_it_is_made(self):
+        self.client.force_login(self.admin)
+        csrf = 'x' * 32
+        body = urlencode({'action': 'export_csv', 'csrfmiddlewaretoken': csrf,
+                          '_selected_action': list(Case.objects.values_list('pk', flat=True))}, doseq=True)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}; " \
+                 f"{settings.CSRF_COOKIE_NAME}={csrf}"
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+            'path': reverse('admin:core_case_changelist'), 'query_string': b'', 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode()),
+                        (b'content-type', b'application/x-www-form-urlencoded')],
+        }
+        sent, bodies_sent, received = [], [], []
+
+        async def receive():
+            if received:  # the client stays connected
+                await asyncio.Event().wait()
+            received.append(body)
+            return {'type': 'http.request', 'body': body.encode(), 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        csv_chunks = exports.csv_chunks
+
+        def spy(export, queryset, chunk_size=None):
+            # How many body messages were out when each chunk was made
+            for chunk in csv_chunks(export, queryset, chunk_size=2):
+                bodies_sent.append(sum(message['type'] == 'http.response.body' for message in sent))
+                yield chunk
+
+        with mock.patch.object(exports, 'csv_chunks', spy):
+            async_to_sync(ASGIHandler())(scope, receive, send)
+        self.assertEqual(sent[0]['status'], 200)
+        # Buffering the generator first would make every chunk before any body went out
+        self.assertEqual(bodies_sent, [0, 1, 2])
+        rows = read_csv([message.get('body', b'') for message in sent[1:]])
+        self.assertEqual([row[1] for row in rows[1:]], [f'Case {n}' for n in range(5)])
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_records', 'clients', stdout=out)
+        self.assertEqual([row[1] for row in read_csv([out.getvalue().encode()])[1:]],
+                         ['Alice', '\'=hyperlink("x")'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bookings.xlsx')
+            call_command('export_records', 'bookings', '--output', path, '--status', 'pending',
+                         stderr=io.StringIO())
+            with open(path, 'rb') as file:
+                self.assertEqual(len(read_xlsx(file.read())), 2)
+        with self.assertRaises(CommandError):
+            call_command('export_records', 'cases', '--format', 'xlsx')
+        with self.assertRaises(CommandError):
+            call_command('export_records', 'clients', '--status', 'open')
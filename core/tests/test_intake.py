@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import intake
+from core.admin import SpamScoreFilter, VisitorAdmin
+from core.models import Visitor
+
+
+@override_settings(RATELIMIT_ENABLED=False, VISITOR_INTAKE_BACKGROUND=False, VISITOR_INTAKE_BATCH_SIZE=3, VISITOR_DEDUPE_MINUTES=60)
+class VisitorIntakeTest(TestCase):
+    def setUp(self):
+        intake.flush()
+
+    def post(self, **data):
+        return self.client.post(reverse('landing_page'), {
+            'name': 'Jane Doe', 'email': 'jane@example.com', 'message': 'I need help with a lease.', **data,
+        })
+
+    def test_submissions_are_buffered_then_written_in_one_batch(self):
+        self.post(message='First question about my lease')
+        self.post(message='Second question about my deposit')
+        self.assertEqual(Visitor.objects.count(), 0)
+        self.assertEqual(len(intake.buffer), 2)
+        # The third submission fills the batch
+        with self.assertNumQueries(2):
+            self.post(email='other@example.com')
+        self.assertEqual(Visitor.objects.count(), 3)
+        self.assertEqual(len(intake.buffer), 0)
+
+    def test_duplicates_within_window_are_dropped(self):
+        self.post(message='Please call me back')
+        self.post(email='JANE@example.com', message='  please   CALL me back ')
+        intake.flush()
+        self.assertEqual(Visitor.objects.count(), 1)
+        # Against already stored rows too
+        self.post(message='Please call me back')
+        intake.flush()
+        self.assertEqual(Visitor.objects.count(), 1)
+
+    def test_resubmission_after_window_is_kept(self):
+        Visitor.objects.create(
+            name='Jane Doe', email='jane@example.com', message='Please call me back',
+            message_hash=intake.message_hash('Please call me back'),
+            submitted_at=timezone.now() - timedelta(hours=2),
+        )
+        self.post(message='Please call me back')
+        intake.flush()
+        self.assertEqual(Visitor.objects.count(), 2)
+
+    def test_repeats_in_one_batch_outside_the_window_are_kept(self):
+        now = timezone.now()
+        item = {'name': 'Jane Doe', 'email': 'jane@example.com', 'message': 'Please call me back'}
+        written = intake.write_batch([
+            {**item, 'submitted_at': now - timedelta(hours=2)},
+            {**item, 'submitted_at': now - timedelta(hours=2) + timedelta(minutes=5)},
+            {**item, 'submitted_at': now},
+        ])
+        self.assertEqual(written, 2)
+        self.assertEqual(Visitor.objects.count(), 2)
+
+    def test_submitted_at_is_request_time(self):
+        before = timezone.now()
+        self.post()
+        intake.flush()
+        self.assertGreaterEqual(Visitor.objects.get().submitted_at, before)
+
+    def test_spam_score(self):
+        clean = intake.spam_score('Jane Doe', 'jane@example.com', 'I was injured at work and need advice.')
+        spam = intake.spam_score(
+            'http://cheap-seo.biz', 'x@mailinator.com',
+            'BEST SEO BACKLINKS AND CRYPTO CASINO http://a.biz http://b.biz www.c.biz!!!!!!',
+        )
+        self.assertLess(clean, 30)
+        self.assertGreaterEqual(spam, 70)
+
+    def test_admin_filters_by_score(self):
+        self.post(message='I was injured at work and need advice.')
+        self.post(name='www.spam.biz', email='x@mailinator.com', message='CASINO http://a.biz http://b.biz')
+        intake.flush()
+        request = self.client.get('/').wsgi_request
+        model_admin = VisitorAdmin(Visitor, None)
+        spam_filter = SpamScoreFilter(request, {'spam': ['high']}, Visitor, model_admin)
+        self.assertEqual(
+            list(spam_filter.queryset(request, Visitor.objects.all()).values_list('name', flat=True)),
+            ['www.spam.biz'],
+        )
+
+    @override_settings(VISITOR_INTAKE_MAX_RETRIES=2)
+    def test_persistent_write_errors_drop_the_buffer(self):
+        def broken(items):
+            raise RuntimeError('database is down')
+
+        buffer = intake.IntakeBuffer(broken)
+        buffer.append({'email': 'jane@example.com'})
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+            self.assertEqual(len(buffer), 1)
+        with self.assertLogs('core.intake', 'ERROR') as logs, self.assertRaises(RuntimeError):
+            buffer.flush()
+        self.assertEqual(len(buffer), 0)
+        self.assertIn('dropped 1 items', logs.output[0])
+        self.assertNotIn('jane@example.com', logs.output[0])
@@ -0,0 +1,113 @@
+import os
+import tempfile
+from io import StringIO
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.models import ChatRoom
+from core.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def series(metric, kind, name):
+    return metrics.registry.snapshot().get(metric, {}).get((kind, name))
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.install_query_wrapper(None, connection)
+        metrics.registry.clear()
+        self.user = User.objects.create_user(username='alice', password='testpass123')
+
+    def test_records_latency_queries_and_size_per_view(self):
+        self.client.login(username='alice', password='testpass123')
+        response = self.client.get(reverse('chat_unread_counts'))
+        _, count, queries = series('queries', 'view', 'chat_unread_counts')
+        self.assertEqual(count, 1)
+        self.assertGreaterEqual(queries, 2)  # session + user + counts
+        _, _, size = series('response_bytes', 'view', 'chat_unread_counts')
+        self.assertEqual(size, len(response.content))
+        self.assertIsNotNone(series('latency_seconds', 'view', 'chat_unread_counts'))
+
+    def test_metrics_endpoint_access(self):
+        self.client.get(reverse('landing_page'))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('lawfirm_latency_seconds_bucket{kind="view",name="landing_page",le="+Inf"} 1', response.content.decode())
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 403)
+        User.objects.create_user(username='ops', password='testpass123', is_staff=True)
+        self.client.login(username='ops', password='testpass123')
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get(reverse('landing_page'))
+        self.assertEqual(metrics.registry.snapshot(), {})
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class MetricsExportTest(SimpleTestCase):
+    def test_quantiles(self):
+        histogram = metrics.Histogram((1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+        cumulative = histogram.cumulative()
+        self.assertEqual(cumulative[-1][1], 5)
+        self.assertAlmostEqual(metrics.quantile(cumulative, 0.5), 1.75)
+        self.assertEqual(metrics.quantile(cumulative, 0.99), 4)
+
+    def test_render_parse_round_trip_and_perfreport(self):
+        registry = metrics.Registry()
+        registry.observe('view', 'case "detail"', {'latency_seconds': 0.02, 'queries': 7, 'db_seconds': 0.01})
+        registry.observe('view', 'dashboard', {'latency_seconds': 0.3, 'queries': 40, 'db_seconds': 0.2})
+        text = metrics.render_prometheus(registry.snapshot())
+        self.assertEqual(metrics.parse_prometheus(text), registry.snapshot())
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as handle:
+            handle.write(text)
+        try:
+            out = StringIO()
+            call_command('perfreport', file=handle.name, stdout=out)
+        finally:
+            os.remove(handle.name)
+        lines = out.getvalue().splitlines()
+        # Slowest first
+        self.assertIn('dashboard', lines[2])
+        self.assertIn('case "detail"', lines[3])
+
+
+@override_settings(METRICS_ENABLED=True, CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class ConsumerMetricsTest(TransactionTestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.room = ChatRoom.get_or_create_direct(self.alice, self.bob)
+
+    async def test_consumer_events_are_recorded(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.room.name}/")
+        communicator.scope['user'] = self.alice
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({'message': 'hello'})
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        snapshot = metrics.registry.snapshot()
+        names = {name for kind, name in snapshot['latency_seconds'] if kind == 'consumer'}
+        self.assertTrue({'ChatConsumer.websocket.connect', 'ChatConsumer.websocket.receive',
+                         'ChatConsumer.chat_message'} <= names)
+        # The save in database_sync_to_async is charged to the receive event
+        _, _, queries = snapshot['queries'][('consumer', 'ChatConsumer.websocket.receive')]
+        self.assertGreaterEqual(queries, 1)
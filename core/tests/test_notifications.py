@@ -0,0 +1,110 @@
+from datetime import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Availability, Booking, Case, Client, LawyerProfile, Notification
+from core import notifications
+from core.notifications import deliver_pending, user_group_name
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("SMTP down")
+
+
+class RecordingEmailBackend(BaseEmailBackend):
+    """Notes how many atomic blocks were open whenever a message went out."""
+    atomic_depths = []
+
+    def send_messages(self, email_messages):
+        self.atomic_depths.append(len(connection.atomic_blocks))
+        return len(email_messages)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class NotificationOutboxTest(TestCase):
+    def setUp(self):
+        self.lawyer_user = User.objects.create_user(username='lawyer', email='lawyer@example.com', password='testpass123')
+        self.lawyer = LawyerProfile.objects.create(user=self.lawyer_user)
+        self.client_user = User.objects.create_user(username='client', email='client@example.com', password='testpass123')
+        self.slot = Availability.objects.create(lawyer=self.lawyer, day='MON', start_time=time(9), end_time=time(10))
+        self.booking = Booking.objects.create(availability=self.slot, client=self.client_user)
+
+    def test_booking_request_and_status_change_are_queued(self):
+        self.assertEqual(Notification.objects.get().recipient, self.lawyer_user)
+
+        self.client.login(username='lawyer', password='testpass123')
+        self.client.get(reverse('update_booking_status', args=[self.booking.pk, 'approved']))
+        latest = Notification.objects.latest('id')
+        self.assertEqual(latest.recipient, self.client_user)
+        self.assertEqual(latest.payload['status'], 'approved')
+        # Nothing is sent inside the request
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_resave_without_transition_does_not_queue(self):
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.save()
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_case_transition_notifies_client_and_lawyer(self):
+        client = Client.objects.create(user=self.client_user, name='Client', email='client@example.com')
+        case = Case.objects.create(title='Lease', client=client, lawyer=self.lawyer_user)
+        case.status = 'closed'
+        case.save()
+        recipients = set(Notification.objects.filter(kind='case_status').values_list('recipient__username', flat=True))
+        self.assertEqual(recipients, {'client', 'lawyer'})
+
+    def test_worker_sends_batch_and_pushes(self):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(user_group_name(self.lawyer_user.pk), channel)
+
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['lawyer@example.com'])
+        self.assertEqual(Notification.objects.get().status, 'sent')
+
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['kind'], 'booking_requested')
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_notifications.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        self.assertEqual(deliver_pending(), (0, 1))
+        notification = Notification.objects.get()
+        self.assertEqual(notification.status, 'pending')
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        Notification.objects.update(attempts=4, next_attempt_at=timezone.now())
+        deliver_pending()
+        self.assertEqual(Notification.objects.get().status, 'failed')
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_notifications.RecordingEmailBackend')
+    def test_emails_go_out_outside_a_transaction(self):
+        RecordingEmailBackend.atomic_depths = []
+        self.assertEqual(deliver_pending(), (1, 0))
+        # Only the test case's own atomic blocks
+        self.assertEqual(RecordingEmailBackend.atomic_depths, [len(connection.atomic_blocks)])
+
+    def test_claimed_batch_is_leased(self):
+        claimed = notifications._claim(10, timezone.now())
+        self.assertEqual([notification.attempts for notification in claimed], [1])
+        # Another worker finds nothing due until the lease runs out
+        self.assertEqual(deliver_pending(), (0, 0))
+        Notification.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(Notification.objects.get().attempts, 2)
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import intake, pagecache
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_SECONDS=300, RATELIMIT_ENABLED=False, VISITOR_INTAKE_BACKGROUND=False)
+class LandingPageCacheTest(TestCase):
+    def setUp(self):
+        pagecache.invalidate('landing')
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.url = reverse('landing_page')
+
+    def tearDown(self):
+        intake.flush()
+
+    def test_second_request_served_from_cache_with_own_token(self):
+        first = self.client.get(self.url)
+        with self.assertTemplateNotUsed('landing.html'):
+            other = self.client_class(enforce_csrf_checks=True).get(self.url)
+        self.assertNotIn(pagecache.CSRF_PLACEHOLDER, other.content.decode())
+        self.assertIn('csrfmiddlewaretoken', other.content.decode())
+        self.assertNotEqual(first.cookies['csrftoken'].value, other.cookies['csrftoken'].value)
+
+    def test_cached_token_is_accepted(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        token = response.content.decode().split('name="csrfmiddlewaretoken" value="')[1].split('"')[0]
+        posted = self.client.post(self.url, {
+            'name': 'Jane', 'email': 'jane@example.com', 'message': 'Need advice', 'csrfmiddlewaretoken': token,
+        })
+        self.assertEqual(posted.status_code, 302)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertIn('private', response['Cache-Control'])
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'],
+                                       HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        # The ETag is tied to this visitor's CSRF secret
+        stranger = self.client_class().get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(stranger.status_code, 200)
+        # If-Modified-Since alone never yields a 304
+        dated = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(dated.status_code, 200)
+
+    def test_flash_messages_bypass_cache(self):
+        self.client.get(self.url)
+        response = self.client.post(self.url, {
+            'name': 'Jane', 'email': 'jane@example.com', 'message': 'Need advice',
+            'csrfmiddlewaretoken': self.client.cookies['csrftoken'].value,
+        }, follow=True)
+        self.assertContains(response, 'Your message has been sent successfully')
+        self.assertNotIn('ETag', response)
+
+    def test_authenticated_users_bypass_cache(self):
+        User.objects.create_user(username='alice', password='testpass123')
+        self.client.login(username='alice', password='testpass123')
+        self.assertRedirects(self.client.get(self.url), reverse('dashboard'), fetch_redirect_response=False)
+
+    @override_settings(PAGE_CACHE_SECONDS=0)
+    def test_disabled(self):
+        self.assertNotIn('ETag', self.client.get(self.url))
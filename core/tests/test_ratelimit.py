@@ -0,0 +1,113 @@
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import intake, ratelimit
+from core.models import ChatRoom, Message, Visitor
+from core.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitStoreTest(SimpleTestCase):
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('5/m'), (5, 60.0))
+        self.assertEqual(ratelimit.parse_rate('20/10s'), (20, 10.0))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate('5 per minute')
+
+    def test_token_bucket_bursts_then_refills(self):
+        clock = FakeClock()
+        store = ratelimit.TokenBucketStore(clock=clock)
+        self.assertEqual([store.allow('k', 3, 3) for _ in range(4)], [True, True, True, False])
+        clock.now += 1  # one token back
+        self.assertEqual([store.allow('k', 3, 3) for _ in range(2)], [True, False])
+        self.assertTrue(store.allow('other', 3, 3))
+
+    def test_sliding_window(self):
+        clock = FakeClock()
+        store = ratelimit.SlidingWindowStore(clock=clock)
+        self.assertEqual([store.allow('k', 2, 10) for _ in range(3)], [True, True, False])
+        clock.now += 9.9
+        self.assertFalse(store.allow('k', 2, 10))
+        clock.now += 0.2
+        self.assertTrue(store.allow('k', 2, 10))
+
+    def test_cache_store_weights_previous_window(self):
+        clock = FakeClock()
+        clock.now = 1000.0  # start of a 10s window
+        store = ratelimit.CacheStore(clock=clock, backend=LocMemCache('ratelimit-test', {}))
+        self.assertEqual([store.allow('k', 4, 10) for _ in range(5)], [True] * 4 + [False])
+        # Halfway through the next window half of the previous 5 hits still count
+        clock.now = 1015.0
+        self.assertEqual([store.allow('k', 4, 10) for _ in range(2)], [True, False])
+        clock.now = 1030.0
+        self.assertTrue(store.allow('k', 4, 10))
+
+
+@override_settings(RATELIMIT_RATES={'landing.visitor': '2/h'}, VISITOR_INTAKE_BACKGROUND=False)
+class LandingRateLimitTest(TestCase):
+    def setUp(self):
+        ratelimit.reset()
+        intake.flush()
+
+    def tearDown(self):
+        intake.flush()
+
+    def test_visitor_posts_are_limited_per_ip(self):
+        codes = [
+            self.client.post(reverse('landing_page'), {
+                'name': 'Spam', 'email': 'spam@example.com', 'message': f'hello {n}',
+            }).status_code
+            for n in range(3)
+        ]
+        self.assertEqual(codes, [302, 302, 429])
+        intake.flush()
+        self.assertEqual(Visitor.objects.count(), 2)
+        self.assertEqual(ratelimit.over_limit_counts(), {'landing.visitor': 1})
+        # Viewing the page is never limited
+        self.assertEqual(self.client.get(reverse('landing_page')).status_code, 200)
+        data = {'name': 'Other', 'email': 'other@example.com', 'message': 'hello'}
+        other = self.client.post(reverse('landing_page'), data, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, 302)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, RATELIMIT_RATES={'websocket': '2/m'})
+class WebSocketRateLimitTest(TransactionTestCase):
+    def setUp(self):
+        ratelimit.reset()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.room = ChatRoom.get_or_create_direct(self.alice, self.bob)
+        self.application = ratelimit.RateLimitMiddleware(URLRouter(websocket_urlpatterns))
+
+    async def test_frames_over_limit_are_dropped(self):
+        communicator = WebsocketCommunicator(self.application, f"/ws/chat/{self.room.name}/")
+        communicator.scope['user'] = self.alice
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        for n in range(4):
+            await communicator.send_json_to({'message': f'flood {n}'})
+        received = []
+        while not await communicator.receive_nothing(timeout=0.3):
+            event = await communicator.receive_json_from()
+            if 'message' in event:
+                received.append(event['message'])
+        await communicator.disconnect()
+        self.assertEqual(received, ['flood 0', 'flood 1'])
+        count = await Message.objects.filter(room=self.room).acount()
+        self.assertEqual(count, 2)
+        self.assertEqual(ratelimit.over_limit_counts(), {'websocket': 2})
@@ -0,0 +1,143 @@
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.forms import AppointmentForm
+from core.models import Appointment, Availability, Client, LawyerProfile
+from core.scheduling import find_conflict
+
+User = get_user_model()
+
+
+class FindConflictTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lawyer = LawyerProfile.objects.create(
+            user=User.objects.create_user(username='lawyer', password='testpass123')
+        )
+        cls.client_profile = Client.objects.create(name='Client', email='client@example.com')
+        cls.day = date(2026, 11, 5)
+        cls.ids = {}
+        for start, end in [(540, 600), (600, 630), (700, 820)]:
+            cls.ids[start] = Appointment.objects.create(
+                client=cls.client_profile, lawyer=cls.lawyer, date=cls.day,
+                time=time(start // 60, start % 60), duration=end - start,
+            ).pk
+
+    def conflict(self, start, end):
+        found = find_conflict(self.lawyer.pk, self.day, start, end)
+        return found and found[2]
+
+    def test_touching_intervals_do_not_conflict(self):
+        self.assertIsNone(self.conflict(630, 700))
+        self.assertIsNone(self.conflict(500, 540))
+        self.assertIsNone(self.conflict(820, 960))
+
+    def test_overlaps_detected(self):
+        self.assertEqual(self.conflict(590, 610), self.ids[540])
+        self.assertEqual(self.conflict(620, 705), self.ids[600])
+        self.assertEqual(self.conflict(800, 810), self.ids[700])
+        self.assertEqual(self.conflict(540, 545), self.ids[540])
+
+    def test_long_interval_found_behind_short_ones(self):
+        # Overlapping rows can't come through the form, but bulk imports skip clean()
+        Appointment.objects.bulk_create([
+            Appointment(client=self.client_profile, lawyer=self.lawyer, date=self.day, time=time(11, 50),
+                        duration=10),
+            Appointment(client=self.client_profile, lawyer=self.lawyer, date=self.day, time=time(12, 0),
+                        duration=10),
+        ])
+        self.assertEqual(self.conflict(805, 810), self.ids[700])
+
+    def test_one_query_however_busy_the_day(self):
+        # A full day of back-to-back 15 minute appointments
+        Appointment.objects.bulk_create(
+            Appointment(client=self.client_profile, lawyer=self.lawyer, date=self.day + timedelta(days=1),
+                        time=time(minutes // 60, minutes % 60), duration=15)
+            for minutes in range(0, 24 * 60, 15)
+        )
+        for start in (0, 600, 24 * 60 - 15):
+            with self.assertNumQueries(1) as queries:
+                self.assertIsNotNone(find_conflict(self.lawyer.pk, self.day + timedelta(days=1), start, start + 5))
+        # The query reads the window before the slot, not the whole day
+        self.assertIn('"time" >', queries.captured_queries[0]['sql'])
+
+
+class FindConflictBenchmarkTest(TestCase):
+    def test_benchmark_ten_thousand_bookings_per_day(self):
+        # A lawyer fits 96 quarter-hour appointments in a day, so 10k on one
+        # day is 125 lawyers with 80 back-to-back appointments each.
+        User.objects.bulk_create(User(username=f'lawyer{n}') for n in range(125))
+        LawyerProfile.objects.bulk_create(LawyerProfile(user=user) for user in User.objects.all())
+        lawyers = list(LawyerProfile.objects.values_list('pk', flat=True))
+        client_profile = Client.objects.create(name='Client', email='client@example.com')
+        day = date(2026, 11, 5)
+        Appointment.objects.bulk_create((
+            Appointment(client=client_profile, lawyer_id=lawyer, date=day,
+                        time=time(minutes // 60, minutes % 60), duration=15)
+            for lawyer in lawyers for minutes in range(0, 80 * 15, 15)
+        ), batch_size=1000)
+        self.assertEqual(Appointment.objects.filter(date=day).count(), 10_000)
+
+        rng = random.Random(42)
+        checks = [(rng.choice(lawyers), rng.randrange(0, 24 * 60 - 30)) for _ in range(2_000)]
+        started = timer.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            conflicts = [find_conflict(lawyer, day, start, start + 30) for lawyer, start in checks]
+        elapsed = timer.perf_counter() - started
+        self.assertEqual(len(queries), len(checks))
+        # Booked until 20:00: a slot conflicts exactly when it starts before then
+        self.assertEqual([conflict is not None for conflict in conflicts],
+                         [start < 80 * 15 for _, start in checks])
+        self.assertLess(elapsed, 5.0, f"{len(checks)} checks took {elapsed:.3f}s")
+
+
+class AppointmentConflictTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = LawyerProfile.objects.create(
+            user=User.objects.create_user(username='lawyer', password='testpass123')
+        )
+        Availability.objects.create(lawyer=self.lawyer, day='THU', start_time=time(8, 0), end_time=time(16, 0))
+        user = User.objects.create_user(username='client', email='client@example.com', password='testpass123')
+        self.client_profile = Client.objects.create(user=user, name='Client', email='client@example.com')
+        day = timezone.localdate() + timedelta(days=1)
+        while day.weekday() != 3:
+            day += timedelta(days=1)
+        self.thursday = day
+        Appointment.objects.create(
+            client=self.client_profile, lawyer=self.lawyer, date=day, time=time(10, 0), duration=60
+        )
+
+    def form(self, at, duration=30):
+        return AppointmentForm(data={
+            'lawyer': self.lawyer.pk, 'date': self.thursday, 'time': at, 'duration': duration,
+        })
+
+    def test_overlap_rejected(self):
+        form = self.form('10:30')
+        self.assertFalse(form.is_valid())
+        self.assertIn('already has an appointment', form.non_field_errors()[0])
+        self.assertFalse(self.form('09:45').is_valid())
+
+    def test_adjacent_slots_accepted(self):
+        self.assertTrue(self.form('09:30').is_valid())
+        self.assertTrue(self.form('11:00').is_valid())
+
+    def test_must_finish_within_window(self):
+        self.assertFalse(self.form('15:45', duration=30).is_valid())
+        self.assertTrue(self.form('15:30', duration=30).is_valid())
+
+    def test_editing_does_not_conflict_with_itself(self):
+        appointment = Appointment.objects.get()
+        form = AppointmentForm(instance=appointment, data={
+            'lawyer': self.lawyer.pk, 'date': self.thursday, 'time': '10:15', 'duration': 60,
+        })
+        self.assertTrue(form.is_valid(), form.errors)
@@ -0,0 +1,69 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from core.models import Appointment, Availability, Booking, Case, ChatRoom, Client, Document, Message
+
+User = get_user_model()
+
+SMALL = {
+    'clients': 6, 'cases_per_client': 3, 'documents_per_case': 2, 'lawyers': 3, 'bookings': 10,
+    'appointments': 25, 'rooms': 4, 'messages': 40, 'chunk_size': 7,
+}
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SeedScaleTest(TestCase):
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_scale', stdout=out, **{**SMALL, **options})
+        return out.getvalue()
+
+    def test_generates_requested_volumes(self):
+        output = self.seed()
+        self.assertIn('messages: 40/40', output)
+        self.assertEqual(Client.objects.count(), 6)
+        self.assertEqual(Case.objects.count(), 18)
+        self.assertEqual(Document.objects.count(), 36)
+        self.assertEqual(Availability.objects.count(), 15)
+        self.assertEqual(Booking.objects.count(), 10)
+        self.assertEqual(Appointment.objects.count(), 25)
+        self.assertEqual(ChatRoom.objects.count(), 4)
+        self.assertEqual(Message.objects.count(), 40)
+        self.assertTrue(User.objects.filter(username='scale-lawyer-0', groups__name='Lawyer').exists())
+        # Every client user is linked; every room has one client and one lawyer
+        self.assertFalse(Client.objects.filter(user__isnull=True).exists())
+        self.assertEqual(
+            set(ChatRoom.objects.annotate(n=Count('memberships')).values_list('n', flat=True)), {2},
+        )
+
+    def test_appointments_fit_availability_without_clashes(self):
+        self.seed()
+        windows = {(slot.lawyer_id, slot.day): slot for slot in Availability.objects.all()}
+        days = ['MON', 'TUE', 'WED', 'THU', 'FRI']
+        for appointment in Appointment.objects.all():
+            slot = windows[(appointment.lawyer_id, days[appointment.date.weekday()])]
+            self.assertTrue(slot.start_time <= appointment.time < slot.end_time)
+
+    def test_timestamps_are_spread_and_ordered(self):
+        self.seed()
+        self.assertGreater(Case.objects.values('opened_on').distinct().count(), 1)
+        timestamps = list(Message.objects.order_by('id').values_list('timestamp', flat=True))
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertGreater((timestamps[-1] - timestamps[0]).days, 300)
+
+    def test_same_seed_same_data(self):
+        self.seed()
+        first = list(Case.objects.order_by('id').values_list('title', 'status', 'due_date'))
+        self.seed(prefix='again')
+        second = list(Case.objects.order_by('id').values_list('title', 'status', 'due_date'))[len(first):]
+        self.assertEqual(first, second)
+
+    def test_refuses_existing_prefix(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
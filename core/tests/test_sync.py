@@ -0,0 +1,164 @@
+import io
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import sync
+from core.models import Case, ChangeLogEntry, ChatRoom, Client, Document, Message
+
+User = get_user_model()
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        cls.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.bob = User.objects.create_user(username='bob', password='testpass123')
+        cls.alice_client = Client.objects.create(user=cls.alice, name='Alice', email='alice@example.com')
+        cls.bob_client = Client.objects.create(user=cls.bob, name='Bob', email='bob@example.com')
+        cls.alice_case = Case.objects.create(title='Lease', client=cls.alice_client, lawyer=cls.lawyer)
+        cls.bob_case = Case.objects.create(title='Will', client=cls.bob_client, lawyer=cls.lawyer)
+        cls.room = ChatRoom.get_or_create_direct(cls.alice, cls.lawyer)
+
+    def drain(self, user, token=None, limit=None):
+        """Follow ``next`` until the feed is drained; return (changes, token)."""
+        changes = []
+        while True:
+            page = sync.feed(user, token, limit)
+            changes += page['changes']
+            token = page['next']
+            if not page['has_more']:
+                return changes, token
+
+    def keys(self, changes):
+        return {(change['model'], change['id'], change['op']) for change in changes}
+
+    def test_snapshot_is_scoped_to_the_client(self):
+        Message.objects.create(room=self.room, sender=self.lawyer, text='Hello')
+        changes, _ = self.drain(self.alice, limit=1)
+        self.assertEqual(
+            {(model, pk) for model, pk, _ in self.keys(changes)},
+            {('client', self.alice_client.pk), ('case', self.alice_case.pk),
+             ('message', Message.objects.get().pk)},
+        )
+        self.assertTrue(all(change['op'] == 'upsert' for change in changes))
+
+    def test_staff_snapshot_includes_every_case(self):
+        changes, _ = self.drain(self.lawyer)
+        cases = {change['id'] for change in changes if change['model'] == 'case'}
+        self.assertEqual(cases, {self.alice_case.pk, self.bob_case.pk})
+
+    def test_changes_after_snapshot(self):
+        _, token = self.drain(self.alice)
+        self.assertEqual(self.drain(self.alice, token)[0], [])
+
+        self.alice_case.status = 'closed'
+        self.alice_case.save()
+        self.bob_case.status = 'closed'
+        self.bob_case.save()
+        document = Document.objects.create(title='Lease', case=self.alice_case, file='docs/lease.txt')
+        changes, token = self.drain(self.alice, token)
+        self.assertEqual(self.keys(changes), {
+            ('case', self.alice_case.pk, 'upsert'), ('document', document.pk, 'upsert'),
+        })
+        case = next(change for change in changes if change['model'] == 'case')
+        # Collapsed to the latest state: the status change and the document bump
+        self.assertEqual(case['data']['status'], 'closed')
+        self.assertEqual(case['data']['version'], 3)
+
+        document_pk = document.pk
+        document.delete()
+        changes, _ = self.drain(self.alice, token)
+        self.assertIn(('document', document_pk, 'delete'), self.keys(changes))
+
+    def test_changes_during_snapshot_are_replayed(self):
+        page = sync.feed(self.alice, limit=1)
+        self.alice_client.phone = '555-0100'
+        self.alice_client.save()
+        changes, _ = self.drain(self.alice, page['next'], limit=1)
+        clients = [change for change in changes if change['model'] == 'client']
+        self.assertEqual(clients[-1]['data']['phone'], '555-0100')
+
+    def test_object_moved_out_of_view_is_deleted(self):
+        _, token = self.drain(self.alice)
+        self.alice_case.client = self.bob_client
+        self.alice_case.save()
+        changes, _ = self.drain(self.alice, token)
+        self.assertEqual(self.keys(changes), {('case', self.alice_case.pk, 'delete')})
+        bob_changes, _ = self.drain(self.bob)
+        self.assertIn(('case', self.alice_case.pk, 'upsert'), self.keys(bob_changes))
+
+        # Compaction keeps the entry that tells Alice to drop the case
+        self.alice_case.save()
+        sync.compact()
+        self.assertEqual(self.keys(self.drain(self.alice, token)[0]), {('case', self.alice_case.pk, 'delete')})
+
+    def test_messages_follow_room_membership(self):
+        _, alice_token = self.drain(self.alice)
+        _, bob_token = self.drain(self.bob)
+        message = Message.objects.create(room=self.room, sender=self.alice, text='Hi')
+        self.assertEqual(self.keys(self.drain(self.alice, alice_token)[0]), {('message', message.pk, 'upsert')})
+        self.assertEqual(self.drain(self.bob, bob_token)[0], [])
+
+    def test_unsettled_changes_are_held_back(self):
+        _, token = self.drain(self.alice)
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            self.alice_case.save()
+            changes, held_token = self.drain(self.alice, token)
+        self.assertEqual(changes, [])
+        self.assertEqual(self.keys(self.drain(self.alice, held_token)[0]), {('case', self.alice_case.pk, 'upsert')})
+
+    def test_tampered_and_expired_tokens(self):
+        with self.assertRaises(sync.TokenError) as caught:
+            sync.feed(self.alice, 'not-a-token')
+        self.assertFalse(caught.exception.reset)
+
+        _, token = self.drain(self.alice)
+        with mock.patch('core.sync.time.time', return_value=time.time() + 31 * 86400):
+            with self.assertRaises(sync.TokenError) as caught:
+                sync.feed(self.alice, token)
+        self.assertTrue(caught.exception.reset)
+
+    def test_compaction_keeps_latest_entry_per_object(self):
+        for _ in range(3):
+            self.alice_case.save()
+        old = ChangeLogEntry.objects.filter(model='client', object_id=self.bob_client.pk)
+        old.update(created_at=timezone.now() - timedelta(days=40))
+        newest = ChangeLogEntry.objects.latest('id').pk
+
+        call_command('compact_changelog', stdout=io.StringIO())
+        case_entries = ChangeLogEntry.objects.filter(model='case', object_id=self.alice_case.pk)
+        self.assertEqual(list(case_entries.values_list('pk', flat=True)), [newest])
+        self.assertFalse(old.exists())
+
+    def test_endpoint(self):
+        self.client.force_login(self.alice)
+        url = reverse('sync_changes')
+        response = self.client.get(url, {'limit': 500})
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(set(body), {'changes', 'next', 'has_more'})
+
+        self.assertEqual(self.client.get(url, {'token': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+        # A ValueError from the feed itself is a bug, not a bad limit
+        with mock.patch('core.sync.feed', side_effect=ValueError), self.assertRaises(ValueError):
+            self.client.get(url)
+        with mock.patch('core.sync.time.time', return_value=time.time() + 31 * 86400):
+            expired = self.client.get(url, {'token': body['next']})
+        self.assertEqual(expired.status_code, 410)
+        self.assertTrue(json.loads(expired.content)['reset'])
+
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
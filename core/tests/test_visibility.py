@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Group
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Case, ChatMembership, ChatRoom, Client, Document, Message
+
+User = get_user_model()
+
+
+class VisibilityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin_group = Group.objects.create(name='Admin')
+        lawyer_group = Group.objects.create(name='Lawyer')
+        cls.superuser = User.objects.create_superuser(username='root', password='testpass123')
+        cls.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        cls.admin.groups.add(admin_group)
+        cls.lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        cls.lawyer.groups.add(lawyer_group)
+        # Staff without a firm group: sees only what is assigned to them
+        cls.associate = User.objects.create_user(username='associate', password='testpass123', is_staff=True)
+        cls.stranger = User.objects.create_user(username='stranger', password='testpass123')
+
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.bob = User.objects.create_user(username='bob', password='testpass123')
+        cls.alice_client = Client.objects.create(user=cls.alice, name='Alice', email='alice@example.com')
+        cls.bob_client = Client.objects.create(user=cls.bob, name='Bob', email='bob@example.com')
+        cls.lease = Case.objects.create(title='Lease', client=cls.alice_client, lawyer=cls.associate)
+        cls.divorce = Case.objects.create(title='Divorce', client=cls.alice_client, lawyer=cls.lawyer)
+        cls.debt = Case.objects.create(title='Debt', client=cls.bob_client, lawyer=cls.lawyer)
+        Document.objects.create(title='Lease contract', case=cls.lease, file='docs/lease.txt')
+        Document.objects.create(title='Debt invoice', case=cls.debt, file='docs/debt.txt')
+
+        room = ChatRoom.objects.create(name='alice-lawyer')
+        ChatMembership.objects.create(room=room, user=cls.alice)
+        ChatMembership.objects.create(room=room, user=cls.lawyer)
+        Message.objects.create(room=room, sender=cls.alice, text='hello')
+
+    def fresh(self, user):
+        # A new instance, as each request gets, so cached group names don't leak between checks
+        return User.objects.get(pk=user.pk)
+
+    def visible(self, user):
+        return (
+            set(Case.objects.visible_to(user).values_list('title', flat=True)),
+            set(Client.objects.visible_to(user).values_list('name', flat=True)),
+            set(Document.objects.visible_to(user).values_list('title', flat=True)),
+            set(Message.objects.visible_to(user).values_list('text', flat=True)),
+        )
+
+    def test_visibility_per_role(self):
+        everything = {'Lease', 'Divorce', 'Debt'}, {'Alice', 'Bob'}, {'Lease contract', 'Debt invoice'}
+        expected = {
+            'root': (*everything, set()),
+            'admin': (*everything, set()),
+            'lawyer': (*everything, {'hello'}),
+            'associate': ({'Lease'}, {'Alice'}, {'Lease contract'}, set()),
+            'alice': ({'Lease', 'Divorce'}, {'Alice'}, {'Lease contract'}, {'hello'}),
+            'bob': ({'Debt'}, {'Bob'}, {'Debt invoice'}, set()),
+            'stranger': (set(), set(), set(), set()),
+        }
+        for username, sets in expected.items():
+            with self.subTest(role=username):
+                self.assertEqual(self.visible(User.objects.get(username=username)), sets)
+        self.assertEqual(self.visible(AnonymousUser()), (set(), set(), set(), set()))
+
+    def test_single_query_per_model(self):
+        for user in (self.superuser, self.admin, self.lawyer, self.associate, self.alice, self.stranger):
+            user = self.fresh(user)
+            user.group_names  # loaded once per request in practice
+            for model in (Case, Client, Document, Message):
+                with self.subTest(role=user.username, model=model.__name__):
+                    queryset = model.objects.visible_to(user)
+                    self.assertNotIn('DISTINCT', str(queryset.query))
+                    with self.assertNumQueries(1):
+                        list(queryset)
+
+    def test_restricted_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite query plans')
+        for model in (Case, Client, Document, Message):
+            with self.subTest(model=model.__name__):
+                sql, params = model.objects.visible_to(self.fresh(self.alice)).query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    plan = ' | '.join(row[-1] for row in cursor.fetchall())
+                self.assertNotRegex(plan, rf'SCAN {model._meta.db_table}\b(?! USING)', plan)
+
+
+class VisibilityViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        VisibilityTest.setUpTestData.__func__(cls)
+
+    def get(self, user, name, *args):
+        self.client.force_login(user)
+        return self.client.get(reverse(name, args=args))
+
+    def test_detail_views_hide_other_clients_records(self):
+        self.assertEqual(self.get(self.bob, 'case_detail', self.lease.pk).status_code, 404)
+        self.assertEqual(self.get(self.bob, 'client_detail', self.alice_client.pk).status_code, 404)
+        self.assertEqual(self.get(self.associate, 'case_detail', self.debt.pk).status_code, 404)
+        self.assertEqual(self.get(self.alice, 'case_detail', self.lease.pk).status_code, 200)
+        self.assertEqual(self.get(self.associate, 'client_detail', self.alice_client.pk).status_code, 200)
+
+    def test_client_detail_lists_only_visible_cases(self):
+        response = self.get(self.associate, 'client_detail', self.alice_client.pk)
+        self.assertEqual([case.title for case in response.context['cases']], ['Lease'])
+
+    def test_query_counts_per_role(self):
+        # session + user + groups (not for superusers) + the navbar's lawyer
+        # profile + the page's own queries (detail pages: one for the ETag
+        # first; the case page one for its activity timeline; the firm's
+        # dashboard two for the caseload panel); never one per row
+        expected = {
+            'root': {'dashboard': 7, 'case_detail': 7, 'client_detail': 6},
+            'lawyer': {'dashboard': 8, 'case_detail': 8, 'client_detail': 7},
+            'associate': {'dashboard': 7, 'case_detail': 8, 'client_detail': 7},
+            'alice': {'dashboard': 8, 'case_detail': 8, 'client_detail': 7},
+        }
+        for username, views in expected.items():
+            user = User.objects.get(username=username)
+            self.client.force_login(user)
+            for name, count in views.items():
+                args = [] if name == 'dashboard' else [self.lease.pk if name == 'case_detail' else self.alice_client.pk]
+                with self.subTest(role=username, view=name), self.assertNumQueries(count):
+                    self.assertEqual(self.client.get(reverse(name, args=args)).status_code, 200)
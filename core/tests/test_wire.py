@@ -0,0 +1,72 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from core import wire
+from core.consumers import ChatConsumer
+
+
+class MessagePackCodecTest(SimpleTestCase):
+    def test_round_trip(self):
+        values = [
+            None, True, False, 0, 127, 128, 255, 256, 65536, 2 ** 40, -1, -32, -33, -200, -40000, -2 ** 40,
+            1.5, '', 'x' * 31, 'x' * 32, 'é' * 300, 'y' * 70000,
+            [], list(range(20)), {}, {f'k{n}': n for n in range(20)},
+            {'signal': {'candidate': {'sdpMLineIndex': 0, 'sdpMid': '0'}}, 'sender': 'bob'},
+        ]
+        for value in values:
+            with self.subTest(value=repr(value)[:40]):
+                self.assertEqual(wire.unpackb(wire.packb(value)), value)
+
+    def test_known_encoding(self):
+        # Matches the MessagePack spec byte for byte
+        self.assertEqual(wire.packb({'a': [1, -1, None]}), b'\x81\xa1a\x93\x01\xff\xc0')
+
+    def test_malformed_frames_raise(self):
+        for data in (b'', b'\xa5ab', b'\x92\x01', b'\xc1', b'\x01\x02', b'\x81\x01\x01'):
+            with self.subTest(data=data):
+                with self.assertRaises(wire.WireError):
+                    wire.unpackb(data)
+        with self.assertRaises(wire.WireError):
+            wire.decode_frame(bytes_data=wire.packb([1, 2]))
+        with self.assertRaises(wire.WireError):
+            wire.decode_frame(text_data='{bad')
+
+    def test_only_json_types_are_accepted(self):
+        # ext and bin types, and non-string keys, couldn't be re-sent as JSON
+        for data in (b'\xd4\x01\x01', b'\x81\xa1a\xc4\x00', b'\x91\xc4\x01x', b'\x81\xc4\x01k\x01'):
+            with self.subTest(data=data):
+                with self.assertRaises(wire.WireError):
+                    wire.decode_frame(bytes_data=data)
+
+    def test_deeply_nested_frames_are_rejected(self):
+        nested = None
+        for _ in range(32):
+            nested = [nested]
+        self.assertEqual(wire.unpackb(b'\x91' * 32 + b'\xc0'), nested)
+        for frame in ({'bytes_data': b'\x91' * 5000 + b'\xc0'}, {'bytes_data': b'\x81\xa1a' * 5000 + b'\xc0'},
+                      {'text_data': '[' * 100000}):
+            with self.subTest(frame=repr(frame)[:30]):
+                with self.assertRaises(wire.WireError):
+                    wire.decode_frame(**frame)
+
+    def test_frames_are_encoded_once_by_the_sender(self):
+        frame = wire.encode_frame({'message': 'hi', 'id': 1})
+        self.assertEqual(frame['text'], '{"message":"hi","id":1}')
+        self.assertEqual(wire.unpackb(frame['bytes']), {'message': 'hi', 'id': 1})
+
+        consumer = ChatConsumer()
+        consumer.protocol = wire.MSGPACK
+        consumer.send = mock.AsyncMock()
+        with mock.patch('core.wire.packb') as packb, mock.patch('json.dumps') as dumps:
+            for _ in range(3):  # one call per recipient
+                async_to_sync(consumer.send_frame)(frame)
+        packb.assert_not_called()
+        dumps.assert_not_called()
+        consumer.send.assert_awaited_with(bytes_data=frame['bytes'])
+
+    def test_negotiate(self):
+        self.assertEqual(wire.negotiate({'subprotocols': ['other', wire.MSGPACK]}), wire.MSGPACK)
+        self.assertIsNone(wire.negotiate({'subprotocols': ['other']}))
+        self.assertIsNone(wire.negotiate({}))
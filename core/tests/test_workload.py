@@ -0,0 +1,48 @@
+from datetime import date, time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Appointment, Availability, Booking, Case, Client, LawyerProfile
+from core.workload import lawyer_calendar
+
+User = get_user_model()
+
+
+class LawyerCalendarTest(TestCase):
+    def setUp(self):
+        self.lawyer_user = User.objects.create_user(username='lawyer', password='testpass123')
+        self.lawyer_user.groups.add(Group.objects.create(name='Lawyer'))
+        self.lawyer = LawyerProfile.objects.create(user=self.lawyer_user)
+        client_user = User.objects.create_user(username='client', email='client@example.com', password='testpass123')
+        self.client_profile = Client.objects.create(user=client_user, name='Client One', email='client@example.com')
+
+        # Week of Monday 2030-01-07
+        Appointment.objects.create(client=self.client_profile, lawyer=self.lawyer, date=date(2030, 1, 7), time=time(9, 0))
+        Appointment.objects.create(client=self.client_profile, lawyer=self.lawyer, date=date(2030, 1, 7), time=time(14, 0))
+        tuesday = Availability.objects.create(lawyer=self.lawyer, day='TUE', start_time=time(10, 0), end_time=time(12, 0))
+        Booking.objects.create(availability=tuesday, client=client_user, status='approved')
+        Case.objects.create(title='Due', client=self.client_profile, lawyer=self.lawyer_user, due_date=date(2030, 1, 9))
+        Case.objects.create(title='Done', client=self.client_profile, lawyer=self.lawyer_user,
+                            due_date=date(2030, 1, 9), status='closed')
+
+    def test_aggregates_in_three_queries(self):
+        with self.assertNumQueries(3):
+            calendar = lawyer_calendar([self.lawyer_user.pk], date(2030, 1, 7), date(2030, 1, 13))
+        days = calendar[self.lawyer_user.pk]
+        self.assertEqual(len(days), 7)
+        self.assertEqual(days['2030-01-07']['appointment_count'], 2)
+        self.assertEqual(days['2030-01-07']['busy'][0]['start'], '09:00')
+        self.assertEqual(days['2030-01-08']['booking_count'], 1)
+        self.assertEqual(days['2030-01-09']['deadlines'], {'open': 1})
+
+    def test_endpoint_rejects_bad_range(self):
+        self.client.login(username='lawyer', password='testpass123')
+        url = reverse('lawyer_calendar')
+        response = self.client.get(url, {'start': '2030-01-13', 'end': '2030-01-07'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {'start': '2030-01-07', 'end': '2030-01-13'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(str(self.lawyer_user.pk), response.json()['lawyers'])
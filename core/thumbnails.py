@@ -0,0 +1,29 @@
+from io import BytesIO
+import os
+
+from django.core.files.base import ContentFile
+
+# Largest edge of a generated thumbnail, in pixels
+THUMBNAIL_SIZE = (240, 240)
+
+
+def build_thumbnail(image_file, size=THUMBNAIL_SIZE):
+    """
+    Return a ContentFile holding a JPEG thumbnail of ``image_file``.
+    Returns None if the upload cannot be read as an image.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image_file.open('rb')
+        image_file.seek(0)
+        with Image.open(image_file) as image:
+            image = image.convert('RGB')
+            image.thumbnail(size)
+            buffer = BytesIO()
+            image.save(buffer, format='JPEG', quality=85, optimize=True)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+    base_name = os.path.splitext(os.path.basename(image_file.name))[0]
+    return ContentFile(buffer.getvalue(), name=f"{base_name}_thumb.jpg")
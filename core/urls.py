@@ -17,10 +17,17 @@ urlpatterns = [
     path('client/<int:pk>/edit/', views.client_update, name='client_update'),
     path('case/<int:pk>/', views.case_detail, name='case_detail'),
     path('case/<int:pk>/edit/', views.case_update, name='case_update'),
+    path('case/<int:pk>/timeline/', views.case_timeline, name='case_timeline'),
     path('book-appointment/', views.book_appointment, name='book_appointment'),
     path('lawyers/', views.lawyers_list, name='lawyers_list'),
+    path('api/lawyers/', views.lawyers_directory_json, name='lawyers_directory_json'),
     # filepath: core/urls.py
-    path('chat/<str:room_name>/', views.chat_room, name='chat_room'),
+    path('chat/search/', views.chat_search, name='chat_search'),
+    path('chat/with/<int:user_id>/', views.start_chat, name='start_chat'),
+    path('chat/<slug:room_name>/', views.chat_room, name='chat_room'),
+    path('api/chat/unread/', views.chat_unread_counts, name='chat_unread_counts'),
+    path('api/sync/', views.sync_changes, name='sync_changes'),
+    path('api/autocomplete/<slug:source>/', views.autocomplete_lookup, name='autocomplete'),
 
     
     path("availability/add/", views.set_availability, name="set_availability"),
@@ -29,6 +36,8 @@ urlpatterns = [
     path("availability/<int:availability_id>/book/", views.book_slot, name="book_slot"),
     path("my-bookings/", views.my_bookings, name="my_bookings"),
     path("lawyer/bookings/", views.lawyer_bookings, name="lawyer_bookings"),
+    path("api/calendar/", views.lawyer_calendar_json, name="lawyer_calendar"),
     path("booking/<int:booking_id>/<str:status>/", views.update_booking_status, name="update_booking_status"),
+    path("metrics", views.metrics_export, name="metrics"),
 
 ]
@@ -11,15 +11,29 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.models import User 
-<<<<<<< HEAD
-from .models import Booking, Client, Case, Document, Visitor, Availability, LawyerProfile, Message
-=======
-from .models import Client, Case, Document, Visitor, Availability, LawyerProfile
->>>>>>> 7ed60f327162c664ac0bf60ce07ea022c213fd29
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from .models import Booking, ChatRoom, Client, Case, Document, Visitor, Availability, LawyerProfile, Message
 from .forms import ClientRegistrationForm, ClientProfileForm, CaseForm, DocumentForm, VisitorForm, AppointmentForm, AvailabilityForm
+from .dbtuning import retry_on_locked
 from .decorators import group_required
+from .ratelimit import ratelimit
+from . import intake
+from .pagecache import cached_page
+from .conditional import case_freshness, client_freshness, conditional_page
+from . import activity, autocomplete, metrics, sync
+from .chat import SEARCH_PAGE_SIZE, mark_room_read, membership_for, recent_history, search_messages, unread_counts
+from .directory import get_lawyer_directory
+from .workload import lawyer_calendar, parse_date_range
 
+# How far back lawyer_bookings looks for decided bookings by default
+BOOKING_HISTORY_DAYS = 90
 
+
+@ratelimit('landing.visitor')
 def landing_page(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
@@ -27,10 +41,13 @@ def landing_page(request):
     if request.method == 'POST':
         form = VisitorForm(request.POST)
         if form.is_valid():
-            form.save()
+            intake.submit(**form.cleaned_data)
             messages.success(request, 'Your message has been sent successfully! We will get back to you shortly.')
             return redirect('landing_page')
     else:
+        cached = cached_page(request, 'landing', 'landing.html', lambda: {'form': VisitorForm()})
+        if cached is not None:
+            return cached
         form = VisitorForm()
     return render(request, 'landing.html', {'form': form})
 
@@ -108,34 +125,19 @@ class ClientProfileView(LoginRequiredMixin, UpdateView):
 
 def dashboard(request):
     query = request.GET.get('q')
-    # If user is admin or lawyer, show all cases/clients
-    if request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists():
-        cases = Case.objects.order_by('-opened_on')
-        clients = Client.objects.order_by('name')
-        if query:
-            cases = cases.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(client__name__icontains=query)
-            ).distinct()
-            clients = clients.filter(
-                Q(name__icontains=query) |
-                Q(email__icontains=query)
-            ).distinct()
-    else:
-        # If user is a client, only show their own cases and profile
-        try:
-            client = request.user.client_profile
-            cases = Case.objects.filter(client=client).order_by('-opened_on')
-            clients = Client.objects.filter(pk=client.pk)
-            if query:
-                cases = cases.filter(
-                    Q(title__icontains=query) |
-                    Q(description__icontains=query)
-                ).distinct()
-        except Client.DoesNotExist:
-            cases = Case.objects.none()
-            clients = Client.objects.none()
+    # Admins and lawyers see every case/client, clients only their own
+    cases = Case.objects.visible_to(request.user).select_related('client').order_by('-opened_on')
+    clients = Client.objects.visible_to(request.user).order_by('name')
+    if query:
+        cases = cases.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(client__name__icontains=query)
+        )
+        clients = clients.filter(
+            Q(name__icontains=query) |
+            Q(email__icontains=query)
+        )
     context = {
         'cases': cases,
         'clients': clients,
@@ -175,18 +177,16 @@ def case_create(request):
     return render(request, 'form_template.html', {'form': form, 'title': 'Add New Case'})
 
 @login_required
+@conditional_page(case_freshness)
 def case_detail(request, pk):
-    case = get_object_or_404(Case, pk=pk)
-    # Only allow access if admin/lawyer or the client owns the case
-    if not (request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists() or (hasattr(request.user, 'client_profile') and case.client == request.user.client_profile)):
-        messages.error(request, 'You do not have permission to view this case.')
-        return redirect('dashboard')
+    # Cases the user may not see are indistinguishable from missing ones
+    case = get_object_or_404(Case.objects.visible_to(request.user).select_related('client'), pk=pk)
     documents = Document.objects.filter(case=case)
     form = DocumentForm() # Initialize form for GET request
 
     if request.method == 'POST':
         # Ensure only authorized users can upload
-        if request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists():
+        if request.user.has_firm_access:
             form = DocumentForm(request.POST, request.FILES)
             if form.is_valid():
                 document = form.save(commit=False)
@@ -195,47 +195,146 @@ def case_detail(request, pk):
                 messages.success(request, f'Document "{document.title}" has been uploaded successfully.')
                 return redirect('case_detail', pk=case.pk)
     
+    timeline, next_cursor = activity.page(case.pk)
     context = {
         'case': case,
         'documents': documents,
         'form': form,
+        'timeline': timeline,
+        'next_cursor': next_cursor,
     }
     return render(request, 'case_detail.html', context)
 
 
+@login_required
+def case_timeline(request, pk):
+    """Older activity entries for the case page; ``before`` is the cursor of the last page."""
+    case = get_object_or_404(Case.objects.visible_to(request.user).only('pk'), pk=pk)
+    try:
+        timeline, next_cursor = activity.page(case.pk, request.GET.get('before'))
+    except ValueError:
+        return HttpResponse('Invalid cursor.', status=400)
+    return render(request, 'case_timeline.html', {'case': case, 'timeline': timeline, 'next_cursor': next_cursor})
+
+
 @login_required
 def chat_room(request, room_name):
-    history = Message.objects.filter(room_name=room_name).select_related('sender')
+    membership = membership_for(request.user, room_name)
+    if membership is None:
+        messages.error(request, 'You are not a member of this chat room.')
+        return redirect('dashboard')
+    history = recent_history(membership.room_id)
+    if history:
+        mark_room_read(request.user, membership.room_id, history[-1].pk)
     return render(request, 'chat/chat_room.html', {
         'room_name': room_name,
         'history': history,
     })
 
-    return render(request, 'chat/chat_room.html', {...})
+@login_required
+def start_chat(request, user_id):
+    """Open (creating if needed) the one-to-one room with another user."""
+    other = get_object_or_404(get_user_model(), pk=user_id)
+    if other == request.user:
+        return redirect('dashboard')
+    room = ChatRoom.get_or_create_direct(request.user, other)
+    return redirect('chat_room', room_name=room.name)
+
+@login_required
+def chat_unread_counts(request):
+    """Unread message counts per room, for the dashboard badge."""
+    counts = unread_counts(request.user)
+    return JsonResponse({'rooms': counts, 'total': sum(counts.values())})
+
+
+@login_required
+def autocomplete_lookup(request, source):
+    """Type-ahead options for AutocompleteSelect. Query params: q and limit."""
+    if source not in autocomplete.SOURCES:
+        raise Http404
+    try:
+        limit = int(request.GET.get('limit') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    results, more = autocomplete.lookup(request.user, source, request.GET.get('q', ''), limit)
+    return JsonResponse({'results': results, 'more': more})
+
+
+@login_required
+def sync_changes(request):
+    """
+    Change feed for offline clients (see core.sync). Query params: token
+    (from the previous page's ``next``; omit to start with a snapshot) and
+    limit.
+    """
+    try:
+        limit = int(request.GET.get('limit') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    try:
+        page = sync.feed(request.user, request.GET.get('token'), limit)
+    except sync.TokenError as e:
+        # 410 tells the client its local copy is stale and to start over
+        return JsonResponse({'error': str(e), 'reset': e.reset}, status=410 if e.reset else 400)
+    return JsonResponse(page)
+
+
+@login_required
+def chat_search(request):
+    """Search messages across the user's rooms by text, sender and date."""
+    query = request.GET.get('q', '').strip()
+    sender = request.GET.get('sender', '').strip()
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        start = end = None
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    results, total = search_messages(request.user, query, sender=sender, start=start, end=end, page=page)
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    params = request.GET.copy()
+    params.pop('page', None)
+    return render(request, 'chat/search.html', {
+        'query': query,
+        'sender': sender,
+        'start': request.GET.get('start', ''),
+        'end': request.GET.get('end', ''),
+        'results': results,
+        'total': total,
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': page < pages,
+        'querystring': params.urlencode(),
+    })
 
 
 @login_required
 def lawyers_list(request):
-    # LawyerProfile = get_user_model()
-    from .models import LawyerProfile
-    lawyers = LawyerProfile.objects.all()
-    print(lawyers)
-    # Prefetch LawyerProfile for efficiency
-    # lawyer_profiles = LawyerProfile.objects.filter(user__in=lawyers)
-    # profiles_by_user = {profile.user_id: profile for profile in lawyer_profiles}
-    # Attach profile to each lawyer (if exists)
-    # for lawyer in lawyers:
-    #     lawyer.lawyer_profile_obj = profiles_by_user.get(lawyer.id)
+    lawyers = get_lawyer_directory()
     return render(request, 'lawyers_list.html', {'lawyers': lawyers})
 
+def metrics_export(request):
+    """Prometheus text export of core.metrics, for staff and allowed IPs."""
+    if not metrics.enabled():
+        raise Http404
+    allowed = request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if not (allowed or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+def lawyers_directory_json(request):
+    """JSON variant of the lawyer directory for client apps."""
+    return JsonResponse({'lawyers': get_lawyer_directory()})
+
 @login_required
+@conditional_page(client_freshness)
 def client_detail(request, pk):
-    client = get_object_or_404(Client, pk=pk)
-    # Only allow access if admin/lawyer or the client is viewing their own profile
-    if not (request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists() or (hasattr(request.user, 'client_profile') and request.user.client_profile.pk == client.pk)):
-        messages.error(request, 'You do not have permission to view this client.')
-        return redirect('dashboard')
-    cases = Case.objects.filter(client=client)
+    client = get_object_or_404(Client.objects.visible_to(request.user), pk=pk)
+    cases = Case.objects.visible_to(request.user).filter(client=client)
     context = {
         'client': client,
         'cases': cases
@@ -329,19 +428,21 @@ def lawyer_availability(request, user_id):
 
 @login_required
 def book_slot(request, availability_id):
-    availability = get_object_or_404(Availability, id=availability_id)
-
-    # Only consider pending or approved bookings as blocking the slot
-    if availability.bookings.filter(status__in=['pending', 'approved']).exists():
-        return redirect("lawyer_availability", user_id=availability.lawyer.user_id)
+    availability = get_object_or_404(Availability.objects.select_related("lawyer"), id=availability_id)
 
-    # Create booking
-    Booking.objects.create(
-        availability=availability,
-        client=request.user
-    )
+    reserve_slot(availability, request.user)
     return redirect("lawyer_availability", user_id=availability.lawyer.user_id)
 
+
+@retry_on_locked
+def reserve_slot(availability, client):
+    """Book ``availability`` for ``client`` unless it is already taken."""
+    with transaction.atomic():
+        # Only consider pending or approved bookings as blocking the slot
+        if availability.bookings.filter(status__in=['pending', 'approved']).exists():
+            return None
+        return Booking.objects.create(availability=availability, client=client)
+
 @login_required
 def my_bookings(request):
     bookings = request.user.bookings.select_related("availability__lawyer").order_by("-booked_at")
@@ -352,19 +453,50 @@ def lawyer_bookings(request):
     # Find the lawyer profile of the logged-in user
     lawyer = get_object_or_404(LawyerProfile, user=request.user)
 
-    # Get all bookings for this lawyer's availabilities
+    # Get this lawyer's bookings, bounded to a recent window; pending
+    # requests always stay visible so nothing awaiting a decision is hidden.
+    try:
+        since = parse_date(request.GET.get("since") or "")
+    except ValueError:
+        since = None
+    since = since or timezone.localdate() - timedelta(days=BOOKING_HISTORY_DAYS)
     bookings = Booking.objects.filter(
         availability__lawyer=lawyer
+    ).filter(
+        Q(status="pending") | Q(booked_at__date__gte=since)
     ).select_related("availability__lawyer", "client").order_by("-booked_at")
 
-    return render(request, "booking/lawyer_bookings.html", {"bookings": bookings})
+    return render(request, "booking/lawyer_bookings.html", {"bookings": bookings, "since": since})
+
+@login_required
+@group_required('Admin', 'Lawyer')
+def lawyer_calendar_json(request):
+    """
+    Per-day busy blocks and deadlines for one or more lawyers.
+    Query params: lawyer (user id, repeatable; defaults to the current user),
+    start and end (YYYY-MM-DD; defaults to the current week).
+    """
+    try:
+        start, end = parse_date_range(request.GET)
+        lawyer_ids = [int(pk) for pk in request.GET.getlist("lawyer")] or [request.user.pk]
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    calendar = lawyer_calendar(lawyer_ids, start, end)
+    return JsonResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "lawyers": {str(user_id): days for user_id, days in calendar.items()},
+    })
 
 @login_required
 def update_booking_status(request, booking_id, status):
     booking = get_object_or_404(Booking, id=booking_id, availability__lawyer__user=request.user)
 
-    if status in ["approved", "declined"]:
+    # Saving a new status queues the client's notification (see core.signals)
+    if status in ["approved", "declined"] and booking.status != status:
         booking.status = status
-        booking.save()
+        booking.save(update_fields=["status"])
+        messages.success(request, f"Booking {booking.get_status_display().lower()}. The client will be notified.")
 
     return redirect("lawyer_bookings")
@@ -0,0 +1,104 @@
+"""
+Wire formats for the chat WebSocket.
+
+Clients pick a format with the WebSocket subprotocol header:
+
+* ``chat.json`` (or no subprotocol) - JSON text frames, what the browser
+  page uses.
+* ``chat.msgpack`` - binary frames in MessagePack, for native clients and
+  heavy WebRTC signalling.
+
+Outgoing frames are encoded once, by the sender, to both JSON text and
+MessagePack bytes, and both travel through the channel layer in the
+group message: each consumer only sends the one its client negotiated,
+so nothing is encoded per recipient. MessagePack is the ``msgpack``
+package's C extension, which packs a chat frame in about a microsecond.
+Incoming MessagePack is limited to what JSON can express (no bin or ext
+types, string keys), so a frame can always be re-sent as JSON. Frames
+nested past the unpacker's own stack limit are rejected like any
+malformed frame.
+
+Compression is left to the transport. permessage-deflate is negotiated by
+the ASGI server (uvicorn's ``--ws-per-message-deflate``; Daphne doesn't
+offer it) and ASGI gives the application no say in it, so there is
+nothing to switch here. ``manage.py bench_wire`` reports deflated sizes
+alongside raw ones.
+"""
+import json
+
+import msgpack
+
+JSON = 'chat.json'
+MSGPACK = 'chat.msgpack'
+SUBPROTOCOLS = (MSGPACK, JSON)
+
+
+class WireError(ValueError):
+    """Raised for frames that cannot be decoded."""
+
+
+def negotiate(scope):
+    """Return the first subprotocol offered by the client that we speak, or None."""
+    for offered in scope.get('subprotocols') or ():
+        if offered in SUBPROTOCOLS:
+            return offered
+    return None
+
+
+def encode_frame(payload):
+    """
+    Encode one outgoing frame for every format: ``{'text': str, 'bytes':
+    bytes}``, to be spread into the group message.
+    """
+    return {
+        'text': json.dumps(payload, separators=(',', ':')),
+        'bytes': packb(payload),
+    }
+
+
+def decode_frame(text_data=None, bytes_data=None):
+    """Decode an incoming frame to a dict; raises WireError if malformed."""
+    try:
+        data = json.loads(text_data) if text_data is not None else unpackb(bytes_data)
+    except (ValueError, TypeError) as exc:
+        raise WireError(str(exc)) from exc
+    except RecursionError as exc:
+        raise WireError('frame nested too deeply') from exc
+    if not isinstance(data, dict):
+        raise WireError('frame must be an object')
+    return data
+
+
+def packb(obj):
+    return msgpack.packb(obj)
+
+
+def unpackb(data):
+    """Unpack MessagePack limited to JSON types; raises WireError if malformed."""
+    if not isinstance(data, (bytes, bytearray)):
+        raise WireError('expected bytes')
+    try:
+        return msgpack.unpackb(data, ext_hook=_no_ext, object_hook=_json_map, list_hook=_json_array)
+    except WireError:
+        raise
+    except ValueError as exc:  # msgpack's errors, StackError for deep nesting included
+        raise WireError(str(exc) or 'invalid frame') from exc
+
+
+def _no_ext(code, data):
+    raise WireError('ext types are not supported')
+
+
+def _json_map(obj):
+    for key, value in obj.items():
+        if not isinstance(key, str):
+            raise WireError('map keys must be strings')
+        if isinstance(value, bytes):
+            raise WireError('bin types are not supported')
+    return obj
+
+
+def _json_array(obj):
+    if any(isinstance(item, bytes) for item in obj):
+        raise WireError('bin types are not supported')
+    return obj
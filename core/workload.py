@@ -0,0 +1,122 @@
+"""
+Per-day workload aggregation for one or more lawyers.
+
+Appointments, bookings and case deadlines live in different tables with
+different notions of "when": appointments have a concrete date, bookings
+reserve a recurring weekday availability slot, and cases only carry a
+due date. Each source is reduced with a single grouped query and the
+results are merged into one calendar keyed by lawyer and day.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Min, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Appointment, Booking, Case
+
+WEEKDAY_CODES = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+ACTIVE_BOOKING_STATUSES = ('pending', 'approved')
+MAX_CALENDAR_DAYS = 92
+
+
+def parse_date_range(params, max_days=MAX_CALENDAR_DAYS):
+    """
+    Read ``start``/``end`` (YYYY-MM-DD) from a QueryDict.
+    Defaults to the current Monday-Sunday week. Raises ValueError on bad input.
+    """
+    today = timezone.localdate()
+    start_raw, end_raw = params.get('start'), params.get('end')
+    start = parse_date(start_raw) if start_raw else today - timedelta(days=today.weekday())
+    end = parse_date(end_raw) if end_raw else start + timedelta(days=6)
+    if start is None or end is None:
+        raise ValueError('Dates must be formatted as YYYY-MM-DD.')
+    if end < start:
+        raise ValueError('End date must not be before start date.')
+    if (end - start).days >= max_days:
+        raise ValueError(f'Date range cannot exceed {max_days} days.')
+    return start, end
+
+
+def _empty_day():
+    return {'busy': [], 'appointment_count': 0, 'booking_count': 0, 'deadlines': {}}
+
+
+def lawyer_calendar(lawyer_user_ids, start, end):
+    """
+    Return ``{user_id: {iso_date: day}}`` for every lawyer and every day in
+    ``[start, end]``. Runs exactly three queries regardless of row counts.
+    """
+    lawyer_user_ids = list(lawyer_user_ids)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    calendar = {
+        user_id: {day.isoformat(): _empty_day() for day in days}
+        for user_id in lawyer_user_ids
+    }
+
+    appointments = (
+        Appointment.objects
+        .filter(lawyer__user_id__in=lawyer_user_ids, date__range=(start, end))
+        .values('lawyer__user_id', 'date')
+        .annotate(count=Count('id'), first=Min('time'), last=Max('time'), minutes=Sum('duration'))
+        .order_by()
+    )
+    for row in appointments:
+        day = calendar[row['lawyer__user_id']][row['date'].isoformat()]
+        day['appointment_count'] += row['count']
+        day['busy'].append({
+            'source': 'appointment',
+            'start': row['first'].strftime('%H:%M'),
+            'end': row['last'].strftime('%H:%M'),
+            'count': row['count'],
+            'minutes': row['minutes'],
+        })
+
+    # Bookings reserve a weekday slot rather than a date, so group them by
+    # slot once and project each slot onto the matching days of the range.
+    bookings = (
+        Booking.objects
+        .filter(
+            availability__lawyer__user_id__in=lawyer_user_ids,
+            status__in=ACTIVE_BOOKING_STATUSES,
+        )
+        .values(
+            'availability__lawyer__user_id', 'availability__day',
+            'availability__start_time', 'availability__end_time', 'status',
+        )
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    slots_by_weekday = defaultdict(list)
+    for row in bookings:
+        slots_by_weekday[(row['availability__lawyer__user_id'], row['availability__day'])].append(row)
+    for user_id in lawyer_user_ids:
+        for day in days:
+            for row in slots_by_weekday.get((user_id, WEEKDAY_CODES[day.weekday()]), ()):
+                entry = calendar[user_id][day.isoformat()]
+                entry['booking_count'] += row['count']
+                entry['busy'].append({
+                    'source': 'booking',
+                    'start': row['availability__start_time'].strftime('%H:%M'),
+                    'end': row['availability__end_time'].strftime('%H:%M'),
+                    'status': row['status'],
+                    'count': row['count'],
+                })
+
+    deadlines = (
+        Case.objects
+        .filter(lawyer_id__in=lawyer_user_ids, due_date__range=(start, end))
+        .exclude(status='closed')
+        .values('lawyer_id', 'due_date', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for row in deadlines:
+        day = calendar[row['lawyer_id']][row['due_date'].isoformat()]
+        day['deadlines'][row['status']] = row['count']
+
+    for lawyer_days in calendar.values():
+        for day in lawyer_days.values():
+            day['busy'].sort(key=lambda block: (block['start'], block['end']))
+    return calendar
@@ -21,14 +21,20 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 from channels.auth import AuthMiddlewareStack
 import core.routing
+from core.dbrouter import ReplicaPinningWebSocketMiddleware
+from core.ratelimit import RateLimitMiddleware
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lawfirm.settings')
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            core.routing.websocket_urlpatterns
+        ReplicaPinningWebSocketMiddleware(
+            RateLimitMiddleware(
+                URLRouter(
+                    core.routing.websocket_urlpatterns
+                )
+            )
         )
     ),
 })
\ No newline at end of file
@@ -42,10 +42,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'core.dbrouter.ReplicaPinningMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -56,11 +58,7 @@ ROOT_URLCONF = 'lawfirm.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-<<<<<<< HEAD
         'DIRS': [BASE_DIR / 'templates'],
-=======
-        'DIRS': [],
->>>>>>> 7ed60f327162c664ac0bf60ce07ea022c213fd29
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -75,7 +73,7 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'lawfirm.wsgi.application'
 
-ASGI_APPLICATION = 'lawfirm.asgi.application',
+ASGI_APPLICATION = 'lawfirm.asgi.application'
 
 # Channels configuration
 CHANNEL_LAYERS = {
@@ -94,9 +92,23 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests; check them before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Reads can be spread over read replicas by core.dbrouter. Add each replica
+# to DATABASES and list its alias in REPLICA_DATABASES. After a write, the
+# user reads from the primary for REPLICA_PIN_SECONDS.
+DATABASE_ROUTERS = ['core.dbrouter.PrimaryReplicaRouter']
+PRIMARY_DATABASE = 'default'
+REPLICA_DATABASES = []
+REPLICA_PIN_SECONDS = 5
+
+# core.dbtuning applies its DEFAULT_PRAGMAS to every SQLite connection;
+# set SQLITE_PRAGMAS to a dict of PRAGMA name -> value to replace them
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -148,3 +160,58 @@ LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
 
 DJANGO_SETTINGS_MODULE = 'lawfirm.settings'
+
+# Email
+# Notifications are delivered by `manage.py run_notifier`, never inside a
+# request. The console backend prints them; switch to the file backend
+# (EMAIL_FILE_PATH) or SMTP for real delivery.
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+DEFAULT_FROM_EMAIL = 'no-reply@lawfirm.local'
+
+# Outbox retry policy: attempt n waits NOTIFICATION_BACKOFF_SECONDS * 2**(n-1)
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_BACKOFF_SECONDS = 30
+# How long a worker holds a claimed batch before it is due again
+NOTIFICATION_CLAIM_SECONDS = 5 * 60
+
+# Rate limits ("count/period", period s/m/h/d with optional multiplier).
+# Use 'core.ratelimit.CacheStore' with a shared cache when running several
+# processes; the default in-process store limits each process separately.
+RATELIMIT_STORE = 'core.ratelimit.TokenBucketStore'
+RATELIMIT_RATES = {
+    'websocket': '30/10s',
+    'landing.visitor': '5/h',
+}
+
+# Landing page inquiries are buffered by core.intake and written in batches
+VISITOR_INTAKE_BATCH_SIZE = 50
+VISITOR_INTAKE_FLUSH_SECONDS = 2.0
+# Failed flushes in a row before the buffered inquiries are dropped (and logged)
+VISITOR_INTAKE_MAX_RETRIES = 5
+VISITOR_DEDUPE_MINUTES = 60
+
+# Anonymous landing page is served from core.pagecache; 0 disables it
+PAGE_CACHE_SECONDS = 300
+
+# Per-view / per-consumer-event latency and query histograms (core.metrics),
+# exported at /metrics to staff users and METRICS_ALLOWED_IPS
+METRICS_ENABLED = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Incremental sync (core.sync): change log entries older than the retention
+# are removed by `manage.py compact_changelog`, and tokens that old are
+# refused so the client takes a fresh snapshot
+SYNC_RETENTION_DAYS = 30
+SYNC_PAGE_SIZE = 200
+SYNC_SETTLE_SECONDS = 1
+
+# Options returned per type-ahead request by core.autocomplete
+AUTOCOMPLETE_LIMIT = 20
+
+# Case activity log (core.activity): buffered writes, timeline page size
+# and retention enforced by `manage.py prune_activity`
+ACTIVITY_LOG_BATCH_SIZE = 200
+ACTIVITY_LOG_FLUSH_SECONDS = 2.0
+ACTIVITY_PAGE_SIZE = 20
+ACTIVITY_RETENTION_DAYS = 730